@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Headless Batch Renderer
+Renders a recorded log or a simulated run off-screen (Agg) as fast as it
+draws, writing PNG snapshots, a GIF/MP4 timeline and a whole-trace summary
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from decimate import METHODS
+from rate_meter import WINDOW_SECONDS, RateMeter
+from topology_model import DEFAULT_INTERFACES
+
+VIEWS = ('network', 'topology', 'steering')
+SIMULATED_BLOCK = 10.0  # Simulated seconds produced per step (well inside the source's buffer)
+SUMMARY_BINS = 1000  # Time bins of the summary dashboard, whatever the trace length
+ERROR_EDGES = np.arange(0.0, 1200.5, 0.5)  # Tracking-error histogram bins in degrees
+VIDEO_DPI = 60  # Figure resolution for timelines; snapshots use the figure's own
+
+def log_duration(log):
+    """Seconds from the first to the last frame; captures without an index are scanned once"""
+    end = getattr(log, "end", None)
+    if end is None:
+        end = log.start
+        for times, _, _, _ in log.chunks():
+            end = float(times[-1])
+    return max(end - log.start, 0.0)
+
+def simulated_blocks(duration, rate=None):
+    """Yield (samples, frame_times, frame_ids, dlcs) from the built-in simulation on a fast SimClock"""
+    from dbc_codec import steering_codec
+    from signal_source import SAMPLE_RATE, SimulatedSteering
+    from sim_clock import SimClock
+
+    rate = rate or SAMPLE_RATE
+    codec = steering_codec()
+    messages = [codec["SteeringCommand"], codec["SteeringStatus"]]
+    ids = np.array([m.frame_id for m in messages], dtype=np.int64)
+    dlcs = np.array([m.dlc for m in messages], dtype=np.uint8)
+    clock = SimClock(step=1.0 / rate, mode='fast')
+    source = SimulatedSteering(rate, clock=clock)
+    source.schedule()
+    elapsed = 0.0
+    while elapsed < duration:
+        span = min(SIMULATED_BLOCK, duration - elapsed)
+        clock.run(span)
+        elapsed += span
+        samples = source.queue.drain()
+        n = samples.shape[1]
+        # Each sample stands for one command and one status frame, as in the live views
+        yield samples, np.repeat(samples[0], len(ids)), np.tile(ids, n), np.tile(dlcs, n)
+
+class BatchRenderer:
+    """One visualizer driven off-screen: fed blocks of stream data, asked for frames at stream times
+
+    The network and topology views are blitted: their topology, labels and
+    legend are drawn into a background once, and each frame restores that
+    background and redraws just the edges or arrows, status text, signal
+    lines and time axes. The steering view redraws fully.
+    """
+
+    def __init__(self, view='network', interfaces=DEFAULT_INTERFACES, window=None, method='minmax',
+                 dpi=None, max_rate=None):
+        options = {'method': method}
+        if window is not None:
+            options['window'] = window
+        with plt.rc_context({'figure.dpi': dpi} if dpi else {}):
+            if view == 'network':
+                from network_topology_visualizer import ModernCANTopology
+                self.viz = ModernCANTopology(interfaces, **options)
+            elif view == 'topology':
+                from topology_visualizer import CANTopologyVisualizer
+                self.viz = CANTopologyVisualizer(interfaces, **options)
+            else:
+                from steering_visualizer import SteeringSimulator
+                self.viz = SteeringSimulator(**options)
+        if max_rate is not None and hasattr(self.viz, 'analytics'):
+            self.viz.analytics.max_rate = max_rate  # Rate limit of the ECU that produced the stream
+        self.fig = self.viz.fig
+        self.canvas = self.fig.canvas
+        self.blit = view in ('network', 'topology')
+        # Frames are far apart in stream time, so the time axes scroll on
+        # every frame; only they are redrawn instead of the full figure
+        self.scrolling = [self.viz.ax_cmd.xaxis, self.viz.ax_resp.xaxis] if self.blit else []
+        self.background = None
+        self.animated = set()
+        self.full_draws = 0
+        self.now = 0.0
+        self._recent = []  # (frame_times, frame_ids, dlcs) pieces not yet older than the rate window
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        self.full_draws += 1
+        if self.blit:
+            self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def feed(self, samples, frame_times, frame_ids, dlcs):
+        """Hand over stream data up to the next frame time"""
+        # The steering view also runs its loop analytics over what it is fed
+        getattr(self.viz, 'ingest', self.viz.samples.extend)(samples)
+        if len(frame_times):
+            self._recent.append((frame_times, frame_ids, dlcs))
+
+    def _measure(self, t):
+        """Give the view a rate meter holding exactly the last window of stream time"""
+        if not hasattr(self.viz, 'meter'):
+            self._recent.clear()
+            return
+        if self._recent:
+            times, ids, dlcs = (np.concatenate(column) for column in zip(*self._recent))
+        else:
+            times, ids, dlcs = np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros(0)
+        keep = times > t - WINDOW_SECONDS
+        self._recent = [(times[keep], ids[keep], dlcs[keep])] if keep.any() else []
+        self.now = t - WINDOW_SECONDS
+        meter = RateMeter(clock=lambda: self.now)
+        meter.record_many(ids[keep], dlcs[keep])
+        self.now = t
+        self.viz.meter = meter
+
+    def frame(self, index, t):
+        """Render the view at stream time t; returns the canvas as an (h, w, 4) RGBA view"""
+        self._measure(t)
+        artists = self.viz.update(index)
+        if not self.blit:
+            self.canvas.draw()
+            return np.asarray(self.canvas.buffer_rgba())
+        layers = list(artists) + self.scrolling
+        fresh = [artist for artist in layers if artist not in self.animated]
+        for artist in fresh:
+            artist.set_animated(True)  # Left out of full draws, i.e. out of the background
+            self.animated.add(artist)
+        if fresh or self.background is None:
+            self.canvas.draw()
+        self.canvas.restore_region(self.background)
+        for artist in layers:
+            self.fig.draw_artist(artist)
+        return np.asarray(self.canvas.buffer_rgba())
+
+    def close(self):
+        plt.close(self.fig)
+
+class TraceSummary:
+    """Whole-trace statistics in fixed time bins, accumulated block by block"""
+
+    def __init__(self, duration, bins=SUMMARY_BINS):
+        self.duration = max(duration, 1e-9)
+        self.bins = bins
+        self.width = self.duration / bins
+        self.low = np.full((2, bins), np.inf)
+        self.high = np.full((2, bins), -np.inf)
+        self.error_sum = np.zeros(bins)
+        self.error_max = np.zeros(bins)
+        self.samples = np.zeros(bins, dtype=np.int64)
+        self.errors = np.zeros(len(ERROR_EDGES) - 1, dtype=np.int64)
+        self.frames = {}  # frame_id -> frames per bin
+
+    def _bin(self, times):
+        return np.clip((times / self.width).astype(np.int64), 0, self.bins - 1)
+
+    def add(self, samples, frame_times, frame_ids):
+        if samples.shape[1]:
+            index = self._bin(samples[0])
+            for row in range(2):
+                np.minimum.at(self.low[row], index, samples[row + 1])
+                np.maximum.at(self.high[row], index, samples[row + 1])
+            error = np.abs(samples[1] - samples[2])
+            self.error_sum += np.bincount(index, weights=error, minlength=self.bins)
+            np.maximum.at(self.error_max, index, error)
+            self.samples += np.bincount(index, minlength=self.bins)
+            self.errors += np.histogram(np.minimum(error, ERROR_EDGES[-1]), ERROR_EDGES)[0]
+        if len(frame_times):
+            index = self._bin(frame_times)
+            for frame_id in np.unique(frame_ids).tolist():
+                counts = np.bincount(index[frame_ids == frame_id], minlength=self.bins)
+                self.frames[frame_id] = self.frames.get(frame_id, 0) + counts
+
+    def error_quantile(self, q):
+        """Tracking error at quantile q from the histogram (bin upper edge)"""
+        total = self.errors.sum()
+        if not total:
+            return 0.0
+        return float(ERROR_EDGES[1:][np.searchsorted(np.cumsum(self.errors), q * total)])
+
+    def plot(self, path, title, names=None):
+        """Write the dashboard: signal envelopes, tracking error, frame rates and error distribution"""
+        names = names or {}
+        centers = (np.arange(self.bins) + 0.5) * self.width
+        seen = self.samples > 0
+        fig = plt.figure(figsize=(16, 10))
+        gs = fig.add_gridspec(3, 2, width_ratios=[3, 1], hspace=0.35, wspace=0.2)
+        ax_signal = fig.add_subplot(gs[0, 0])
+        ax_error = fig.add_subplot(gs[1, 0], sharex=ax_signal)
+        ax_rate = fig.add_subplot(gs[2, 0], sharex=ax_signal)
+        ax_hist = fig.add_subplot(gs[:2, 1])
+        ax_text = fig.add_subplot(gs[2, 1])
+        fig.suptitle(title, fontsize=14, fontweight='bold')
+
+        for row, (label, color) in enumerate((('SteeringCommand', 'b'), ('SteeringStatus', 'r'))):
+            ax_signal.fill_between(centers[seen], self.low[row][seen], self.high[row][seen],
+                                   color=color, alpha=0.4, linewidth=0.5, label=label)
+        ax_signal.set_ylabel('Angle (°)')
+        ax_signal.set_title('Signals (min/max per bin)', fontsize=11)
+        ax_signal.legend(loc='upper right', fontsize=8)
+
+        mean = np.divide(self.error_sum, self.samples, out=np.zeros(self.bins), where=seen)
+        ax_error.fill_between(centers[seen], 0, self.error_max[seen], color='orange', alpha=0.4,
+                              label='max')
+        ax_error.plot(centers[seen], mean[seen], color='darkorange', linewidth=1, label='mean')
+        ax_error.set_ylabel('|Command - Response| (°)')
+        ax_error.set_title('Tracking error', fontsize=11)
+        ax_error.legend(loc='upper right', fontsize=8)
+
+        for frame_id, counts in sorted(self.frames.items()):
+            ax_rate.plot(centers, counts / self.width, linewidth=1,
+                         label=f"{names.get(frame_id, '?')} (ID {frame_id})")
+        ax_rate.set_xlabel('Time (seconds)')
+        ax_rate.set_ylabel('msgs/s')
+        ax_rate.set_title('Frame rates', fontsize=11)
+        if self.frames:
+            ax_rate.legend(loc='upper right', fontsize=8)
+        for ax in (ax_signal, ax_error, ax_rate):
+            ax.grid(True, alpha=0.3)
+        ax_signal.set_xlim(0, self.duration)
+
+        top = max(self.error_quantile(0.999), ERROR_EDGES[2])
+        shown = ERROR_EDGES[:-1] < top
+        ax_hist.barh(ERROR_EDGES[:-1][shown], self.errors[shown], height=ERROR_EDGES[1], color='orange')
+        ax_hist.set_ylabel('Tracking error (°)')
+        ax_hist.set_xlabel('Samples')
+        ax_hist.set_title('Error distribution (to p99.9)', fontsize=11)
+        ax_hist.grid(True, alpha=0.3)
+
+        ax_text.axis('off')
+        frames = sum(int(counts.sum()) for counts in self.frames.values())
+        lines = [f"Duration    {self.duration:,.1f} s",
+                 f"Frames      {frames:,}",
+                 f"Samples     {int(self.samples.sum()):,}",
+                 f"Error p50   {self.error_quantile(0.5):.1f}°",
+                 f"Error p99   {self.error_quantile(0.99):.1f}°",
+                 f"Error max   {self.error_max.max():.1f}°"]
+        ax_text.text(0, 1, "\n".join(lines), va='top', family='monospace', fontsize=11)
+
+        fig.savefig(path)
+        plt.close(fig)
+
+class GifWriter:
+    """Animated GIF through Pillow; frames are palettized as they arrive to keep memory small"""
+
+    def __init__(self, path, fps):
+        self.path = path
+        self.fps = fps
+        self.frames = []
+
+    def write(self, rgba):
+        from PIL import Image
+
+        image = Image.fromarray(rgba).convert('RGB')
+        palette = self.frames[0] if self.frames else None
+        self.frames.append(image.quantize(palette=palette, dither=Image.Dither.NONE)
+                           if palette else image.quantize())
+
+    def close(self):
+        if self.frames:
+            self.frames[0].save(self.path, save_all=True, append_images=self.frames[1:],
+                                duration=int(1000 / self.fps), loop=0)
+
+class FfmpegWriter:
+    """MP4 (or anything ffmpeg writes) from raw RGBA frames piped to an ffmpeg process"""
+
+    def __init__(self, path, fps):
+        self.path = path
+        self.fps = fps
+        self.process = None
+        if shutil.which("ffmpeg") is None:
+            raise RuntimeError(f"ffmpeg is needed to write {path}; install it or ask for a .gif")
+
+    def write(self, rgba):
+        if self.process is None:
+            height, width = rgba.shape[:2]
+            self.process = subprocess.Popen(
+                ["ffmpeg", "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgba",
+                 "-s", f"{width}x{height}", "-r", str(self.fps), "-i", "-",
+                 "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p", self.path],
+                stdin=subprocess.PIPE)
+        self.process.stdin.write(rgba.tobytes())
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            if self.process.wait():
+                raise RuntimeError(f"ffmpeg exited with {self.process.returncode}")
+
+def open_video(path, fps):
+    return GifWriter(path, fps) if path.lower().endswith(".gif") else FfmpegWriter(path, fps)
+
+def render(blocks, renderer, times, on_frame, summary=None):
+    """Feed blocks through renderer, calling on_frame(index, t, rgba) at each of the sorted times"""
+    k = 0
+    for samples, frame_times, frame_ids, dlcs in blocks:
+        if summary is not None:
+            summary.add(samples, frame_times, frame_ids)
+        ends = [samples[0, -1]] if samples.shape[1] else []
+        ends += [frame_times[-1]] if len(frame_times) else []
+        end = max(ends, default=-np.inf)
+        s = f = 0
+        # Cut the block at every frame time it reaches, so each frame sees exactly its past
+        while k < len(times) and times[k] <= end:
+            t = times[k]
+            s_next = int(np.searchsorted(samples[0], t, side='right'))
+            f_next = int(np.searchsorted(frame_times, t, side='right'))
+            renderer.feed(samples[:, s:s_next], frame_times[f:f_next], frame_ids[f:f_next],
+                          dlcs[f:f_next])
+            on_frame(k, t, renderer.frame(k, t))
+            s, f = s_next, f_next
+            k += 1
+        renderer.feed(samples[:, s:], frame_times[f:], frame_ids[f:], dlcs[f:])
+    while k < len(times):
+        on_frame(k, times[k], renderer.frame(k, times[k]))
+        k += 1
+    return k
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless batch renderer for recorded or simulated traffic")
+    parser.add_argument("--replay", metavar="LOG",
+                        help="render a traffic_log.py recording or a candump/ASC/BLF capture "
+                             "(default: the built-in simulation)")
+    parser.add_argument("--duration", type=float, default=3600.0,
+                        help="without --replay: simulated seconds to render")
+    parser.add_argument("--view", choices=VIEWS, default="network", help="visualizer to render")
+    parser.add_argument("--interfaces", default=DEFAULT_INTERFACES,
+                        help="broker interfaces.json defining the network (network/topology views)")
+    parser.add_argument("--window", type=float, help="seconds of history in the signal plots")
+    parser.add_argument("--decimate", choices=sorted(METHODS), default="minmax",
+                        help="downsampling applied before plotting long windows")
+    parser.add_argument("--png", metavar="DIR", help="write PNG snapshots into DIR")
+    parser.add_argument("--snapshots", type=int, default=10, help="with --png: snapshots across the trace")
+    parser.add_argument("--video", metavar="OUT",
+                        help="write a timeline: .gif through Pillow, .mp4 and others through ffmpeg")
+    parser.add_argument("--frames", type=int, default=200, help="with --video: frames across the trace")
+    parser.add_argument("--fps", type=float, default=20, help="with --video: playback frames per second")
+    parser.add_argument("--dpi", type=float,
+                        help=f"figure resolution (default: {VIDEO_DPI} with --video, else matplotlib's)")
+    parser.add_argument("--summary", metavar="PNG", help="write a whole-trace summary dashboard")
+    args = parser.parse_args()
+    if not (args.png or args.video or args.summary):
+        parser.error("nothing to write: give --png, --video and/or --summary")
+
+    log = None
+    writer = None
+    renderer = None
+    try:
+        start = time.perf_counter()
+        names = {}
+        max_rate = None  # The simulated ECU's unless the traffic comes from a log
+        if args.replay:
+            from ecu_simulator import MAX_RATE as max_rate
+            from traffic_log import open_log, steering_blocks
+
+            log = open_log(args.replay)
+            duration = log_duration(log)
+            blocks = steering_blocks(log)
+            names = getattr(log, "frame_names", {})
+            source = args.replay
+        else:
+            duration = args.duration
+            blocks = simulated_blocks(duration)
+            source = f"{duration:,.0f}s simulation"
+        if not names:
+            from dbc_codec import steering_codec
+            names = {m.frame_id: m.name for m in steering_codec().messages}
+        print(f"🎞️  Batch rendering {source} ({duration:,.1f}s of traffic) | view: {args.view}")
+
+        video_times = np.linspace(0, duration, args.frames + 1)[1:] if args.video else np.zeros(0)
+        png_times = np.linspace(0, duration, args.snapshots + 1)[1:] if args.png else np.zeros(0)
+        times = np.union1d(video_times, png_times)
+        in_video = np.isin(times, video_times)
+        in_png = np.isin(times, png_times)
+
+        if len(times):
+            renderer = BatchRenderer(args.view, args.interfaces, args.window, args.decimate,
+                                     args.dpi or (VIDEO_DPI if args.video else None), max_rate)
+        if args.video:
+            writer = open_video(args.video, args.fps)
+        if args.png:
+            os.makedirs(args.png, exist_ok=True)
+        summary = TraceSummary(duration) if args.summary else None
+
+        def on_frame(index, t, rgba):
+            if in_video[index]:
+                writer.write(rgba)
+            if in_png[index]:
+                from PIL import Image
+                Image.fromarray(rgba).save(os.path.join(args.png, f"frame_{index:05d}_{t:09.2f}s.png"))
+
+        if renderer is not None:
+            rendered = render(blocks, renderer, times, on_frame, summary)
+        else:
+            for samples, frame_times, frame_ids, _ in blocks:
+                summary.add(samples, frame_times, frame_ids)
+            rendered = 0
+        if writer is not None:
+            writer.close()
+            print(f"🎬 {args.video}: {int(in_video.sum())} frames at {args.fps:g} fps")
+        if args.png:
+            print(f"🖼️  {args.png}/: {int(in_png.sum())} snapshots")
+        if summary is not None:
+            summary.plot(args.summary, f"Steering trace summary | {source}", names)
+            print(f"📊 {args.summary}: summary dashboard")
+
+        elapsed = time.perf_counter() - start
+        draws = f", {renderer.full_draws} full draws" if renderer is not None else ""
+        print(f"✓ {duration:,.1f}s of traffic in {elapsed:.2f}s ({duration / elapsed:,.0f}x real time) | "
+              f"{rendered} frames{draws}")
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Rendering stopped")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        if renderer is not None:
+            renderer.close()
+        if log is not None:
+            log.close()
+
+if __name__ == "__main__":
+    main()
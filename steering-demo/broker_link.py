@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Broker Link
+Callback-style publish/subscribe adapter shared by the demo components
+"""
+
+import threading
+import time
+
+BROKER_URL = "http://localhost:50051"
+LOCAL_PREFIX = "local://"
+EMULATOR_PREFIX = "emulator://"
+HUB_PREFIX = "hub://"
+
+def _signal_creator(signals, namespace=None):
+    """SignalCreator for (frame, signal) pairs, optionally scoped to one namespace"""
+    from remotivelabs.broker.sync import SignalCreator
+
+    creator = SignalCreator()
+    for frame, name in signals:
+        if namespace is None:
+            creator = creator.signal(frame, name)
+        else:
+            creator = creator.signal(frame, name, namespace=namespace)
+    return creator
+
+class RemotiveSubscription:
+    def __init__(self, thread, stop, link=None):
+        self.thread = thread
+        self._stop = stop
+        self._link = link
+
+    def cancel(self):
+        """Stop the reader thread and forget it on the link"""
+        self._stop.set()
+        if self._link is not None:
+            self._link._discard(self)
+            self._link = None
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+
+class RemotivePublisher:
+    def __init__(self, config, signals):
+        self.config = config
+        # Resolve signal handles once instead of on every publish
+        self.handles = {key: config.signals.signal(*key) for key in signals}
+
+    def publish(self, frame, values):
+        """Publish raw signal values belonging to one frame"""
+        for name, raw in values.items():
+            self.handles[(frame, name)].raw(raw)
+
+    def publish_batch(self, frames):
+        """Publish a sequence of (frame, values) pairs"""
+        handles = self.handles
+        for frame, values in frames:
+            for name, raw in values.items():
+                handles[(frame, name)].raw(raw)
+
+class RemotiveBrokerLink:
+    """Adapter over remotivelabs.broker.sync that delivers frames to callbacks"""
+
+    def __init__(self, url=BROKER_URL, poll_interval=0.001):
+        from remotivelabs.broker.sync import create_channel
+
+        self.url = url
+        self.poll_interval = poll_interval
+        self.channel = create_channel(url)
+        self.error = None
+        self._subscriptions = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, client_id, signals, on_frame, on_change=True, namespace=None):
+        """Call on_frame(frame, values, timestamp) whenever subscribed signals arrive"""
+        from remotivelabs.broker.sync import SubscriberConfig
+
+        creator = _signal_creator(signals, namespace)
+        config = SubscriberConfig(clientId=client_id, signals=creator, onChange=on_change)
+
+        stop = threading.Event()
+        thread = threading.Thread(target=self._reader, args=(config, list(signals), on_frame, stop),
+                                  name=f"sub-{client_id}", daemon=True)
+        subscription = RemotiveSubscription(thread, stop, self)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        thread.start()
+        return subscription
+
+    def _reader(self, config, keys, on_frame, stop):
+        """Drain the sync subscriber on a dedicated thread"""
+        try:
+            while not stop.is_set():
+                frames = {}
+                for (frame, name), signal in zip(keys, config.signals):
+                    value = signal.read()
+                    if value is not None:
+                        frames.setdefault(frame, {})[name] = value
+                if frames:
+                    timestamp = time.time()
+                    for frame, values in frames.items():
+                        on_frame(frame, values, timestamp)
+                else:
+                    # The sync API has no blocking read, so back off briefly
+                    stop.wait(self.poll_interval)
+        except Exception as e:
+            # Keep the failure visible instead of treating it as "no data"
+            self.error = e
+            print(f"❌ Subscriber {config.clientId} stopped: {e}")
+
+    def publisher(self, client_id, signals, namespace=None):
+        """Create a publisher with pre-resolved handles for the given signals"""
+        from remotivelabs.broker.sync import PublisherConfig
+
+        creator = _signal_creator(signals, namespace)
+        return RemotivePublisher(PublisherConfig(clientId=client_id, signals=creator), signals)
+
+    def list_signals(self, namespace=None):
+        """[(namespace, frame, signal)] configured on the broker, optionally for one namespace"""
+        from remotivelabs.broker.sync import common_pb2, system_api_pb2_grpc
+
+        system = system_api_pb2_grpc.SystemServiceStub(self.channel)
+        if namespace is None:
+            config = system.GetConfiguration(common_pb2.Empty())
+            namespaces = [info.namespace.name for info in config.networkInfo]
+        else:
+            namespaces = [namespace]
+        listed = []
+        for name in namespaces:
+            for frame in system.ListSignals(common_pb2.NameSpace(name=name)).frame:
+                frame_name = frame.signalInfo.id.name
+                listed += [(name, frame_name, child.id.name) for child in frame.childInfo]
+        return listed
+
+    def close(self):
+        """Cancel every subscription opened through this link"""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.cancel()
+
+    def _discard(self, subscription):
+        """Drop a cancelled subscription so short-lived subscribers do not pile up"""
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+def connect(url=BROKER_URL):
+    """Open a link to RemotiveBroker, the stand-in (local://, emulator://) or a hub (hub://)"""
+    if url.startswith(LOCAL_PREFIX):
+        from local_broker import get_local_broker
+        return get_local_broker(url[len(LOCAL_PREFIX):] or "default")
+    if url.startswith(EMULATOR_PREFIX):
+        from local_broker import EmulatorLink
+        return EmulatorLink(url)
+    if url.startswith(HUB_PREFIX):
+        # A SignalHub in this process, sharing its upstream connection
+        from signal_hub import get_hub
+        return get_hub(url[len(HUB_PREFIX):] or "main")
+    return RemotiveBrokerLink(url)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+CAN Log Import
+Streams candump, Vector ASC and BLF captures through a generator pipeline in
+fixed-size NumPy batches, decoded against the project's DBC files
+"""
+
+import argparse
+import gzip
+import os
+import time
+
+import numpy as np
+
+from dbc_codec import CAN_DIR, FRAME_BYTES, load_database
+
+FORMATS = ('candump', 'asc', 'blf')
+BATCH_FRAMES = 65536  # Frames per batch; memory use is bounded by this, not the file size
+EFF_FLAG = 0x80000000  # Extended ids are kept as-is; DBC ids carry this bit for 29-bit frames
+
+def detect_format(path):
+    """Guess the capture format from the file name"""
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith(".blf"):
+        return 'blf'
+    if name.endswith(".asc"):
+        return 'asc'
+    return 'candump'
+
+def open_text(path):
+    """Text lines of a capture; .gz files are decompressed on the fly"""
+    if path.lower().endswith(".gz"):
+        return gzip.open(path, "rt", encoding="ascii", errors="replace")
+    return open(path, encoding="ascii", errors="replace")
+
+def parse_candump(lines):
+    """Yield (timestamp, frame_id, data) from candump output
+
+    Accepts the log format (`candump -l`: "(1436509052.249713) can0 064#2A36")
+    and the screen format with timestamps (`candump -ta`:
+    "(1436509052.249713)  can0  064   [2]  2A 36"). Remote frames carry no data.
+    """
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 3 or not fields[0].startswith("("):
+            continue
+        timestamp = float(fields[0][1:-1])
+        frame = fields[2]
+        if "#" in frame:
+            can_id, _, data = frame.partition("#")
+            if data.startswith("#"):
+                data = data[2:]  # CAN FD: "##<flags nibble><data>"
+            elif data.startswith("R"):
+                data = ""
+            payload = bytes.fromhex(data)
+        else:
+            can_id = frame
+            payload = bytes.fromhex("".join(fields[4:])) if len(fields) > 4 and "remote" not in line else b""
+        frame_id = int(can_id, 16)
+        if len(can_id) > 3:
+            frame_id |= EFF_FLAG
+        yield timestamp, frame_id, payload
+
+def parse_asc(lines):
+    """Yield (timestamp, frame_id, data) from a Vector ASC log (CAN and CAN FD data frames)"""
+    base = 16
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 6:
+            if len(fields) >= 2 and fields[0] == "base":
+                base = 16 if fields[1] == "hex" else 10
+            continue
+        try:
+            timestamp = float(fields[0])
+        except ValueError:
+            continue
+        if fields[1] == "CANFD":
+            # time CANFD channel dir id [name] brs esi dlc length data...
+            rest = fields[5:]
+            if rest[0] not in ("0", "1"):
+                rest = rest[1:]
+            can_id = fields[4]
+            length = int(rest[3])
+            data = rest[4:4 + length]
+        elif fields[1].isdigit() and fields[4] == "d":
+            # time channel id dir d dlc data...
+            can_id = fields[2]
+            data = fields[6:6 + int(fields[5], 16)]
+        else:
+            continue  # Error frames, remote frames, events and statistics
+        extended = can_id.endswith(("x", "X"))
+        frame_id = int(can_id.rstrip("xX"), base)
+        if extended:
+            frame_id |= EFF_FLAG
+        yield timestamp, frame_id, bytes.fromhex("".join(data))
+
+def read_blf(path):
+    """Yield (timestamp, frame_id, data) from a BLF file (needs python-can)"""
+    import can
+
+    with can.BLFReader(path) as reader:
+        for message in reader:
+            if message.is_error_frame or message.is_remote_frame:
+                continue
+            frame_id = message.arbitration_id
+            if message.is_extended_id:
+                frame_id |= EFF_FLAG
+            yield message.timestamp, frame_id, bytes(message.data)
+
+def read_frames(path, fmt=None):
+    """Lazily yield (timestamp, frame_id, data) from a capture file"""
+    fmt = fmt or detect_format(path)
+    if fmt == 'blf':
+        yield from read_blf(path)
+        return
+    parse = parse_asc if fmt == 'asc' else parse_candump
+    with open_text(path) as lines:
+        yield from parse(lines)
+
+def batches(frames, size=BATCH_FRAMES):
+    """Group (timestamp, frame_id, data) tuples into (times, frame_ids, dlcs, payloads) arrays"""
+    padding = bytes(FRAME_BYTES)
+    times, frame_ids, dlcs = [], [], []
+    data = bytearray()
+    for timestamp, frame_id, payload in frames:
+        times.append(timestamp)
+        frame_ids.append(frame_id)
+        dlcs.append(len(payload))
+        # Pad/truncate to the classic 8-byte frame the codecs work on
+        data += payload[:FRAME_BYTES] + padding[len(payload):]
+        if len(times) == size:
+            yield _batch(times, frame_ids, dlcs, data)
+            times, frame_ids, dlcs = [], [], []
+            data = bytearray()
+    if times:
+        yield _batch(times, frame_ids, dlcs, data)
+
+def _batch(times, frame_ids, dlcs, data):
+    return (np.array(times, dtype=np.float64), np.array(frame_ids, dtype=np.uint32),
+            np.minimum(dlcs, 255).astype(np.uint8),
+            np.frombuffer(bytes(data), np.uint8).reshape(len(times), FRAME_BYTES))
+
+def decoded(database, chunks):
+    """Yield {message name: (times, {signal: physical values})} per batch"""
+    for times, frame_ids, _, payloads in chunks:
+        result = {}
+        for frame_id, (rows, values) in database.decode_frames(frame_ids, payloads).items():
+            result[database[frame_id].name] = (times[rows], values)
+        yield result
+
+class CaptureLog:
+    """A capture file read like a TrafficLog: time-ordered batches, never loaded whole"""
+
+    def __init__(self, path, database=os.path.join(CAN_DIR, "steering.dbc"), fmt=None, size=BATCH_FRAMES):
+        self.path = path
+        self.fmt = fmt or detect_format(path)
+        self.size = size
+        self.metadata = {"database": database, "format": self.fmt}
+        self._start = None
+
+    @property
+    def start(self):
+        if self._start is None:
+            frames = read_frames(self.path, self.fmt)
+            first = next(frames, None)
+            frames.close()
+            self._start = first[0] if first is not None else 0.0
+        return self._start
+
+    def chunks(self, start=None, end=None):
+        """Yield (times, frame_ids, dlcs, payloads) between start and end"""
+        for times, frame_ids, dlcs, payloads in batches(read_frames(self.path, self.fmt), self.size):
+            if start is not None and times[-1] < start:
+                continue  # No index to seek with: skip whole batches cheaply
+            keep = np.ones(len(times), dtype=bool)
+            if start is not None:
+                keep &= times >= start
+            if end is not None:
+                keep &= times <= end
+            if keep.any():
+                yield times[keep], frame_ids[keep], dlcs[keep], payloads[keep]
+            if end is not None and times[-1] > end:
+                return
+
+    def close(self):
+        pass
+
+def write_candump(path, times, frame_ids, payloads, interface="can0"):
+    """Write frames in candump -l format"""
+    with open(path, "w") as out:
+        for t, frame_id, data in zip(times.tolist(), frame_ids.tolist(), payloads):
+            out.write(f"({t:.6f}) {interface} {frame_id:03X}#{data.tobytes().hex().upper()}\n")
+
+def synthesize(path, frames, rate=1000.0):
+    """Write a candump capture of alternating steering command/status frames"""
+    from signal_source import generate_command
+
+    codec = load_database(os.path.join(CAN_DIR, "steering.dbc"))
+    command, status = codec["SteeringCommand"], codec["SteeringStatus"]
+    t = 1_700_000_000.0 + np.arange(frames) / rate
+    angle = np.array([generate_command(x) for x in t[::2] - t[0]])
+    payloads = np.empty((frames, FRAME_BYTES), dtype=np.uint8)
+    payloads[0::2] = command.encode({"SteeringAngle": angle, "SteeringSpeed": 100})[:len(t[0::2])]
+    payloads[1::2] = status.encode({"CurrentAngle": angle, "ECU_Ready": 1})[:len(t[1::2])]
+    frame_ids = np.where(np.arange(frames) % 2, status.frame_id, command.frame_id)
+    write_candump(path, t, frame_ids, payloads)
+
+def main():
+    parser = argparse.ArgumentParser(description="Import candump/ASC/BLF captures")
+    parser.add_argument("capture", help="capture file (.log/.asc/.blf, optionally .gz)")
+    parser.add_argument("--format", choices=FORMATS, help="override the format guessed from the name")
+    parser.add_argument("--dbc", default="steering.dbc",
+                        help="database to decode with: steering.dbc, test.dbc, diagnostics.dbc or a path")
+    parser.add_argument("--to", metavar="LOG",
+                        help="convert to a traffic_log.py recording (replay it, or view it with --replay)")
+    parser.add_argument("--publish", metavar="BROKER",
+                        help="replay the decoded frames to this broker URL")
+    parser.add_argument("--speed", default="max", help="with --publish: 1, 10, ... or max")
+    parser.add_argument("--batch", type=int, default=BATCH_FRAMES, help="frames per batch")
+    parser.add_argument("--synthesize", type=int, metavar="FRAMES",
+                        help="first write a candump capture of FRAMES steering frames to CAPTURE")
+    args = parser.parse_args()
+
+    if args.synthesize:
+        synthesize(args.capture, args.synthesize)
+
+    dbc = args.dbc if os.path.exists(args.dbc) else os.path.join(CAN_DIR, args.dbc)
+    database = load_database(dbc)
+    capture = CaptureLog(args.capture, dbc, args.format, args.batch)
+    print(f"📂 {args.capture} ({capture.fmt}, {os.path.getsize(args.capture) / 1e6:.1f} MB) "
+          f"decoded with {os.path.basename(dbc)}")
+
+    counts = {}
+    frames = 0
+    start = time.perf_counter()
+    try:
+        if args.publish:
+            import math
+            from broker_link import connect
+            from traffic_log import BrokerSink, replay
+
+            link = connect(args.publish)
+            speed = math.inf if args.speed == "max" else float(args.speed)
+            frames = replay(capture, BrokerSink(link, database), speed)
+            link.close()
+        elif args.to:
+            from traffic_log import TrafficRecorder
+
+            recorder = TrafficRecorder(args.to, dbc)
+            for times, frame_ids, dlcs, payloads in capture.chunks():
+                recorder.append_payloads(times, frame_ids, payloads, dlcs)
+                frames += len(times)
+            recorder.close()
+        else:
+            for chunk in capture.chunks():
+                frames += len(chunk[0])
+                for name, (times, _) in next(decoded(database, [chunk])).items():
+                    counts[name] = counts.get(name, 0) + len(times)
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Import stopped")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        elapsed = time.perf_counter() - start
+        for name, count in sorted(counts.items()):
+            print(f"   {name:32s} {count:12,d}")
+        if counts and frames > sum(counts.values()):
+            print(f"   {'(not in database)':32s} {frames - sum(counts.values()):12,d}")
+        if args.to:
+            print(f"📝 Wrote {args.to} ({os.path.getsize(args.to) / 1e6:.1f} MB)")
+        print(f"⚡ {frames:,} frames in {elapsed:.2f}s ({frames / max(elapsed, 1e-9):,.0f} frames/s)")
+
+if __name__ == "__main__":
+    main()
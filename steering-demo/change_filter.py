@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Publish-side Change Filter
+Sends only the signals that moved past their deadband (plus a periodic
+heartbeat of the full frame) and counts the bandwidth that saved
+"""
+
+import argparse
+import math
+import time
+
+HEARTBEAT = 1.0  # Longest a frame goes unsent, even when nothing changed
+SIGNAL_OVERHEAD = 4  # Bytes a signal costs on the wire besides its payload (id, length)
+
+def parse_deadbands(text):
+    """{signal name or DBC unit: physical deadband} from "degrees=0.5,SteeringSpeed=2" """
+    deadbands = {}
+    for item in (text or "").split(","):
+        if item:
+            key, _, value = item.partition("=")
+            deadbands[key] = float(value)
+    return deadbands
+
+class ChangeStats:
+    """Offered versus sent frames, signals and bytes, shared by a link's filters"""
+
+    def __init__(self):
+        self.frames_in = 0
+        self.frames_out = 0
+        self.signals_in = 0
+        self.signals_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.heartbeats = 0
+
+    def report(self):
+        saved = self.bytes_in - self.bytes_out
+        return {
+            'frames_offered': self.frames_in,
+            'frames_sent': self.frames_out,
+            'signals_offered': self.signals_in,
+            'signals_sent': self.signals_out,
+            'heartbeats': self.heartbeats,
+            'bytes_offered': self.bytes_in,
+            'bytes_sent': self.bytes_out,
+            'bytes_saved': saved,
+            'saved_pct': 100.0 * saved / self.bytes_in if self.bytes_in else 0.0,
+        }
+
+    def format(self):
+        r = self.report()
+        return (f"sent {r['signals_sent']:,}/{r['signals_offered']:,} signals in "
+                f"{r['frames_sent']:,}/{r['frames_offered']:,} frames "
+                f"({r['heartbeats']:,} heartbeats) | {r['bytes_saved']:,} of {r['bytes_offered']:,} "
+                f"bytes saved ({r['saved_pct']:.1f}%)")
+
+class FrameState:
+    """Thresholds and last-sent raw values for one frame of one publisher"""
+
+    def __init__(self, message, deadbands):
+        self.steps = {}  # signal -> smallest raw change that is sent
+        self.cost = {}  # signal -> bytes on the wire
+        for i, name in enumerate(message.names):
+            factor = abs(float(message.factors[i])) or 1.0
+            # A signal's own entry wins over its unit's; the default is one raw step (lossless)
+            deadband = deadbands.get(name, deadbands.get(message.units[i], factor))
+            self.steps[name] = max(1, math.ceil(deadband / factor - 1e-9))
+            self.cost[name] = SIGNAL_OVERHEAD + math.ceil(int(message.lengths[i]) / 8)
+        self.last = {}
+        self.sent_at = None
+
+class ChangeFilter:
+    """Publisher wrapper that forwards only changed signals, one publish per frame
+
+    Raw values are compared with the last value actually sent, so a slow
+    drift is still sent once it adds up to the deadband. Every heartbeat
+    seconds a frame is sent in full regardless, so late subscribers and
+    on-change consumers always converge. Frames the database does not
+    know pass through untouched.
+    """
+
+    def __init__(self, publisher, database=None, deadbands=None, heartbeat=HEARTBEAT, clock=None,
+                 stats=None):
+        self.publisher = publisher
+        if database is None:
+            from dbc_codec import steering_codec
+
+            database = steering_codec()
+        self.database = database
+        self.deadbands = deadbands or {}
+        self.heartbeat = heartbeat
+        self.now = clock.time if clock is not None else time.monotonic
+        self.stats = stats or ChangeStats()
+        self._frames = {}
+
+    def _state(self, frame):
+        state = self._frames.get(frame)
+        if state is None:
+            message = self.database.get(frame)
+            state = self._frames[frame] = FrameState(message, self.deadbands) if message else False
+        return state
+
+    def _changed(self, frame, values):
+        """The part of values worth sending now (possibly empty)"""
+        stats = self.stats
+        stats.frames_in += 1
+        stats.signals_in += len(values)
+        state = self._state(frame)
+        if not state:
+            cost = SIGNAL_OVERHEAD * len(values)
+            stats.bytes_in += cost
+            stats.bytes_out += cost
+            stats.frames_out += 1
+            stats.signals_out += len(values)
+            return values
+        cost = state.cost
+        stats.bytes_in += sum(cost.get(name, SIGNAL_OVERHEAD) for name in values)
+
+        now = self.now()
+        last = state.last
+        if state.sent_at is None or now - state.sent_at >= self.heartbeat:
+            changed = values
+            state.sent_at = now
+            stats.heartbeats += 1
+        else:
+            steps = state.steps
+            changed = {name: value for name, value in values.items()
+                       if name not in last or abs(value - last[name]) >= steps.get(name, 1)}
+        if changed:
+            last.update(changed)
+            stats.frames_out += 1
+            stats.signals_out += len(changed)
+            stats.bytes_out += sum(cost.get(name, SIGNAL_OVERHEAD) for name in changed)
+        return changed
+
+    def publish(self, frame, values):
+        changed = self._changed(frame, values)
+        if changed:
+            self.publisher.publish(frame, changed)
+
+    def publish_batch(self, frames):
+        """Filter each frame and send whatever is left as one batch"""
+        batch = []
+        for frame, values in frames:
+            changed = self._changed(frame, values)
+            if changed:
+                batch.append((frame, changed))
+        if batch:
+            self.publisher.publish_batch(batch)
+
+class ChangeFilterLink:
+    """Broker link whose publishers are all change-filtered; everything else is passed through"""
+
+    def __init__(self, link, database=None, deadbands=None, heartbeat=HEARTBEAT, clock=None):
+        self.link = link
+        if database is None:
+            from dbc_codec import steering_codec
+
+            database = steering_codec()
+        self.database = database
+        self.deadbands = deadbands or {}
+        self.heartbeat = heartbeat
+        self.clock = clock
+        self.stats = ChangeStats()
+
+    def publisher(self, client_id, signals, namespace=None):
+        return ChangeFilter(self.link.publisher(client_id, signals, namespace), self.database,
+                            self.deadbands, self.heartbeat, self.clock, self.stats)
+
+    def subscribe(self, client_id, signals, on_frame, on_change=True, namespace=None):
+        return self.link.subscribe(client_id, signals, on_frame, on_change, namespace)
+
+    def list_signals(self, namespace=None):
+        return self.link.list_signals(namespace)
+
+    def close(self):
+        self.link.close()
+
+def add_change_arguments(parser):
+    """The --on-change/--deadband/--heartbeat options shared by the publishing scripts"""
+    parser.add_argument("--on-change", action="store_true",
+                        help="only publish signals that changed (plus a full frame every --heartbeat)")
+    parser.add_argument("--deadband", default="",
+                        help="with --on-change: physical deadbands by signal or DBC unit, e.g. "
+                             "degrees=0.5,SteeringSpeed=2 (default: any raw change)")
+    parser.add_argument("--heartbeat", type=float, default=HEARTBEAT,
+                        help="with --on-change: seconds after which a frame is resent in full")
+
+def apply_change_arguments(link, args, clock=None):
+    """link, wrapped in a ChangeFilterLink when --on-change was given"""
+    if not args.on_change:
+        return link
+    return ChangeFilterLink(link, deadbands=parse_deadbands(args.deadband), heartbeat=args.heartbeat,
+                            clock=clock)
+
+def simulate(duration, fleet, deadbands, heartbeat):
+    """Sine publisher, ECU and a parked fleet on a fast SimClock, with every publisher filtered"""
+    from broker_link import connect
+    from ecu_fleet import FleetService
+    from ecu_simulator import ClockedECUService, STATUS_PERIOD
+    from publisher import COMMAND_SIGNALS, SineCommander
+    from sim_clock import SimClock
+
+    clock = SimClock()
+    link = ChangeFilterLink(connect(f"local://change-filter-{id(clock)}"), deadbands=deadbands,
+                            heartbeat=heartbeat, clock=clock)
+    commander = SineCommander(link.publisher("steering_gateway", COMMAND_SIGNALS), verbose=False)
+    ecu = ClockedECUService(link, clock)
+    clock.every(0.5, lambda now: commander.send())
+    ecu.schedule()
+    if fleet:
+        service = FleetService(link, fleet)
+
+        def fleet_tick(now):
+            service.fleet.update(STATUS_PERIOD)
+            service.publish_status()
+        clock.every(STATUS_PERIOD, fleet_tick, offset=STATUS_PERIOD)
+    clock.run(duration)
+    link.close()
+    return link.stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish-side change filter")
+    parser.add_argument("--duration", type=float, default=600.0, help="simulated seconds")
+    parser.add_argument("--fleet", type=int, default=100,
+                        help="parked fleet ECUs publishing status alongside the demo pair")
+    parser.add_argument("--deadband", default="", help="physical deadbands by signal or DBC unit")
+    parser.add_argument("--heartbeat", type=float, default=HEARTBEAT,
+                        help="seconds after which a frame is resent in full")
+    args = parser.parse_args()
+
+    print(f"🗜️  Change filter: {args.duration:.0f} simulated seconds, sine publisher + ECU "
+          f"+ {args.fleet} parked fleet ECUs, heartbeat {args.heartbeat:g}s")
+    try:
+        start = time.perf_counter()
+        stats = simulate(args.duration, args.fleet, parse_deadbands(args.deadband), args.heartbeat)
+        print(f"✓ {stats.format()}")
+        print(f"   simulated in {time.perf_counter() - start:.2f}s")
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Simulation stopped")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    main()
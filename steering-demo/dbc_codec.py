@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+DBC Codec
+Parses a DBC file once, compiles every message layout into masks and shifts,
+and encodes/decodes whole NumPy arrays of CAN frames in one call
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CAN_DIR = os.path.join(HERE, "..", "broker-setup", "configuration", "can")
+STEERING_DBC = os.path.join(CAN_DIR, "steering.dbc")
+TEST_DBC = os.path.join(CAN_DIR, "test.dbc")
+DIAGNOSTICS_DBC = os.path.join(CAN_DIR, "diagnostics.dbc")
+
+CACHE_DIR = os.environ.get("STEERING_DEMO_CACHE",
+                           os.path.join(os.path.expanduser("~"), ".cache", "steering-demo"))
+CACHE_VERSION = 2
+FRAME_BYTES = 8  # Classic CAN payload, padded
+
+NODES_RE = re.compile(r"^BU_\s*:(.*)$")
+MESSAGE_RE = re.compile(r"^BO_\s+(\d+)\s+(\w+)\s*:\s*(\d+)\s+(\w+)")
+SIGNAL_RE = re.compile(
+    r"^SG_\s+(\w+)\s*(?:\w+\s*)?:\s*(\d+)\|(\d+)@([01])([+-])\s*"
+    r"\(\s*([^,\s]+)\s*,\s*([^)\s]+)\s*\)\s*"
+    r"\[\s*([^|\s]+)\s*\|\s*([^\]\s]+)\s*\]\s*"
+    r"\"([^\"]*)\"\s*(.*)$")
+
+class Signal:
+    def __init__(self, name, start, length, little_endian, signed,
+                 factor=1.0, offset=0.0, minimum=0.0, maximum=0.0, unit="", receivers=()):
+        self.name = name
+        self.start = start
+        self.length = length
+        self.little_endian = little_endian
+        self.signed = signed
+        self.factor = factor
+        self.offset = offset
+        self.minimum = minimum
+        self.maximum = maximum
+        self.unit = unit
+        self.receivers = tuple(receivers)
+
+    def shift(self):
+        """Right-shift that aligns the signal LSB within its 64-bit frame word"""
+        if self.little_endian:
+            # Intel: start bit is the LSB, counted from bit 0 of byte 0
+            return self.start
+        # Motorola: start bit is the MSB in sawtooth numbering; the frame is
+        # read as a big-endian word where byte 0 holds the top 8 bits
+        msb = (self.start // 8) * 8 + (7 - self.start % 8)
+        return 63 - (msb + self.length - 1)
+
+class Message:
+    def __init__(self, frame_id, name, dlc, transmitter, signals=None):
+        self.frame_id = frame_id
+        self.name = name
+        self.dlc = dlc
+        self.transmitter = transmitter
+        self.signals = signals or []
+
+def parse_dbc(text):
+    """Parse BU_/BO_/SG_ definitions; returns (nodes, messages)"""
+    nodes = []
+    messages = []
+    current = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("BU_"):
+            match = NODES_RE.match(line)
+            if match:
+                nodes = match.group(1).split()
+        elif line.startswith("BO_ "):
+            match = MESSAGE_RE.match(line)
+            current = None
+            if match:
+                frame_id, name, dlc, transmitter = match.groups()
+                current = Message(int(frame_id), name, int(dlc), transmitter)
+                messages.append(current)
+        elif line.startswith("SG_ ") and current is not None:
+            match = SIGNAL_RE.match(line)
+            if not match:
+                raise ValueError(f"Cannot parse signal line: {line}")
+            (name, start, length, order, sign, factor, offset,
+             minimum, maximum, unit, receivers) = match.groups()
+            current.signals.append(Signal(
+                name, int(start), int(length), order == "1", sign == "-",
+                float(factor), float(offset), float(minimum), float(maximum), unit,
+                [r.strip() for r in receivers.split(",") if r.strip()]))
+        elif not line:
+            current = None
+    return nodes, messages
+
+class CompiledMessage:
+    """Precomputed masks/shifts for one message; all signals decode in one pass"""
+
+    def __init__(self, frame_id, name, dlc, transmitter, names, shifts, lengths,
+                 little, signed, factors, offsets, minimums, maximums, units, receivers):
+        self.frame_id = frame_id
+        self.name = name
+        self.dlc = dlc
+        self.transmitter = transmitter
+        self.names = list(names)
+        self.index = {n: i for i, n in enumerate(self.names)}
+        self.shifts = np.asarray(shifts, dtype=np.uint64)
+        self.lengths = np.asarray(lengths, dtype=np.uint64)
+        self.little = np.asarray(little, dtype=bool)
+        self.signed = np.asarray(signed, dtype=bool)
+        self.factors = np.asarray(factors, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.float64)
+        self.minimums = np.asarray(minimums, dtype=np.float64)
+        self.maximums = np.asarray(maximums, dtype=np.float64)
+        self.units = list(units)
+        self.receivers = [tuple(r) for r in receivers]
+
+        # 64-bit signals need the full mask; 1 << 64 would overflow
+        self.masks = np.array([(1 << int(n)) - 1 for n in self.lengths], dtype=np.uint64)
+        self.sign_bits = np.array([1 << (int(n) - 1) for n in self.lengths], dtype=np.uint64)
+        self.raw_min = np.where(self.signed, -(self.sign_bits.astype(np.float64)), 0.0)
+        self.raw_max = np.where(self.signed, self.sign_bits.astype(np.float64) - 1,
+                                self.masks.astype(np.float64))
+        self.any_big = bool((~self.little).any())
+        self.any_signed = bool(self.signed.any())
+
+    @classmethod
+    def from_message(cls, message):
+        signals = message.signals
+        return cls(message.frame_id, message.name, message.dlc, message.transmitter,
+                   [s.name for s in signals], [s.shift() for s in signals],
+                   [s.length for s in signals], [s.little_endian for s in signals],
+                   [s.signed for s in signals], [s.factor for s in signals],
+                   [s.offset for s in signals], [s.minimum for s in signals],
+                   [s.maximum for s in signals], [s.unit for s in signals],
+                   [s.receivers for s in signals])
+
+    def _extract(self, payloads):
+        """(N, signals) uint64 raw bits, sign-extended for signed signals"""
+        payloads = as_payloads(payloads)
+        words = payloads.view("<u8")  # (N, 1)
+        if self.any_big:
+            big = payloads.view(">u8").astype(np.uint64)
+            words = np.where(self.little[None, :], words, big)
+        raw = (words >> self.shifts[None, :]) & self.masks[None, :]
+        if self.any_signed:
+            negative = self.signed[None, :] & ((raw & self.sign_bits[None, :]) != 0)
+            # Sign-extend by OR-ing in the bits above the signal
+            raw = np.where(negative, raw | ~self.masks[None, :], raw)
+        return raw
+
+    def decode_raw(self, payloads):
+        """Decode (N, 8) uint8 payloads into an (N, signals) int64 array of raw values"""
+        return self._extract(payloads).view(np.int64)
+
+    def decode(self, payloads):
+        """Decode payloads into {signal: float64 array of physical values}"""
+        raw = self._extract(payloads)
+        if self.any_signed:
+            numbers = np.where(self.signed[None, :], raw.view(np.int64).astype(np.float64),
+                               raw.astype(np.float64))
+        else:
+            numbers = raw.astype(np.float64)
+        physical = numbers * self.factors[None, :] + self.offsets[None, :]
+        return {name: physical[:, i] for i, name in enumerate(self.names)}
+
+    def encode(self, values, count=None):
+        """Encode {signal: physical values} into (N, 8) uint8 payloads"""
+        raws = {}
+        for name, physical in values.items():
+            i = self.index[name]
+            raw = np.rint((np.asarray(physical, dtype=np.float64) - self.offsets[i]) / self.factors[i])
+            raw = np.clip(raw, self.raw_min[i], self.raw_max[i])
+            if self.signed[i]:
+                raws[name] = raw.astype(np.int64).astype(np.uint64)
+            else:
+                raws[name] = raw.astype(np.uint64)
+        return self.encode_raw(raws, count)
+
+    def encode_raw(self, values, count=None):
+        """Encode {signal: raw integer values} into (N, 8) uint8 payloads"""
+        if count is None:
+            count = max((np.size(v) for v in values.values()), default=1)
+        little_word = np.zeros(count, dtype=np.uint64)
+        big_word = np.zeros(count, dtype=np.uint64)
+        for name, raw in values.items():
+            i = self.index[name]
+            raw = np.asarray(raw)
+            if raw.dtype != np.uint64:
+                raw = raw.astype(np.int64).astype(np.uint64)
+            bits = (raw & self.masks[i]) << self.shifts[i]
+            if self.little[i]:
+                little_word |= bits
+            else:
+                big_word |= bits
+        payloads = little_word.astype("<u8").view(np.uint8).reshape(count, FRAME_BYTES)
+        if self.any_big:
+            payloads |= big_word.astype(">u8").view(np.uint8).reshape(count, FRAME_BYTES)
+        return payloads
+
+    def decode_one(self, payload):
+        """Decode a single payload into {signal: float}"""
+        decoded = self.decode(payload)
+        return {name: float(column[0]) for name, column in decoded.items()}
+
+    def encode_one(self, values):
+        """Encode {signal: float} into one bytes payload of dlc length"""
+        return self.encode(values, count=1)[0, :self.dlc].tobytes()
+
+    def to_raw(self, name, physical):
+        """Scale one physical value to the integer raw value the broker carries"""
+        i = self.index[name]
+        raw = round((physical - self.offsets[i]) / self.factors[i])
+        return int(min(max(raw, self.raw_min[i]), self.raw_max[i]))
+
+    def to_raw_many(self, name, physical):
+        """Vectorized to_raw for an array of physical values (same rounding and clamping)"""
+        i = self.index[name]
+        raw = np.round((np.asarray(physical, dtype=np.float64) - self.offsets[i]) / self.factors[i])
+        return np.clip(raw, self.raw_min[i], self.raw_max[i]).astype(np.int64)
+
+    def to_physical(self, name, raw):
+        """Scale one raw value back to physical units"""
+        i = self.index[name]
+        return raw * float(self.factors[i]) + float(self.offsets[i])
+
+class CompiledDatabase:
+    """All compiled messages of one DBC, looked up by frame id or name
+
+    The layout is held as flat arrays (the same form that is cached on disk);
+    per-message codecs are built on first use, so loading a large cached
+    database does not pay for messages that are never decoded.
+    """
+
+    def __init__(self, messages=(), nodes=(), source=None, arrays=None):
+        if arrays is None:
+            arrays = flatten_messages(messages, nodes)
+        self.arrays = arrays
+        self.source = source
+        self.nodes = [str(n) for n in arrays['nodes']]
+        self.frame_ids = arrays['msg_id']
+        self.names = [str(n) for n in arrays['msg_name']]
+        self._index_by_id = dict(zip(self.frame_ids.tolist(), range(len(self.names))))
+        self._index_by_name = {name: i for i, name in enumerate(self.names)}
+        self._compiled = {}
+        for index, message in enumerate(messages):
+            self._compiled[index] = message
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, key):
+        message = self.get(key)
+        if message is None:
+            raise KeyError(key)
+        return message
+
+    def __contains__(self, key):
+        return key in self._index_by_name or key in self._index_by_id
+
+    def get(self, key, default=None):
+        """Compiled message for a frame id or message name"""
+        if isinstance(key, str):
+            index = self._index_by_name.get(key)
+        else:
+            index = self._index_by_id.get(int(key))
+        if index is None:
+            return default
+        return self.message(index)
+
+    def message(self, index):
+        """Compiled message at position index, built on first use"""
+        compiled = self._compiled.get(index)
+        if compiled is None:
+            a = self.arrays
+            first = int(a['msg_first'][index])
+            rows = slice(first, first + int(a['msg_count'][index]))
+            compiled = CompiledMessage(
+                int(a['msg_id'][index]), self.names[index],
+                int(a['msg_dlc'][index]), str(a['msg_tx'][index]),
+                [str(n) for n in a['sig_name'][rows]], a['sig_shift'][rows],
+                a['sig_length'][rows], a['sig_little'][rows], a['sig_signed'][rows],
+                a['sig_factor'][rows], a['sig_offset'][rows], a['sig_min'][rows],
+                a['sig_max'][rows], [str(u) for u in a['sig_unit'][rows]],
+                [tuple(r for r in str(rx).split(",") if r) for rx in a['sig_rx'][rows]])
+            self._compiled[index] = compiled
+        return compiled
+
+    @property
+    def messages(self):
+        return [self.message(i) for i in range(len(self.names))]
+
+    def routes(self):
+        """Yield (frame_id, name, transmitter, receivers) without building codecs"""
+        a = self.arrays
+        receivers = a['sig_rx'].tolist()
+        for index, (frame_id, first, count, tx) in enumerate(zip(
+                a['msg_id'].tolist(), a['msg_first'].tolist(),
+                a['msg_count'].tolist(), a['msg_tx'].tolist())):
+            rx = set()
+            for entry in receivers[first:first + count]:
+                rx.update(r for r in entry.split(",") if r)
+            yield frame_id, self.names[index], tx, rx
+
+    def decode_frames(self, frame_ids, payloads):
+        """Decode a mixed stream; returns {frame_id: (row indices, {signal: values})}"""
+        frame_ids = np.asarray(frame_ids)
+        payloads = as_payloads(payloads)
+        result = {}
+        for frame_id in np.unique(frame_ids):
+            message = self.get(int(frame_id))
+            if message is None:
+                continue
+            rows = np.flatnonzero(frame_ids == frame_id)
+            result[int(frame_id)] = (rows, message.decode(payloads[rows]))
+        return result
+
+    def to_arrays(self):
+        """The compiled layout as plain arrays (the on-disk form)"""
+        return self.arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, source=None):
+        """Wrap arrays produced by to_arrays()"""
+        return cls(arrays={key: arrays[key] for key in arrays.keys()}, source=source)
+
+def flatten_messages(messages, nodes=()):
+    """Flatten compiled messages into the array layout used on disk"""
+    first, count, names, shifts, lengths, little, signed = [], [], [], [], [], [], []
+    factors, offsets, minimums, maximums, units, receivers = [], [], [], [], [], []
+    for m in messages:
+        first.append(len(names))
+        count.append(len(m.names))
+        names += m.names
+        shifts += m.shifts.tolist()
+        lengths += m.lengths.tolist()
+        little += m.little.tolist()
+        signed += m.signed.tolist()
+        factors += m.factors.tolist()
+        offsets += m.offsets.tolist()
+        minimums += m.minimums.tolist()
+        maximums += m.maximums.tolist()
+        units += m.units
+        receivers += [",".join(r) for r in m.receivers]
+    return {
+        'version': np.array([CACHE_VERSION]),
+        'nodes': np.array(list(nodes), dtype=str),
+        'msg_id': np.array([m.frame_id for m in messages], dtype=np.int64),
+        'msg_name': np.array([m.name for m in messages], dtype=str),
+        'msg_dlc': np.array([m.dlc for m in messages], dtype=np.int64),
+        'msg_tx': np.array([m.transmitter for m in messages], dtype=str),
+        'msg_first': np.array(first, dtype=np.int64),
+        'msg_count': np.array(count, dtype=np.int64),
+        'sig_name': np.array(names, dtype=str),
+        'sig_shift': np.array(shifts, dtype=np.uint64),
+        'sig_length': np.array(lengths, dtype=np.uint64),
+        'sig_little': np.array(little, dtype=bool),
+        'sig_signed': np.array(signed, dtype=bool),
+        'sig_factor': np.array(factors, dtype=np.float64),
+        'sig_offset': np.array(offsets, dtype=np.float64),
+        'sig_min': np.array(minimums, dtype=np.float64),
+        'sig_max': np.array(maximums, dtype=np.float64),
+        'sig_unit': np.array(units, dtype=str),
+        'sig_rx': np.array(receivers, dtype=str),
+    }
+
+def as_payloads(payloads):
+    """Coerce bytes / lists / arrays into a contiguous (N, 8) uint8 array"""
+    if isinstance(payloads, (bytes, bytearray, memoryview)):
+        payloads = np.frombuffer(bytes(payloads), dtype=np.uint8)[None, :]
+    payloads = np.asarray(payloads, dtype=np.uint8)
+    if payloads.ndim == 1:
+        payloads = payloads[None, :]
+    if payloads.shape[1] != FRAME_BYTES:
+        padded = np.zeros((payloads.shape[0], FRAME_BYTES), dtype=np.uint8)
+        width = min(FRAME_BYTES, payloads.shape[1])
+        padded[:, :width] = payloads[:, :width]
+        payloads = padded
+    return np.ascontiguousarray(payloads)
+
+def compile_dbc(text, source=None):
+    """Parse and compile DBC text (no caching)"""
+    nodes, messages = parse_dbc(text)
+    return CompiledDatabase([CompiledMessage.from_message(m) for m in messages], nodes, source)
+
+def cache_path(path, digest, cache_dir=None):
+    """Cache directory for a source file with the given content hash and cache format"""
+    name = os.path.basename(path)
+    return os.path.join(cache_dir or CACHE_DIR, f"{name}-v{CACHE_VERSION}-{digest[:16]}")
+
+def save_arrays(directory, arrays):
+    """Write one .npy per array so the cache can be memory-mapped back"""
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    tmp = f"{directory}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    for key, value in arrays.items():
+        np.save(os.path.join(tmp, f"{key}.npy"), np.asarray(value))
+    try:
+        os.replace(tmp, directory)
+    except OSError:
+        # Another process published the same content first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def map_arrays(directory):
+    """Memory-map every array of a cache directory (pages load on first touch)"""
+    arrays = {}
+    for entry in os.listdir(directory):
+        if entry.endswith(".npy"):
+            arrays[entry[:-4]] = np.load(os.path.join(directory, entry),
+                                         mmap_mode="r", allow_pickle=False)
+    return arrays
+
+def load_compiled(path, compile_text, cache_dir=None, use_cache=True):
+    """Compile a signal database file, reusing the cached form while its content hash matches"""
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    cached = cache_path(path, digest, cache_dir)
+
+    stale = False
+    if use_cache and os.path.isdir(cached):
+        try:
+            arrays = map_arrays(cached)
+            if int(arrays['version'][0]) == CACHE_VERSION:
+                return CompiledDatabase(arrays=arrays, source=path)
+            stale = True
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Replacing unreadable codec cache {cached}: {e}")
+            stale = True
+
+    database = compile_text(data.decode("latin-1"), path)
+    if use_cache:
+        try:
+            if stale:
+                # save_arrays cannot publish over a non-empty directory
+                shutil.rmtree(cached)
+            save_arrays(cached, database.to_arrays())
+        except OSError as e:
+            print(f"⚠️  Could not write codec cache {cached}: {e}")
+    return database
+
+def load_dbc(path, cache_dir=None, use_cache=True):
+    """Load a compiled DBC, reusing the on-disk compiled form when the file is unchanged"""
+    return load_compiled(path, compile_dbc, cache_dir, use_cache)
+
+def load_database(path, cache_dir=None, use_cache=True):
+    """Load a .dbc or JSON signal database into the same compiled form"""
+    if path.lower().endswith(".json"):
+        from json_signal_db import load_signal_json
+        return load_signal_json(path, cache_dir, use_cache)
+    return load_dbc(path, cache_dir, use_cache)
+
+_loaded = {}
+
+def steering_codec():
+    """Shared compiled steering.dbc (SteeringCommand / SteeringStatus)"""
+    if STEERING_DBC not in _loaded:
+        _loaded[STEERING_DBC] = load_dbc(STEERING_DBC)
+    return _loaded[STEERING_DBC]
+
+def benchmark(path, frames=1_000_000):
+    """Time compile/cached load and vectorized encode/decode of every message"""
+    start = time.perf_counter()
+    database = load_database(path, use_cache=False)
+    compile_s = time.perf_counter() - start
+    load_database(path)
+    start = time.perf_counter()
+    load_database(path)
+    cached_s = time.perf_counter() - start
+    print(f"📚 {os.path.basename(path)}: {len(database.messages)} messages | "
+          f"compile {compile_s * 1000:.2f} ms | cached load {cached_s * 1000:.2f} ms")
+
+    rng = np.random.default_rng(0)
+    payloads = rng.integers(0, 256, size=(frames, FRAME_BYTES), dtype=np.uint8)
+    for message in database.messages:
+        if not message.names:
+            continue
+        start = time.perf_counter()
+        decoded = message.decode(payloads)
+        decode_s = time.perf_counter() - start
+        start = time.perf_counter()
+        encoded = message.encode(decoded)
+        encode_s = time.perf_counter() - start
+        # Bits outside the signals are not reproduced, so compare after re-decoding
+        roundtrip = all(np.array_equal(decoded[n], message.decode(encoded)[n]) for n in message.names)
+        print(f"   {message.name:<24} {len(message.names):3d} signals | "
+              f"decode {frames / decode_s / 1e6:6.2f} M frames/s | "
+              f"encode {frames / encode_s / 1e6:6.2f} M frames/s | "
+              f"round-trip {'✓' if roundtrip else '✗'}")
+
+def main():
+    paths = sys.argv[1:] or [STEERING_DBC, TEST_DBC]
+    for path in paths:
+        benchmark(path)
+
+if __name__ == "__main__":
+    main()
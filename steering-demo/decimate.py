@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Plot Decimation
+Reduces long signal histories to a bounded number of points before
+line.set_data - per-pixel min/max (keeps every spike) or LTTB
+"""
+
+import sys
+import time
+
+import numpy as np
+
+def minmax(x, y, buckets):
+    """Keep the min and max sample of each of buckets equal-count buckets
+
+    Two points per bucket (in time order) draw the same vertical extent a
+    full-resolution line would cover in that pixel column, so spikes
+    survive no matter how much is dropped.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    if buckets < 1 or n <= 2 * buckets + 2:
+        return x, y
+
+    size = -(-n // buckets)  # Ceiling: at most buckets rows
+    rows = n // size
+    body = y[:rows * size].reshape(rows, size)
+    base = np.arange(rows) * size
+    lo = body.argmin(axis=1) + base
+    hi = body.argmax(axis=1) + base
+    pairs = [np.minimum(lo, hi), np.maximum(lo, hi)]
+    if rows * size < n:
+        tail = y[rows * size:]
+        start = rows * size
+        pairs[0] = np.append(pairs[0], start + min(tail.argmin(), tail.argmax()))
+        pairs[1] = np.append(pairs[1], start + max(tail.argmin(), tail.argmax()))
+
+    index = np.column_stack(pairs).ravel()
+    # Always end on the newest sample so the trace reaches "now"
+    index = np.concatenate(([0], index, [n - 1]))
+    return x[index], y[index]
+
+def lttb(x, y, points):
+    """Largest-triangle-three-buckets downsampling to at most points samples
+
+    Picks, per bucket, the sample forming the largest triangle with the
+    previous pick and the next bucket's mean. Visually closer to the
+    original shape than min/max at the same point count, but a spike can
+    be dropped when a neighbour wins the bucket.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if points < 3 or n <= points:
+        return x, y
+
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    # Bucket means are independent of the picks, so compute them up front
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    index = np.empty(points, dtype=np.int64)
+    index[0] = 0
+    index[-1] = n - 1
+    picked = 0
+    for b in range(points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        ax, ay = x[picked], y[picked]
+        cx, cy = mean_x[b + 1], mean_y[b + 1]
+        area = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        picked = lo + int(area.argmax())
+        index[b + 1] = picked
+    return x[index], y[index]
+
+METHODS = {'minmax': minmax, 'lttb': lttb}
+
+def decimate(x, y, points, method='minmax'):
+    """Reduce (x, y) to roughly points samples with the named method"""
+    if method == 'minmax':
+        return minmax(x, y, max(1, points // 2))
+    return METHODS[method](x, y, points)
+
+def axes_points(ax, per_pixel=2):
+    """Point budget for a line spanning ax: per_pixel points per pixel column"""
+    return max(16, int(ax.bbox.width) * per_pixel)
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3600.0
+    rate = 200.0
+    t = np.arange(int(seconds * rate)) / rate
+    y = 500 * np.sin(t * 0.5) + 50 * np.sin(t * 2.3)
+    y[len(y) // 3] = 1900  # One-sample spike
+
+    print(f"📉 {len(y):,} samples ({seconds / 60:.0f} min at {rate:.0f} Hz) → 2000 points")
+    for method in METHODS:
+        start = time.perf_counter()
+        dx, dy = decimate(t, y, 2000, method)
+        elapsed = time.perf_counter() - start
+        print(f"   {method:6s}: {len(dx):5d} points in {elapsed * 1000:6.2f} ms | "
+              f"spike kept: {'yes' if dy.max() == y.max() else 'no'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Steering ECU Fleet
+Simulates many SteeringECU instances at once with NumPy state arrays, each
+ECU subscribing to commands and publishing status in its own namespace
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from broker_link import BROKER_URL, connect
+from change_filter import add_change_arguments, apply_change_arguments
+from dbc_codec import steering_codec
+from ecu_simulator import COMMAND_SIGNALS, MAX_RATE, STATUS_PERIOD, STATUS_SIGNALS, SteeringECU
+from metrics import REGISTRY, add_metrics_arguments, start_metrics
+from sim_clock import add_clock_arguments, make_clock
+
+NAMESPACE_PREFIX = "Steering"
+SNAP_DISTANCE = 1  # SteeringECU snaps to the target within this many degrees
+ANGLE_LIMIT = 2000
+
+FLEET_TRACKING_ERROR = REGISTRY.gauge("fleet_tracking_error_max_degrees",
+                                      "Largest |target_angle - current_angle| across the fleet")
+
+class SteeringFleet:
+    """count SteeringECUs advanced together; matches the scalar model bit for bit"""
+
+    def __init__(self, count):
+        self.count = count
+        self.current_angle = np.zeros(count)
+        self.target_angle = np.zeros(count)
+        self.ready = np.ones(count, dtype=bool)
+
+    def update(self, dt=0.1):
+        """Update all ECUs - same rate-limited slew as SteeringECU.update"""
+        diff = self.target_angle - self.current_angle
+        step = np.minimum(np.abs(diff), MAX_RATE * dt)
+        moving = np.abs(diff) > SNAP_DISTANCE
+        # Both branches are evaluated with the scalar model's exact operations
+        moved = np.where(diff > 0, self.current_angle + step, self.current_angle - step)
+        self.current_angle = np.where(moving, moved, self.target_angle)
+
+    def set_target(self, angle, index=None):
+        """Set new target angles (all ECUs, or those selected by index)"""
+        clamped = np.clip(angle, -ANGLE_LIMIT, ANGLE_LIMIT)
+        if index is None:
+            self.target_angle[:] = clamped
+        else:
+            self.target_angle[index] = clamped
+
+    def ecu(self, i):
+        """Scalar SteeringECU holding the state of fleet member i"""
+        ecu = SteeringECU()
+        ecu.current_angle = float(self.current_angle[i])
+        ecu.target_angle = float(self.target_angle[i])
+        ecu.ready = bool(self.ready[i])
+        return ecu
+
+class FleetService:
+    """Broker front-end for a fleet: per-namespace command subscriptions and status publishers"""
+
+    def __init__(self, link, count, prefix=NAMESPACE_PREFIX, period=STATUS_PERIOD):
+        self.link = link
+        self.fleet = SteeringFleet(count)
+        self.period = period
+        self.namespaces = [f"{prefix}{i:04d}" for i in range(count)]
+        codec = steering_codec()
+        self.command = codec["SteeringCommand"]
+        self.status = codec["SteeringStatus"]
+        self.commands = 0
+        self.published = 0
+        self.subscriptions = [
+            link.subscribe(f"steering_ecu_{i}", COMMAND_SIGNALS, self._on_command(i),
+                           on_change=True, namespace=namespace)
+            for i, namespace in enumerate(self.namespaces)]
+        self.publishers = [link.publisher(f"steering_ecu_status_{i}", STATUS_SIGNALS, namespace=namespace)
+                           for i, namespace in enumerate(self.namespaces)]
+
+    def _on_command(self, i):
+        def on_frame(frame, values, timestamp):
+            if "SteeringAngle" in values:
+                self.fleet.set_target(self.command.to_physical("SteeringAngle", values["SteeringAngle"]), i)
+                self.commands += 1
+        return on_frame
+
+    def publish_status(self):
+        """Publish one SteeringStatus per ECU in its own namespace"""
+        angles = self.status.to_raw_many("CurrentAngle", self.fleet.current_angle).tolist()
+        ready = self.fleet.ready.astype(int).tolist()
+        for publisher, angle, flag in zip(self.publishers, angles, ready):
+            publisher.publish("SteeringStatus", {"CurrentAngle": angle, "ECU_Ready": flag})
+        self.published += len(angles)
+
+    def run(self, duration=None, clock=None):
+        """Step and publish every period until duration elapses (or forever)"""
+        clock = clock or make_clock()
+        start = clock.time()
+        last = start
+        tick = 0
+        while duration is None or last - start < duration:
+            tick += 1
+            clock.sleep(start + tick * self.period - clock.time())
+            now = clock.time()
+            self.fleet.update(now - last)
+            last = now
+            self.publish_status()
+            FLEET_TRACKING_ERROR.set(float(np.abs(self.fleet.target_angle - self.fleet.current_angle).max()))
+
+    def close(self):
+        for subscription in self.subscriptions:
+            subscription.cancel()
+
+def verify(count=256, steps=500, seed=0):
+    """Run the fleet and scalar SteeringECUs side by side; return the number of mismatches"""
+    rng = np.random.default_rng(seed)
+    fleet = SteeringFleet(count)
+    ecus = [SteeringECU() for _ in range(count)]
+    mismatches = 0
+    for step in range(steps):
+        if step % 25 == 0:
+            # Includes out-of-range targets to exercise the clamp
+            targets = rng.uniform(-2500, 2500, count)
+            fleet.set_target(targets)
+            for ecu, target in zip(ecus, targets.tolist()):
+                ecu.set_target(target)
+        dt = float(rng.uniform(0.001, 0.2))
+        fleet.update(dt)
+        for ecu in ecus:
+            ecu.update(dt)
+        scalar = np.array([ecu.current_angle for ecu in ecus])
+        mismatches += int(np.count_nonzero(scalar != fleet.current_angle))
+    return mismatches
+
+def benchmark(count, steps=200):
+    """ECU-steps per second for the vectorized fleet"""
+    fleet = SteeringFleet(count)
+    fleet.set_target(np.random.default_rng(0).uniform(-2000, 2000, count))
+    start = time.perf_counter()
+    for _ in range(steps):
+        fleet.update(0.01)
+    return count * steps / (time.perf_counter() - start)
+
+def benchmark_scalar(count, steps=20):
+    """ECU-steps per second for a list of scalar SteeringECUs (the baseline)"""
+    ecus = [SteeringECU() for _ in range(count)]
+    for ecu, target in zip(ecus, np.random.default_rng(0).uniform(-2000, 2000, count).tolist()):
+        ecu.set_target(target)
+    start = time.perf_counter()
+    for _ in range(steps):
+        for ecu in ecus:
+            ecu.update(0.01)
+    return count * steps / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Steering ECU Fleet")
+    parser.add_argument("--count", type=int, default=1000, help="number of ECUs")
+    parser.add_argument("--serve", action="store_true",
+                        help="serve the fleet on a broker instead of benchmarking")
+    parser.add_argument("--broker", default=BROKER_URL,
+                        help="broker URL, or local://<name> for the in-process stand-in")
+    parser.add_argument("--prefix", default=NAMESPACE_PREFIX,
+                        help="namespace prefix; ECU i uses <prefix><i:04d>")
+    parser.add_argument("--period", type=float, default=STATUS_PERIOD,
+                        help="status publish period in seconds")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    add_clock_arguments(parser)
+    add_change_arguments(parser)
+    add_metrics_arguments(parser, log_rate=False)
+    args = parser.parse_args()
+
+    if not args.serve:
+        print("🚙 Steering ECU fleet")
+        mismatches = verify()
+        print(f"   vs scalar SteeringECU: {'✓ identical' if not mismatches else f'❌ {mismatches} mismatches'}")
+        print(f"   scalar baseline: {benchmark_scalar(1000) / 1e6:8.2f} M ECU-steps/s")
+        for count in (100, 1000, 10_000, 100_000):
+            print(f"   {count:7d} ECUs:   {benchmark(count) / 1e6:8.2f} M ECU-steps/s")
+        return
+
+    print(f"🚙 Steering ECU fleet: {args.count} ECUs in namespaces "
+          f"{args.prefix}0000..{args.prefix}{args.count - 1:04d}")
+    print(f"📡 Connecting to broker at {args.broker}...")
+    clock = make_clock(args.clock, args.step, args.speed)
+    link, exporters = start_metrics(args, connect(args.broker))
+    link = apply_change_arguments(link, args, clock)
+    service = FleetService(link, args.count, args.prefix, args.period)
+    print("✓ Connected to broker")
+
+    start = time.monotonic()
+    try:
+        service.run(args.duration, clock)
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Fleet stopped")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        service.close()
+        link.close()
+        for exporter in exporters:
+            exporter.close()
+        elapsed = time.monotonic() - start
+        print(f"📤 {service.published} status frames in {elapsed:.1f}s "
+              f"({service.published / max(elapsed, 1e-9):.0f} frames/s), {service.commands} commands")
+        if args.on_change:
+            print(f"🗜️  On-change publishing: {link.stats.format()}")
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,26 @@ Steering ECU Simulator
 Subscribes to steering commands and publishes current status
 """
 
+import argparse
+import math
 import time
-from remotivelabs.broker.sync import SignalCreator, SubscriberConfig, PublisherConfig, create_channel
 
-BROKER_URL = "http://localhost:50051"
+from broker_link import BROKER_URL, connect
+from change_filter import add_change_arguments, apply_change_arguments
+from latency_stats import LatencyStats
+from metrics import REGISTRY, Throttle, add_metrics_arguments, start_metrics
+from sim_clock import SimClock, add_clock_arguments, make_clock
+
+STATUS_PERIOD = 0.1  # Publish status every 100ms
+MAX_RATE = 50  # deg/s the ECU slews towards its target
+
+COMMAND_SIGNALS = [("SteeringCommand", "SteeringAngle"), ("SteeringCommand", "SteeringSpeed")]
+STATUS_SIGNALS = [("SteeringStatus", "CurrentAngle"), ("SteeringStatus", "ECU_Ready")]
+
+DECODE_TIME = REGISTRY.histogram("ecu_command_decode_seconds", "Raw command to physical target time")
+RESPONSE_TIME = REGISTRY.histogram("ecu_receive_to_publish_seconds", "Command receipt to status publish")
+QUEUE_DEPTH = REGISTRY.gauge("ecu_command_queue_depth", "Commands waiting when the ECU loop woke up")
+TRACKING_ERROR = REGISTRY.gauge("ecu_tracking_error_degrees", "target_angle - current_angle at the last status")
 
 class SteeringECU:
     def __init__(self):
@@ -20,7 +36,7 @@ class SteeringECU:
         if abs(self.target_angle - self.current_angle) > 1:
             # Move towards target at specified speed
             diff = self.target_angle - self.current_angle
-            step = min(abs(diff), 50 * dt)  # Max 50 deg/s movement
+            step = min(abs(diff), MAX_RATE * dt)  # Max 50 deg/s movement
             self.current_angle += step if diff > 0 else -step
         else:
             self.current_angle = self.target_angle
@@ -29,68 +45,288 @@ class SteeringECU:
         """Set new target steering angle"""
         self.target_angle = max(-2000, min(2000, angle))  # Clamp to valid range
 
+class AsyncECUService:
+    """Event-driven ECU loop: reacts to commands as they arrive, ticks on a monotonic schedule"""
+
+    def __init__(self, link, ecu=None, period=STATUS_PERIOD, verbose=True, log_rate=None):
+        self.link = link
+        self.ecu = ecu or SteeringECU()
+        self.period = period
+        self.verbose = verbose
+        self.log = Throttle(log_rate)  # Caps the per-message lines below
+        self.latency = LatencyStats()
+        self.commands = 0
+        self.published = 0
+        self._stop = None
+        from dbc_codec import steering_codec
+
+        codec = steering_codec()
+        self.command = codec["SteeringCommand"]
+        self.status = codec["SteeringStatus"]
+
+    def stop(self):
+        """Ask a running service to finish its current iteration and return"""
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self, duration=None):
+        """Serve until stopped, or for duration seconds"""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        self._stop = asyncio.Event()
+
+        def on_frame(frame, values, timestamp):
+            # Called on the broker's thread - hand the frame to the event loop
+            loop.call_soon_threadsafe(queue.put_nowait, (time.perf_counter(), values))
+
+        subscription = self.link.subscribe("steering_ecu", COMMAND_SIGNALS, on_frame, on_change=True)
+        publisher = self.link.publisher("steering_ecu_status", STATUS_SIGNALS)
+
+        start = loop.time()
+        deadline = start + duration if duration is not None else math.inf
+        last_update = start
+        next_tick = start + self.period
+        stop_wait = asyncio.ensure_future(self._stop.wait())
+        get_next = None
+
+        try:
+            while not self._stop.is_set():
+                now = loop.time()
+                if now >= deadline:
+                    break
+
+                # Sleep until a command arrives or the next status tick is due
+                if get_next is None:
+                    get_next = asyncio.ensure_future(queue.get())
+                timeout = max(0.0, min(next_tick, deadline) - now)
+                done, _ = await asyncio.wait({get_next, stop_wait}, timeout=timeout,
+                                            return_when=asyncio.FIRST_COMPLETED)
+
+                received = []
+                if get_next in done:
+                    QUEUE_DEPTH.set(queue.qsize() + 1)
+                    received.append(get_next.result())
+                    get_next = None
+                    # Coalesce any burst that queued up behind the first frame
+                    while not queue.empty():
+                        received.append(queue.get_nowait())
+
+                for _, values in received:
+                    if "SteeringAngle" in values:
+                        decode_start = time.perf_counter()
+                        target_angle = self.command.to_physical("SteeringAngle", values["SteeringAngle"])
+                        DECODE_TIME.record(time.perf_counter() - decode_start)
+                        self.ecu.set_target(target_angle)
+                        self.commands += 1
+                        if self.verbose and self.log.allow():
+                            print(f"📥 Received command: Target = {target_angle:6.1f}°")
+
+                now = loop.time()
+                if not received and now < next_tick:
+                    continue
+
+                # Update ECU state from the monotonic clock
+                self.ecu.update(now - last_update)
+                last_update = now
+
+                # Publish current status
+                publisher.publish("SteeringStatus", {
+                    "CurrentAngle": self.status.to_raw("CurrentAngle", self.ecu.current_angle),
+                    "ECU_Ready": 1 if self.ecu.ready else 0,
+                })
+                self.published += 1
+                published_at = time.perf_counter()
+                for received_at, _ in received:
+                    self.latency.record(published_at - received_at)
+                    RESPONSE_TIME.record(published_at - received_at)
+                TRACKING_ERROR.set(self.ecu.target_angle - self.ecu.current_angle)
+
+                if self.verbose and self.log.allow():
+                    print(f"📤 ECU Status: Current = {self.ecu.current_angle:6.1f}° | Target = {self.ecu.target_angle:6.1f}°")
+
+                if now >= next_tick:
+                    # Deadlines advance from the schedule, not from "now", so they do not drift
+                    next_tick += self.period
+                    if next_tick <= now:
+                        next_tick = now + self.period
+        finally:
+            stop_wait.cancel()
+            if get_next is not None:
+                get_next.cancel()
+            subscription.cancel()
+
+        return self.latency.summary()
+
+class ClockedECUService:
+    """Fixed-step ECU driven by a shared clock: status every period, dt always equal to period"""
+
+    def __init__(self, link, clock, ecu=None, period=STATUS_PERIOD, verbose=False, log_rate=None):
+        self.link = link
+        self.clock = clock
+        self.ecu = ecu or SteeringECU()
+        self.period = period
+        self.verbose = verbose
+        self.log = Throttle(log_rate)
+        self.commands = 0
+        self.published = 0
+        from dbc_codec import steering_codec
+
+        codec = steering_codec()
+        self.command = codec["SteeringCommand"]
+        self.status = codec["SteeringStatus"]
+        self.subscription = link.subscribe("steering_ecu", COMMAND_SIGNALS, self._on_frame, on_change=True)
+        self.publisher = link.publisher("steering_ecu_status", STATUS_SIGNALS)
+
+    def _on_frame(self, frame, values, timestamp):
+        if "SteeringAngle" in values:
+            decode_start = time.perf_counter()
+            target_angle = self.command.to_physical("SteeringAngle", values["SteeringAngle"])
+            DECODE_TIME.record(time.perf_counter() - decode_start)
+            self.ecu.set_target(target_angle)
+            self.commands += 1
+            if self.verbose and self.log.allow():
+                print(f"📥 Received command: Target = {target_angle:6.1f}°")
+
+    def tick(self, now=None):
+        """Advance the ECU one period and publish its status"""
+        self.ecu.update(self.period)
+        self.publisher.publish("SteeringStatus", {
+            "CurrentAngle": self.status.to_raw("CurrentAngle", self.ecu.current_angle),
+            "ECU_Ready": 1 if self.ecu.ready else 0,
+        })
+        self.published += 1
+        TRACKING_ERROR.set(self.ecu.target_angle - self.ecu.current_angle)
+        if self.verbose and self.log.allow():
+            print(f"📤 ECU Status: Current = {self.ecu.current_angle:6.1f}° | Target = {self.ecu.target_angle:6.1f}°")
+
+    def schedule(self):
+        """Register the status tick on a SimClock"""
+        self.clock.every(self.period, self.tick, offset=self.period)
+
+    def run(self, duration=None):
+        """Tick on the clock until duration (simulated seconds) elapses, or forever"""
+        if isinstance(self.clock, SimClock):
+            self.schedule()
+            self.clock.run(duration)
+            return
+        start = self.clock.time()
+        tick = 0
+        while duration is None or self.clock.time() - start < duration:
+            tick += 1
+            self.clock.sleep(start + tick * self.period - self.clock.time())
+            self.tick()
+
+    def stop(self):
+        self.subscription.cancel()
+
+async def _feed_commands(link, rate, duration):
+    """Publish a sine-wave command stream (used with --selftest)"""
+    publisher = link.publisher("steering_gateway", COMMAND_SIGNALS)
+    import asyncio
+
+    from dbc_codec import steering_codec
+
+    command = steering_codec()["SteeringCommand"]
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    count = 0
+    while loop.time() - start < duration:
+        angle = 500 * math.sin(count * 0.1)
+        publisher.publish("SteeringCommand", {"SteeringAngle": command.to_raw("SteeringAngle", angle),
+                                              "SteeringSpeed": 100})
+        count += 1
+        await asyncio.sleep(max(0.0, start + count / rate - loop.time()))
+
+async def _selftest(link, duration, rate):
+    import asyncio
+
+    service = AsyncECUService(link, verbose=False)
+    runner = asyncio.ensure_future(service.run(duration + 0.2))
+    await asyncio.sleep(0.05)
+    await _feed_commands(link, rate, duration)
+    await runner
+    return service
+
 def main():
+    parser = argparse.ArgumentParser(description="Steering ECU Simulator")
+    parser.add_argument("--broker", default=BROKER_URL,
+                        help="broker URL, or local://<name> for the in-process stand-in")
+    parser.add_argument("--period", type=float, default=STATUS_PERIOD,
+                        help="status publish period in seconds")
+    parser.add_argument("--quiet", action="store_true", help="no per-message output")
+    parser.add_argument("--selftest", type=float, metavar="SECONDS",
+                        help="run against the in-process broker with a built-in command feed")
+    parser.add_argument("--selftest-rate", type=float, default=100.0,
+                        help="command rate in Hz for --selftest")
+    parser.add_argument("--duration", type=float,
+                        help="with --clock realtime/fast: stop after this many simulated seconds")
+    add_clock_arguments(parser)
+    add_change_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    # asyncio is only loaded for the async paths; --help and the clocked ECU start without it
+    if args.selftest:
+        import asyncio
+
+        print(f"🧪 ECU self-test against in-process broker ({args.selftest:.0f}s @ {args.selftest_rate:.0f} Hz)")
+        service = asyncio.run(_selftest(connect("local://selftest"), args.selftest, args.selftest_rate))
+        print(f"✓ {service.commands} commands, {service.published} status frames")
+        print(f"⏱️  Receive → publish latency: {service.latency.format()}")
+        return
+
     print("🎮 Steering ECU Simulator")
-    print(f"📡 Connecting to broker at {BROKER_URL}...")
-
-    channel = create_channel(BROKER_URL)
-    ecu = SteeringECU()
-
-    # Subscribe to steering commands
-    subscriber_config = SubscriberConfig(
-        clientId="steering_ecu",
-        signals=SignalCreator()
-            .signal("SteeringCommand", "SteeringAngle")
-            .signal("SteeringCommand", "SteeringSpeed"),
-        onChange=True
-    )
-
-    # Publisher for status
-    publisher_config = PublisherConfig(
-        clientId="steering_ecu_status",
-        signals=SignalCreator()
-            .signal("SteeringStatus", "CurrentAngle")
-            .signal("SteeringStatus", "ECU_Ready")
-    )
+    print(f"📡 Connecting to broker at {args.broker}...")
+
+    clock = make_clock(args.clock, args.step, args.speed)
+    # With --on-change, unchanged status is only resent every --heartbeat seconds
+    # Metrics count what reaches the broker, i.e. after the change filter
+    link, exporters = start_metrics(args, connect(args.broker))
+    link = apply_change_arguments(link, args, clock)
+    if args.clock != 'wall':
+        # Fixed-step model: reproducible, and as fast as possible with --clock fast
+        service = ClockedECUService(link, clock, period=args.period, verbose=not args.quiet,
+                                    log_rate=args.log_rate)
+        print("✓ Connected to broker")
+        print(f"\n🎯 ECU ready - fixed {args.period * 1000:g} ms steps on the {args.clock} clock\n")
+        try:
+            service.run(args.duration)
+        except KeyboardInterrupt:
+            print("\n\n⏹️  ECU simulator stopped")
+        finally:
+            service.stop()
+            link.close()
+            for exporter in exporters:
+                exporter.close()
+            print(f"✓ {service.commands} commands, {service.published} status frames")
+            if args.on_change:
+                print(f"🗜️  On-change publishing: {link.stats.format()}")
+        return
+
+    service = AsyncECUService(link, period=args.period, verbose=not args.quiet, log_rate=args.log_rate)
 
     print("✓ Connected to broker")
     print("\n🎯 ECU ready - listening for steering commands...\n")
 
     try:
-        last_update = time.time()
-
-        while True:
-            # Read incoming steering commands
-            try:
-                for signal in subscriber_config.signals:
-                    value = signal.read()
-                    if signal.signal_name == "SteeringAngle":
-                        target_angle = value / 10.0  # Convert from raw value
-                        ecu.set_target(target_angle)
-                        print(f"📥 Received command: Target = {target_angle:6.1f}°")
-            except Exception as e:
-                pass  # No new data
-
-            # Update ECU state
-            current_time = time.time()
-            dt = current_time - last_update
-            ecu.update(dt)
-            last_update = current_time
-
-            # Publish current status
-            publisher_config.signals.signal("SteeringStatus", "CurrentAngle").raw(int(ecu.current_angle * 10))
-            publisher_config.signals.signal("SteeringStatus", "ECU_Ready").raw(1 if ecu.ready else 0)
-
-            print(f"📤 ECU Status: Current = {ecu.current_angle:6.1f}° | Target = {ecu.target_angle:6.1f}°")
-
-            time.sleep(0.1)
+        import asyncio
 
+        asyncio.run(service.run())
     except KeyboardInterrupt:
         print("\n\n⏹️  ECU simulator stopped")
     except Exception as e:
         print(f"\n❌ Error: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        link.close()
+        for exporter in exporters:
+            exporter.close()
+        print(f"⏱️  Receive → publish latency: {service.latency.format()}")
+        if args.on_change:
+            print(f"🗜️  On-change publishing: {link.stats.format()}")
 
 if __name__ == "__main__":
     main()
@@ -11,15 +11,12 @@ echo ""
 echo "Press Ctrl+C to stop"
 echo ""
 
-# Counter
-COUNT=0
-
-while true; do
-    COUNT=$((COUNT + 1))
-    echo -ne "\r📤 API Call #$COUNT - $(date '+%H:%M:%S')"
-
-    # Make API call to broker
-    remotive broker signals list > /dev/null 2>&1
-
-    sleep 1
-done
+# One process with pooled, long-lived connections instead of a CLI process per call.
+# Defaults to the old pace (one list call per second) for an hour; pass e.g.
+#   ./generate_traffic.sh --qps 500 --clients 1,4,16 --duration 10
+# to measure how API latency degrades under concurrent clients.
+cd "$(dirname "$0")"
+if [ $# -eq 0 ]; then
+    set -- --qps 1 --clients 1 --mix list=1 --duration 3600
+fi
+exec python3 load_generator.py "$@"
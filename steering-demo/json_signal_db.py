@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+JSON Signal Database Loader
+Compiles the broker's JSON signal format (human/benchc.json) into the same
+memory-mapped, frame-id keyed index that dbc_codec uses for DBC files
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from dbc_codec import (HERE, CompiledDatabase, CompiledMessage, Message, Signal,
+                       FRAME_BYTES, load_compiled)
+
+BENCHC_JSON = os.path.join(HERE, "..", "broker-setup", "configuration_distributed",
+                           "human", "benchc.json")
+
+def parse_frame_id(value):
+    """Frame ids are hex strings ("1ef", "012"); plain ints are accepted too"""
+    if isinstance(value, int):
+        return value
+    return int(str(value), 16)
+
+def parse_signal_json(text):
+    """Group the flat signal list into messages keyed by frame id"""
+    messages = {}
+    for entry in json.loads(text):
+        frame_id = parse_frame_id(entry["id"])
+        message = messages.get(frame_id)
+        if message is None:
+            message = messages[frame_id] = Message(frame_id, f"Frame0x{frame_id:03X}", 0, "")
+        start = int(entry.get("startbit", 0))
+        length = int(entry["length"])
+        # The format has no byte order or sign fields: Intel layout, unsigned
+        message.signals.append(Signal(
+            entry["name"], start, length, True, False,
+            float(entry.get("factor", 1)), float(entry.get("offset", 0))))
+        message.dlc = max(message.dlc, min(FRAME_BYTES, (start + length + 7) // 8))
+    return [messages[frame_id] for frame_id in sorted(messages)]
+
+def compile_signal_json(text, source=None):
+    """Parse and compile JSON signal definitions (no caching)"""
+    messages = [CompiledMessage.from_message(m) for m in parse_signal_json(text)]
+    return CompiledDatabase(messages, source=source)
+
+def load_signal_json(path=BENCHC_JSON, cache_dir=None, use_cache=True):
+    """Load a JSON signal database, reusing the compiled index while the file hash matches"""
+    return load_compiled(path, compile_signal_json, cache_dir, use_cache)
+
+def synthesize(path, frames):
+    """Write a benchc-style database with many frames for load-time benchmarks"""
+    entries = []
+    for frame_id in range(frames):
+        for byte in range(FRAME_BYTES):
+            entries.append({"name": f"Synth_{frame_id:x}_{byte}", "factor": 1,
+                            "id": f"{frame_id:x}", "offset": 0,
+                            "startbit": byte * 8, "hs": True, "length": 8})
+    with open(path, "w") as f:
+        json.dump(entries, f, indent=3)
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--synthetic":
+        path = os.path.join(os.environ.get("TMPDIR", "/tmp"), f"synthetic-{sys.argv[2]}.json")
+        synthesize(path, int(sys.argv[2]))
+    else:
+        path = sys.argv[1] if len(sys.argv) > 1 else BENCHC_JSON
+
+    size = os.path.getsize(path)
+    start = time.perf_counter()
+    database = load_signal_json(path, use_cache=False)
+    parse_s = time.perf_counter() - start
+    load_signal_json(path)
+    start = time.perf_counter()
+    cached = load_signal_json(path)
+    cached_s = time.perf_counter() - start
+
+    print(f"📚 {os.path.basename(path)} ({size / 1024:.0f} KiB): {len(database)} frames")
+    print(f"   JSON parse + compile: {parse_s * 1000:8.2f} ms")
+    print(f"   Memory-mapped index:  {cached_s * 1000:8.2f} ms")
+
+    # Decode through the same compiled path as DBC messages
+    rng = np.random.default_rng(0)
+    for frame_id in cached.frame_ids[:8].tolist():
+        message = cached[frame_id]
+        payloads = rng.integers(0, 256, size=(100_000, FRAME_BYTES), dtype=np.uint8)
+        start = time.perf_counter()
+        message.decode(payloads)
+        decode_s = time.perf_counter() - start
+        print(f"   0x{frame_id:03X} {len(message.names):2d} signals | "
+              f"decode {len(payloads) / decode_s / 1e6:6.2f} M frames/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Round-Trip Latency Benchmark
+Measures publisher → broker → ECU → status latency with sequence-stamped
+commands, sweeping publish rate and signal count, and saves the results as JSON
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+from broker_link import connect
+from dbc_codec import steering_codec
+from ecu_simulator import COMMAND_SIGNALS, STATUS_SIGNALS, AsyncECUService
+from latency_stats import LatencyStats
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PERCENTILES = (50, 95, 99)
+AMPLITUDE = 19000  # Raw steps the sequence angle walks either side of 0°
+REPLY_TIMEOUT = 1.0  # Commands unanswered this long are given up on
+FILLER_FRAME = "BenchLoad"  # Extra signals for --signals beyond the two command signals
+
+def sleep_until(deadline):
+    """Sleep (never spin) until a perf_counter deadline
+
+    sim_clock.wait_until spins for the last half millisecond, which would
+    hold the GIL against an ECU or broker thread in this same process.
+    """
+    remaining = deadline - time.perf_counter()
+    if remaining > 0:
+        time.sleep(remaining)
+
+def sequence_raw(seq, center):
+    """Raw SteeringAngle for command seq: a triangle wave in 0.1° steps
+
+    Consecutive commands differ by one raw step, which SteeringECU snaps
+    to immediately (it only slews for differences over 1°), so the status
+    reply carries exactly the commanded raw value and identifies the command.
+    """
+    position = seq % (4 * AMPLITUDE)
+    if position < AMPLITUDE:
+        offset = position
+    elif position < 3 * AMPLITUDE:
+        offset = 2 * AMPLITUDE - position
+    else:
+        offset = position - 4 * AMPLITUDE
+    return center + offset
+
+class RoundTrip:
+    """Publishes sequence-stamped commands and matches the ECU's status replies to them"""
+
+    def __init__(self, link, signals=2, client_id="latency_bench"):
+        codec = steering_codec()
+        self.center = codec["SteeringCommand"].to_raw("SteeringAngle", 0.0)
+        self.speed = codec["SteeringCommand"].to_raw("SteeringSpeed", 100)
+        self.filler = [f"Load{i:03d}" for i in range(max(0, signals - len(COMMAND_SIGNALS)))]
+        self.publisher = link.publisher(client_id,
+                                        COMMAND_SIGNALS + [(FILLER_FRAME, name) for name in self.filler])
+        self.subscription = link.subscribe(f"{client_id}_monitor", STATUS_SIGNALS, self._on_status,
+                                           on_change=False)
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._outstanding = collections.deque()  # (seq, raw, sent_at), oldest first
+        self._last_raw = None
+        self._first_seq = 1
+        self.reset()
+
+    def reset(self):
+        """Start a new measurement (after warm-up)
+
+        Commands sent so far stay outstanding so their late replies are still
+        recognised, but only commands from the next one on are counted.
+        """
+        with self._lock:
+            self._first_seq = self.seq + 1
+            self.latency = LatencyStats()
+            self.sent = 0
+            self.matched = 0
+            self.unanswered = 0  # Coalesced by the ECU, lost, or timed out
+            self.unmatched = 0  # Status frames that fit no outstanding command
+
+    def send(self):
+        """Publish the next command (and the filler frame, if any) in one batch"""
+        self.seq += 1
+        raw = sequence_raw(self.seq, self.center)
+        frames = [("SteeringCommand", {"SteeringAngle": raw, "SteeringSpeed": self.speed})]
+        if self.filler:
+            frames.append((FILLER_FRAME, {name: self.seq & 0xFF for name in self.filler}))
+        with self._lock:
+            self._outstanding.append((self.seq, raw, time.perf_counter()))
+            self.sent += 1
+        self.publisher.publish_batch(frames)
+
+    def _on_status(self, frame, values, timestamp):
+        received_at = time.perf_counter()
+        raw = values.get("CurrentAngle")
+        with self._lock:
+            if raw is None or raw == self._last_raw:
+                return  # Periodic status repeating the last answered command
+            outstanding = self._outstanding
+            for index, (_, expected, sent_at) in enumerate(outstanding):
+                if expected == raw:
+                    # Replies arrive in command order, so anything older was never answered
+                    for _ in range(index):
+                        self._drop(outstanding.popleft())
+                    seq, _, sent_at = outstanding.popleft()
+                    if seq >= self._first_seq:
+                        self.matched += 1
+                        self.latency.record(received_at - sent_at)
+                    self._last_raw = raw
+                    return
+            self.unmatched += 1
+
+    def expire(self, now=None):
+        """Give up on commands older than REPLY_TIMEOUT"""
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            while self._outstanding and now - self._outstanding[0][2] > REPLY_TIMEOUT:
+                self._drop(self._outstanding.popleft())
+
+    def _drop(self, command):
+        """Give up on one outstanding (seq, raw, sent_at) command; call with the lock held"""
+        if command[0] >= self._first_seq:
+            self.unanswered += 1
+
+    def close(self):
+        self.subscription.cancel()
+
+class ThreadECU:
+    """AsyncECUService on its own event loop thread, sharing the benchmark's link"""
+
+    def __init__(self, link, duration):
+        self.service = AsyncECUService(link, verbose=False)
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.service.run(duration)),
+                                       name="bench-ecu", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.thread.join()
+
+class ProcessECU:
+    """ecu_simulator.py in a subprocess (needs a broker other processes can reach)"""
+
+    def __init__(self, url):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "ecu_simulator.py"), "--broker", url, "--quiet"],
+            stdout=subprocess.DEVNULL)
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+def run_point(url, rate, signals, duration, warmup, ecu):
+    """Measure one (rate, signal count) point; returns its result dict"""
+    link = connect(url)
+    bench = RoundTrip(link, signals)
+    total = warmup + duration
+    worker = None
+    if ecu == 'thread':
+        worker = ThreadECU(link, total + 1.0)
+    elif ecu == 'process':
+        worker = ProcessECU(url)
+
+    interval = 1.0 / rate
+    try:
+        # Warm up until the ECU answers, then measure from a clean slate
+        start = time.perf_counter()
+        k = 0
+        while True:
+            deadline = start + k * interval
+            if deadline - start >= warmup and bench.matched:
+                break
+            if deadline - start > warmup + 10.0:
+                raise RuntimeError(f"no status replies from the ECU on {url}")
+            sleep_until(deadline)
+            bench.send()
+            k += 1
+        bench.reset()
+        # Keep the schedule going: the first measured command is one interval after
+        # the last warm-up one, so the ECU does not coalesce the two
+        start += k * interval
+        k = 0
+        while True:
+            deadline = start + k * interval
+            if deadline - start >= duration:
+                break
+            sleep_until(deadline)
+            bench.send()
+            if k % 64 == 0:
+                bench.expire()
+            k += 1
+        sleep_until(start + duration + min(REPLY_TIMEOUT, 0.2))  # Let in-flight replies land
+        bench.expire(float("inf"))
+    finally:
+        bench.close()
+        if worker is not None:
+            worker.close()
+        if not url.startswith("local://"):
+            link.close()
+
+    summary = bench.latency.summary(PERCENTILES)
+    return {
+        'rate_hz': rate,
+        'signals': signals,
+        'sent': bench.sent,
+        'matched': bench.matched,
+        'unanswered': bench.unanswered,
+        'unmatched': bench.unmatched,
+        'sent_hz': bench.sent / duration,
+        # Replies to the commands of the publish window; the drain above only lets the
+        # last of them land, so it does not count towards the time
+        'throughput_hz': bench.matched / duration,
+        **{key: value for key, value in summary.items() if key.endswith('_ms')},
+        'histogram_ms': bench.latency.histogram(),
+    }
+
+def compare(results, baseline_path):
+    """Print p50/p99 changes against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = {(r['rate_hz'], r['signals']): r for r in json.load(f)['results']}
+    print(f"\n📊 Compared with {baseline_path}:")
+    for result in results:
+        old = baseline.get((result['rate_hz'], result['signals']))
+        if old is None:
+            continue
+        deltas = []
+        for key in ('p50_ms', 'p99_ms'):
+            change = (result[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            deltas.append(f"{key[:-3]} {old[key]:.3f} → {result[key]:.3f} ms ({change:+.0f}%)")
+        print(f"   {result['rate_hz']:>8g} Hz × {result['signals']:3d} signals: {' | '.join(deltas)}")
+
+def parse_list(text, kind=float):
+    return [kind(item) for item in text.split(",") if item]
+
+def main():
+    parser = argparse.ArgumentParser(description="Publisher → broker → ECU → status round-trip benchmark")
+    parser.add_argument("--broker", default="local://latency-bench",
+                        help="broker URL (local://, emulator:// or a real broker)")
+    parser.add_argument("--spawn-broker", action="store_true",
+                        help="start the broker stand-in in a subprocess and benchmark through it")
+    parser.add_argument("--latency", type=float, default=0.0, help="with --spawn-broker: injected latency (s)")
+    parser.add_argument("--loss", type=float, default=0.0, help="with --spawn-broker: injected loss (0..1)")
+    parser.add_argument("--ecu", choices=('thread', 'process', 'external'),
+                        help="where the ECU runs (default: thread, or process with --spawn-broker)")
+    parser.add_argument("--rates", default="10,100,1000", help="comma-separated publish rates in Hz")
+    parser.add_argument("--signals", default="2,16,64",
+                        help="comma-separated signals per command cycle (extra ones go in a "
+                             f"{FILLER_FRAME} frame, which only the stand-ins accept)")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds measured per point")
+    parser.add_argument("--warmup", type=float, default=0.5, help="seconds discarded before each point")
+    parser.add_argument("--output", help="results JSON (default: latency-<timestamp>.json)")
+    parser.add_argument("--compare", metavar="RESULTS", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    server = None
+    url = args.broker
+    ecu = args.ecu or 'thread'
+    if args.spawn_broker:
+        from local_broker import spawn_server
+        server, url = spawn_server(0, latency=args.latency, loss=args.loss)
+        ecu = args.ecu or 'process'
+
+    print(f"⏱️  Round-trip latency: {url}, ECU in {ecu}")
+    results = []
+    try:
+        for rate in parse_list(args.rates):
+            for signals in parse_list(args.signals, int):
+                result = run_point(url, rate, signals, args.duration, args.warmup, ecu)
+                results.append(result)
+                print(f"   {rate:>8g} Hz × {signals:3d} signals: "
+                      f"p50={result['p50_ms']:.3f} p95={result['p95_ms']:.3f} "
+                      f"p99={result['p99_ms']:.3f} max={result['max_ms']:.3f} ms | "
+                      f"{result['throughput_hz']:,.0f} replies/s, {result['unanswered']} unanswered")
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Benchmark stopped")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        if server is not None:
+            server.terminate()
+
+    if not results:
+        sys.exit(1)
+    output = args.output or time.strftime("latency-%Y%m%d-%H%M%S.json")
+    with open(output, "w") as f:
+        json.dump({
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'broker': url,
+            'ecu': ecu,
+            'duration_s': args.duration,
+            'python': platform.python_version(),
+            'host': platform.node(),
+            'results': results,
+        }, f, indent=2)
+    print(f"💾 Results saved to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
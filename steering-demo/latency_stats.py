@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Latency Statistics
+Collects latency samples and reports percentiles in milliseconds
+"""
+
+import bisect
+import random
+
+# Bucket edges for histogram(): roughly three per decade from 10 us to 10 s
+HISTOGRAM_EDGES_MS = [0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500,
+                      1000, 2000, 5000, 10000]
+
+class LatencyStats:
+    def __init__(self, capacity=100000):
+        # Reservoir sampling keeps memory bounded on long runs
+        self.capacity = capacity
+        self.samples = []
+        self.count = 0
+        self.max = 0.0
+        # Exact per-bucket counts for histogram(), unlike the sampled reservoir
+        self.buckets = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+
+    def record(self, seconds):
+        """Add one latency sample"""
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect.bisect_right(HISTOGRAM_EDGES_MS, seconds * 1000)] += 1
+        if len(self.samples) < self.capacity:
+            self.samples.append(seconds)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.capacity:
+                self.samples[slot] = seconds
+
+    def percentile(self, p):
+        """Return the p-th percentile (0-100) in seconds"""
+        return self._pick(sorted(self.samples), p)
+
+    @staticmethod
+    def _pick(ordered, p):
+        if not ordered:
+            return 0.0
+        return ordered[int(round(p / 100.0 * (len(ordered) - 1)))]
+
+    def summary(self, percentiles=(50, 99)):
+        """Percentile summary in milliseconds"""
+        ordered = sorted(self.samples)
+        result = {'count': self.count}
+        for p in percentiles:
+            result[f'p{p:g}_ms'] = self._pick(ordered, p) * 1000
+        result['max_ms'] = self.max * 1000
+        return result
+
+    def histogram(self, edges_ms=HISTOGRAM_EDGES_MS):
+        """{"<edge>": count} of samples below each edge (and above the previous one), in ms
+
+        The default edges count every sample; other edges only see the reservoir.
+        """
+        if edges_ms == HISTOGRAM_EDGES_MS:
+            counts = self.buckets
+        else:
+            counts = [0] * (len(edges_ms) + 1)
+            for seconds in self.samples:
+                counts[bisect.bisect_right(edges_ms, seconds * 1000)] += 1
+        labels = [f"<{edge:g}" for edge in edges_ms] + [f">={edges_ms[-1]:g}"]
+        return {label: count for label, count in zip(labels, counts) if count}
+
+    def format(self, percentiles=(50, 99)):
+        """One-line human readable summary"""
+        s = self.summary(percentiles)
+        parts = [f"n={s['count']}"]
+        parts += [f"p{p:g}={s[f'p{p:g}_ms']:.3f} ms" for p in percentiles]
+        parts.append(f"max={s['max_ms']:.3f} ms")
+        return " ".join(parts)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Broker API Load Generator
+Issues concurrent list/subscribe/publish calls at a fixed rate over a pool of
+long-lived broker links and reports per-call latency and errors
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import json
+import random
+import threading
+import time
+
+from broker_link import BROKER_URL, connect
+from dbc_codec import steering_codec
+from ecu_simulator import COMMAND_SIGNALS, STATUS_SIGNALS
+from latency_stats import LatencyStats
+
+CALLS = ('list', 'publish', 'subscribe')
+DEFAULT_MIX = "list=1,publish=8,subscribe=1"
+PERCENTILES = (50, 95, 99)
+
+def parse_mix(text):
+    """{call: weight} from "list=1,publish=8,subscribe=1" """
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name not in CALLS:
+            raise ValueError(f"unknown call {name!r} (choose from {', '.join(CALLS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+class ChannelPool:
+    """Broker links opened once and reused, each with its own steering publisher"""
+
+    def __init__(self, url, size):
+        self.links = [connect(url) for _ in range(size)]
+        self.publishers = [link.publisher(f"load_generator_{i}", COMMAND_SIGNALS)
+                           for i, link in enumerate(self.links)]
+
+    def __len__(self):
+        return len(self.links)
+
+    def close(self):
+        for link in self.links:
+            link.close()
+
+class ApiLoad:
+    """Open-loop call schedule: calls start on time even when earlier ones are still running
+
+    Response time is measured from each call's scheduled start, so time
+    spent waiting for a free worker counts (no coordinated omission);
+    service time covers only the call itself.
+    """
+
+    def __init__(self, pool, qps, mix, concurrency=None, seed=0):
+        self.pool = pool
+        self.qps = float(qps)
+        self.mix = mix
+        self.concurrency = concurrency or len(pool)
+        self.random = random.Random(seed)
+        command = steering_codec()["SteeringCommand"]
+        self.frame = {"SteeringAngle": command.to_raw("SteeringAngle", 0.0),
+                      "SteeringSpeed": command.to_raw("SteeringSpeed", 100)}
+        self.response = {name: LatencyStats() for name in mix}
+        self.service = {name: LatencyStats() for name in mix}
+        self.errors = {name: collections.Counter() for name in mix}
+        self.issued = 0
+        self._lock = threading.Lock()
+
+    def _call(self, kind, slot):
+        link = self.pool.links[slot]
+        if kind == 'list':
+            link.list_signals()
+        elif kind == 'publish':
+            self.pool.publishers[slot].publish("SteeringCommand", self.frame)
+        else:
+            link.subscribe(f"load_generator_sub_{slot}", STATUS_SIGNALS,
+                           lambda frame, values, timestamp: None).cancel()
+
+    def _timed(self, kind, slot, scheduled):
+        begin = time.perf_counter()
+        try:
+            self._call(kind, slot)
+        except Exception as e:
+            with self._lock:
+                self.errors[kind][type(e).__name__] += 1
+            return
+        end = time.perf_counter()
+        with self._lock:
+            self.service[kind].record(end - begin)
+            self.response[kind].record(end - scheduled)
+
+    def run(self, duration, progress=None):
+        """Issue calls for duration seconds, then wait for the stragglers"""
+        kinds = list(self.mix)
+        weights = [self.mix[kind] for kind in kinds]
+        interval = 1.0 / self.qps
+        with concurrent.futures.ThreadPoolExecutor(self.concurrency, "load") as executor:
+            start = time.perf_counter()
+            next_report = start + 1.0
+            k = 0
+            while True:
+                scheduled = start + k * interval
+                if scheduled - start >= duration:
+                    break
+                remaining = scheduled - time.perf_counter()
+                if remaining > 0:
+                    time.sleep(remaining)
+                kind = self.random.choices(kinds, weights)[0]
+                executor.submit(self._timed, kind, k % len(self.pool), scheduled)
+                self.issued += 1
+                k += 1
+                if progress is not None and scheduled >= next_report:
+                    progress(self, scheduled - start)
+                    next_report += 1.0
+        return time.perf_counter() - start
+
+    def completed(self):
+        return sum(stats.count for stats in self.response.values())
+
+    def error_count(self):
+        return sum(sum(counter.values()) for counter in self.errors.values())
+
+    def report(self, elapsed):
+        """Per-call latency summaries in milliseconds"""
+        calls = {}
+        for kind in self.mix:
+            response = self.response[kind].summary(PERCENTILES)
+            service = self.service[kind].summary(PERCENTILES)
+            calls[kind] = {
+                'calls': response['count'],
+                'errors': dict(self.errors[kind]),
+                **{f'response_{key}': value for key, value in response.items() if key.endswith('_ms')},
+                **{f'service_{key}': value for key, value in service.items() if key.endswith('_ms')},
+            }
+        return {
+            'clients': len(self.pool),
+            'target_qps': self.qps,
+            'achieved_qps': self.completed() / elapsed if elapsed > 0 else 0.0,
+            'elapsed_s': elapsed,
+            'calls': calls,
+        }
+
+def show_progress(load, elapsed):
+    print(f"\r📤 API calls: {load.completed():,} done / {load.issued:,} issued | "
+          f"errors {load.error_count()} | {load.completed() / max(elapsed, 1e-9):,.0f}/s",
+          end="", flush=True)
+
+def print_report(result):
+    print(f"\n👥 {result['clients']} clients: {result['achieved_qps']:,.0f} calls/s "
+          f"(target {result['target_qps']:,.0f})")
+    for kind, stats in result['calls'].items():
+        errors = sum(stats['errors'].values())
+        print(f"   {kind:9s} n={stats['calls']:<7d} response p50={stats['response_p50_ms']:8.3f} "
+              f"p99={stats['response_p99_ms']:8.3f} max={stats['response_max_ms']:8.3f} ms | "
+              f"service p99={stats['service_p99_ms']:8.3f} ms | errors {errors}"
+              + (f" {stats['errors']}" if errors else ""))
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent broker API load generator")
+    parser.add_argument("--broker", default=BROKER_URL,
+                        help="broker URL (emulator:// or local:// for the stand-ins)")
+    parser.add_argument("--qps", type=float, default=100.0, help="total calls per second")
+    parser.add_argument("--clients", default="4",
+                        help="pooled links (and worker threads); a comma list sweeps, e.g. 1,4,16")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="relative weights of the call types")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per client count")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    print("📡 Generating API load on RemotiveBroker")
+    print(f"   {args.broker} | {args.qps:g} calls/s | mix {args.mix}")
+    results = []
+    pool = None
+    try:
+        mix = parse_mix(args.mix)
+        for clients in [int(c) for c in args.clients.split(",") if c]:
+            pool = ChannelPool(args.broker, clients)
+            load = ApiLoad(pool, args.qps, mix)
+            elapsed = load.run(args.duration, show_progress)
+            result = load.report(elapsed)
+            results.append(result)
+            print_report(result)
+            pool.close()
+            pool = None
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Load generator stopped")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        if pool is not None:
+            pool.close()
+        if args.json and results:
+            with open(args.json, "w") as f:
+                json.dump({'broker': args.broker, 'mix': args.mix, 'results': results}, f, indent=2)
+            print(f"💾 Results saved to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+"""
+Local Broker Stand-in
+In-process signal publish/subscribe that mimics RemotiveBroker for offline runs,
+optionally served to other processes with injected latency and loss
+"""
+
+import argparse
+import heapq
+import itertools
+import queue
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from urllib.parse import parse_qsl
+
+AUTHKEY = b"steering-demo"
+EMULATOR_PREFIX = "emulator://"  # Must match broker_link.EMULATOR_PREFIX
+EMULATOR_PORT = 50052  # Next to the real broker's 50051
+REQUEST_TIMEOUT = 10.0  # Seconds an EmulatorLink request waits for the server's reply
+
+class LocalSubscription:
+    def __init__(self, broker, frames, on_frame, on_change, namespace=None):
+        self.broker = broker
+        self.frames = frames  # frame -> set of subscribed signal names
+        self.namespace = namespace
+        self.on_frame = on_frame
+        self.on_change = on_change
+        self.last = {}
+        self.active = True
+
+    def deliver(self, frame, values, timestamp):
+        """Forward the subscribed part of a frame to the callback"""
+        if not self.active:
+            return  # Cancelled while a delivery was already on its way
+        wanted = self.frames[frame]
+        selected = {name: value for name, value in values.items() if name in wanted}
+        if not selected:
+            return
+        if self.on_change:
+            previous = self.last.get(frame)
+            if previous == selected:
+                return
+            self.last[frame] = selected
+        self.on_frame(frame, selected, timestamp)
+
+    def cancel(self):
+        """Detach from the broker"""
+        self.broker._unsubscribe(self)
+
+class LocalPublisher:
+    def __init__(self, broker, client_id, signals, namespace=None):
+        self.broker = broker
+        self.client_id = client_id
+        self.namespace = namespace
+        self.allowed = {}
+        for frame, name in signals:
+            self.allowed.setdefault(frame, set()).add(name)
+
+    def _check(self, frame, values):
+        if not values.keys() <= self.allowed.get(frame, set()):
+            unknown = sorted(set(values) - self.allowed.get(frame, set()))
+            raise KeyError(f"{self.client_id} has no publisher for {frame}.{unknown[0]}")
+
+    def publish(self, frame, values):
+        """Publish raw signal values belonging to one frame"""
+        self._check(frame, values)
+        self.broker.publish(frame, values, namespace=self.namespace)
+
+    def publish_batch(self, frames):
+        """Publish a sequence of (frame, values) pairs in one call"""
+        for frame, values in frames:
+            self._check(frame, values)
+        self.broker.publish_batch(frames, namespace=self.namespace)
+
+def namespace_catalog(interfaces):
+    """{namespace: {frame: set of signals}} for the chains of an interfaces.json"""
+    from dbc_codec import load_database
+    from topology_model import load_chains
+
+    catalog = {}
+    for chain in load_chains(interfaces):
+        frames = catalog.setdefault(chain["namespace"], {})
+        if not chain["database"]:
+            continue
+        a = load_database(chain["database"]).arrays
+        signals = a['sig_name'].tolist()
+        for name, first, count in zip(a['msg_name'].tolist(), a['msg_first'].tolist(),
+                                      a['msg_count'].tolist()):
+            frames[name] = set(signals[first:first + count])
+    return catalog
+
+class LocalBroker:
+    """Thread-safe in-process broker; callbacks run on the publishing thread
+
+    With latency or jitter configured, frames are delivered from a
+    scheduler thread instead, each subscriber's frames still in publish
+    order. loss drops each delivery independently with that probability.
+    """
+
+    def __init__(self, name="default", latency=0.0, jitter=0.0, loss=0.0, seed=0, interfaces=None):
+        self.name = name
+        self._lock = threading.Lock()
+        self._routes = {}  # (namespace, frame) -> tuple of subscriptions
+        self.published = 0
+        self.dropped = 0
+        self.failed = 0  # Subscriptions dropped because their callback raised
+        self.catalog = namespace_catalog(interfaces) if interfaces else None
+        self._random = random.Random(seed)
+        self._pending = []  # Heap of (due, order, subscription, frame, values, timestamp)
+        self._order = itertools.count()
+        self._last_due = {}  # Subscription -> due time of its newest pending frame
+        self._wakeup = threading.Condition(self._lock)
+        self._scheduler = None
+        self.latency = self.jitter = self.loss = 0.0
+        self.configure(latency, jitter, loss)
+
+    def configure(self, latency=None, jitter=None, loss=None, seed=None):
+        """Change the injected latency/jitter (seconds) and loss (0..1)"""
+        if latency is not None:
+            self.latency = float(latency)
+        if jitter is not None:
+            self.jitter = float(jitter)
+        if loss is not None:
+            self.loss = float(loss)
+        if seed is not None:
+            self._random.seed(seed)
+        self._delayed = self.latency > 0 or self.jitter > 0
+        self._impaired = self._delayed or self.loss > 0
+        if self._delayed and self._scheduler is None:
+            self._scheduler = threading.Thread(target=self._deliver_due, name=f"broker-{self.name}",
+                                               daemon=True)
+            self._scheduler.start()
+
+    def _validate(self, signals, namespace):
+        if self.catalog is None:
+            return
+        scopes = [self.catalog.get(namespace, {})] if namespace is not None else list(self.catalog.values())
+        for frame, name in signals:
+            if not any(name in frames.get(frame, ()) for frames in scopes):
+                where = f"namespace {namespace}" if namespace is not None else "any namespace"
+                raise KeyError(f"{frame}.{name} is not in {where}")
+
+    def subscribe(self, client_id, signals, on_frame, on_change=True, namespace=None):
+        """Call on_frame(frame, values, timestamp) whenever subscribed signals arrive"""
+        self._validate(signals, namespace)
+        frames = {}
+        for frame, name in signals:
+            frames.setdefault(frame, set()).add(name)
+        subscription = LocalSubscription(self, frames, on_frame, on_change, namespace)
+        with self._lock:
+            for frame in frames:
+                key = (namespace, frame)
+                self._routes[key] = self._routes.get(key, ()) + (subscription,)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscription.active = False
+            for frame in subscription.frames:
+                key = (subscription.namespace, frame)
+                routes = tuple(s for s in self._routes.get(key, ()) if s is not subscription)
+                if routes:
+                    self._routes[key] = routes
+                else:
+                    self._routes.pop(key, None)
+            self._last_due.pop(subscription, None)
+            pending = [entry for entry in self._pending if entry[2] is not subscription]
+            if len(pending) != len(self._pending):
+                heapq.heapify(pending)
+                self._pending = pending
+
+    def _deliver(self, subscription, frame, values, timestamp):
+        """Deliver to one subscription; one whose callback raises is dropped, not everyone"""
+        try:
+            subscription.deliver(frame, values, timestamp)
+        except Exception as e:
+            # Typically a remote subscriber that disconnected (BrokenPipeError on its connection)
+            self.failed += 1
+            self._unsubscribe(subscription)
+            print(f"⚠️  Broker {self.name}: dropped a subscription whose callback raised "
+                  f"{type(e).__name__}: {e}", file=sys.stderr)
+
+    def publisher(self, client_id, signals, namespace=None):
+        """Create a publisher for the given (frame, signal) pairs"""
+        self._validate(signals, namespace)
+        return LocalPublisher(self, client_id, signals, namespace)
+
+    def list_signals(self, namespace=None):
+        """[(namespace, frame, signal)] from the loaded interfaces, or else the subscribed ones"""
+        if self.catalog is not None:
+            listed = [(ns, frame, name) for ns, frames in self.catalog.items()
+                      for frame, names in frames.items() for name in names]
+        else:
+            routes = self._routes
+            listed = {(ns, frame, name) for (ns, frame), subscriptions in routes.items()
+                      for subscription in subscriptions for name in subscription.frames[frame]}
+        return sorted((entry for entry in listed if namespace is None or entry[0] == namespace),
+                      key=lambda entry: (entry[0] or "", entry[1], entry[2]))
+
+    def publish(self, frame, values, timestamp=None, namespace=None):
+        """Route one frame to every matching subscriber"""
+        if timestamp is None:
+            timestamp = time.time()
+        # Routes are immutable tuples, so delivery can run without the lock
+        routes = self._routes.get((namespace, frame), ())
+        self.published += 1
+        if self._impaired:
+            self._impair(routes, frame, values, timestamp)
+            return
+        for subscription in routes:
+            self._deliver(subscription, frame, values, timestamp)
+
+    def publish_batch(self, frames, timestamp=None, namespace=None):
+        """Route a sequence of (frame, values) pairs sharing one timestamp"""
+        if timestamp is None:
+            timestamp = time.time()
+        routes = self._routes
+        if self._impaired:
+            for frame, values in frames:
+                self._impair(routes.get((namespace, frame), ()), frame, values, timestamp)
+        else:
+            for frame, values in frames:
+                for subscription in routes.get((namespace, frame), ()):
+                    self._deliver(subscription, frame, values, timestamp)
+        self.published += len(frames)
+
+    def _impair(self, routes, frame, values, timestamp):
+        for subscription in routes:
+            if self.loss and self._random.random() < self.loss:
+                self.dropped += 1
+                continue
+            if not self._delayed:
+                self._deliver(subscription, frame, values, timestamp)
+                continue
+            with self._lock:
+                if not subscription.active:
+                    continue  # Cancelled since routes was read
+                due = time.perf_counter() + self.latency + self._random.uniform(0, self.jitter)
+                # Jitter stretches gaps but never reorders one subscriber's frames
+                due = max(due, self._last_due.get(subscription, 0.0))
+                self._last_due[subscription] = due
+                order = next(self._order)
+                heapq.heappush(self._pending, (due, order, subscription, frame, values, timestamp))
+                if self._pending[0][1] == order:
+                    self._wakeup.notify()  # New earliest deadline
+
+    def _deliver_due(self):
+        while True:
+            with self._lock:
+                while not self._pending or self._pending[0][0] > time.perf_counter():
+                    timeout = self._pending[0][0] - time.perf_counter() if self._pending else None
+                    self._wakeup.wait(timeout)
+                _, _, subscription, frame, values, timestamp = heapq.heappop(self._pending)
+            # _deliver contains callback errors, so this thread outlives any subscriber
+            self._deliver(subscription, frame, values, timestamp)
+
+    def close(self):
+        """Drop all subscriptions"""
+        with self._lock:
+            self._routes.clear()
+            self._pending.clear()
+            self._last_due.clear()
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+def get_local_broker(name="default"):
+    """Return the shared in-process broker registered under name
+
+    Options may follow the name as a query string, e.g.
+    local://bench?latency=0.002&jitter=0.001&loss=0.01&interfaces=path
+    """
+    name, _, query = name.partition("?")
+    options = dict(parse_qsl(query))
+    with _brokers_lock:
+        if name not in _brokers:
+            _brokers[name] = LocalBroker(name, interfaces=options.pop("interfaces", None))
+        broker = _brokers[name]
+    options.pop("interfaces", None)
+    if options:
+        broker.configure(**{key: float(value) if key != "seed" else int(value)
+                            for key, value in options.items()})
+    return broker
+
+def _no_delay(conn):
+    """Disable Nagle on a connection: replies are small and must not wait for ACKs"""
+    with socket.fromfd(conn.fileno(), socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+class BrokerServer:
+    """Serves a LocalBroker to other processes (emulator://host:port URLs)"""
+
+    def __init__(self, broker, host="127.0.0.1", port=EMULATOR_PORT):
+        self.broker = broker
+        self.listener = Listener((host, port), authkey=AUTHKEY)
+        self.address = self.listener.address
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"{EMULATOR_PREFIX}{self.address[0]}:{self.address[1]}"
+
+    def start(self):
+        """Accept clients on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, name="broker-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return  # Listener closed
+            threading.Thread(target=self._serve, args=(conn,), name="broker-client", daemon=True).start()
+
+    def _serve(self, conn):
+        _no_delay(conn)
+        send_lock = threading.Lock()
+        subscriptions = {}
+        publishers = {}
+
+        def forward(sub_id):
+            def on_frame(frame, values, timestamp):
+                with send_lock:
+                    conn.send(('frame', sub_id, frame, values, timestamp))
+            return on_frame
+
+        def reply(req_id, status, detail=None):
+            with send_lock:
+                conn.send(('reply', req_id, status, detail))
+
+        try:
+            while True:
+                message = conn.recv()
+                kind = message[0]
+                if kind == 'pub':
+                    publishers[message[1]].publish_batch(message[2])
+                elif kind == 'unsubscribe':
+                    subscription = subscriptions.pop(message[1], None)
+                    if subscription is not None:
+                        subscription.cancel()
+                else:
+                    # Requests: (kind, request id, *arguments), answered with a reply
+                    req_id = message[1]
+                    try:
+                        if kind == 'subscribe':
+                            _, _, sub_id, client_id, signals, on_change, namespace = message
+                            subscriptions[sub_id] = self.broker.subscribe(client_id, signals, forward(sub_id),
+                                                                          on_change, namespace)
+                            reply(req_id, 'ok')
+                        elif kind == 'publisher':
+                            _, _, pub_id, client_id, signals, namespace = message
+                            publishers[pub_id] = self.broker.publisher(client_id, signals, namespace)
+                            reply(req_id, 'ok')
+                        elif kind == 'list':
+                            reply(req_id, 'ok', self.broker.list_signals(message[2]))
+                        else:
+                            reply(req_id, 'error', f"unknown request {kind!r}")
+                    except KeyError as e:
+                        reply(req_id, 'error', e.args[0])
+        except (EOFError, OSError):
+            pass
+        finally:
+            for subscription in subscriptions.values():
+                subscription.cancel()
+            conn.close()
+
+    def close(self):
+        self.listener.close()
+
+class EmulatorSubscription:
+    def __init__(self, link, sub_id):
+        self.link = link
+        self.sub_id = sub_id
+
+    def cancel(self):
+        """Stop deliveries for this subscription"""
+        self.link._callbacks.pop(self.sub_id, None)
+        self.link._send(('unsubscribe', self.sub_id))
+
+class EmulatorPublisher(LocalPublisher):
+    """Publisher whose frames travel to a BrokerServer"""
+
+    def __init__(self, link, pub_id, client_id, signals, namespace=None):
+        super().__init__(link, client_id, signals, namespace)
+        self.pub_id = pub_id
+
+    def publish(self, frame, values):
+        """Publish raw signal values belonging to one frame"""
+        self._check(frame, values)
+        self.broker._send(('pub', self.pub_id, [(frame, values)]))
+
+    def publish_batch(self, frames):
+        """Publish a sequence of (frame, values) pairs in one message"""
+        for frame, values in frames:
+            self._check(frame, values)
+        self.broker._send(('pub', self.pub_id, list(frames)))
+
+class EmulatorLink:
+    """Broker link to a BrokerServer in another thread or process"""
+
+    def __init__(self, url):
+        host, _, port = url[len(EMULATOR_PREFIX):].partition(":")
+        self.url = url
+        self.conn = Client((host, int(port or EMULATOR_PORT)), authkey=AUTHKEY)
+        _no_delay(self.conn)
+        self.error = None
+        self.failed = 0
+        self._closed = False  # Set once the reader has stopped; no reply can arrive after that
+        self._send_lock = threading.Lock()
+        self._callbacks = {}
+        self._replies = {}  # Request id -> queue the caller waits on
+        self._ids = itertools.count()
+        self._reader = threading.Thread(target=self._read, name=f"emulator-{url}", daemon=True)
+        self._reader.start()
+
+    def _send(self, message):
+        with self._send_lock:
+            self.conn.send(message)
+
+    def _request(self, kind, *arguments):
+        """Send a request and wait for its reply; several may be in flight at once"""
+        req_id = next(self._ids)
+        reply = self._replies[req_id] = queue.SimpleQueue()
+        try:
+            # Checked after registering, so a reader stopping now still fails this request
+            if self._closed:
+                raise ConnectionError(f"emulator link {self.url} is closed")
+            self._send((kind, req_id) + arguments)
+            try:
+                status, detail = reply.get(timeout=REQUEST_TIMEOUT)
+            except queue.Empty:
+                raise TimeoutError(f"no reply to {kind} from {self.url} within {REQUEST_TIMEOUT:g} s") from None
+        finally:
+            del self._replies[req_id]
+        if status == 'closed':
+            raise ConnectionError(detail)
+        if status == 'error':
+            raise KeyError(detail)
+        return detail
+
+    def _read(self):
+        try:
+            while True:
+                message = self.conn.recv()
+                if message[0] == 'frame':
+                    callback = self._callbacks.get(message[1])
+                    if callback is not None:
+                        self._deliver(message[1], callback, *message[2:])
+                elif message[0] == 'reply':
+                    self._replies[message[1]].put(message[2:])
+        except (EOFError, OSError):
+            pass
+        except Exception as e:
+            self.error = e
+            print(f"❌ Emulator link {self.url} stopped: {e}")
+        finally:
+            self._closed = True
+            for reply in list(self._replies.values()):
+                reply.put(('closed', f"emulator link {self.url} closed before replying"))
+
+    def _deliver(self, sub_id, callback, frame, values, timestamp):
+        """Run one subscriber callback; one that raises is dropped, not the reader thread"""
+        try:
+            callback(frame, values, timestamp)
+        except Exception as e:
+            self.failed += 1
+            EmulatorSubscription(self, sub_id).cancel()
+            print(f"⚠️  Emulator link {self.url}: dropped a subscription whose callback raised "
+                  f"{type(e).__name__}: {e}", file=sys.stderr)
+
+    def subscribe(self, client_id, signals, on_frame, on_change=True, namespace=None):
+        """Call on_frame(frame, values, timestamp) whenever subscribed signals arrive"""
+        sub_id = next(self._ids)
+        self._callbacks[sub_id] = on_frame
+        self._request('subscribe', sub_id, client_id, list(signals), on_change, namespace)
+        return EmulatorSubscription(self, sub_id)
+
+    def publisher(self, client_id, signals, namespace=None):
+        """Create a publisher for the given (frame, signal) pairs"""
+        pub_id = next(self._ids)
+        self._request('publisher', pub_id, client_id, list(signals), namespace)
+        return EmulatorPublisher(self, pub_id, client_id, signals, namespace)
+
+    def list_signals(self, namespace=None):
+        """[(namespace, frame, signal)] the server knows, optionally for one namespace"""
+        return self._request('list', namespace)
+
+    def close(self):
+        """Disconnect; the server drops this client's subscriptions"""
+        self._callbacks.clear()
+        self.conn.close()
+
+def spawn_server(port=0, interfaces=None, latency=0.0, jitter=0.0, loss=0.0):
+    """Start the stand-in in a subprocess; returns (process, emulator:// URL)"""
+    command = [sys.executable, __file__, "--serve", "--port", str(port),
+               "--latency", str(latency), "--jitter", str(jitter), "--loss", str(loss)]
+    if interfaces:
+        command += ["--interfaces", interfaces]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    # The server announces its URL on the first line once it is listening
+    line = process.stdout.readline()
+    if not line:
+        raise RuntimeError(f"broker stand-in exited with code {process.wait()} before it was listening")
+    return process, line.split()[-1]
+
+def benchmark(link, frames=100_000, batch=100):
+    """Publish frames through link and return (frames/s delivered, frames lost)"""
+    received = threading.Event()
+    count = [0]
+
+    def on_frame(frame, values, timestamp):
+        count[0] += 1
+        if values["Sequence"] == frames - 1:
+            received.set()
+
+    subscription = link.subscribe("bench_rx", [("BenchFrame", "Sequence")], on_frame, on_change=False)
+    publisher = link.publisher("bench_tx", [("BenchFrame", "Sequence")])
+    start = time.perf_counter()
+    for first in range(0, frames, batch):
+        publisher.publish_batch([("BenchFrame", {"Sequence": i})
+                                 for i in range(first, min(first + batch, frames))])
+    received.wait(timeout=10.0)  # The last frame itself may have been dropped
+    elapsed = time.perf_counter() - start
+    subscription.cancel()
+    return count[0] / elapsed, frames - count[0]
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process RemotiveBroker stand-in")
+    parser.add_argument("--serve", action="store_true",
+                        help="serve the stand-in to other processes (default: run a throughput check)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=EMULATOR_PORT, help="0 picks a free port")
+    parser.add_argument("--interfaces",
+                        help="interfaces.json whose namespaces and DBCs define the valid signals")
+    parser.add_argument("--latency", type=float, default=0.0, help="injected delivery delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay up to this many seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="probability of dropping each delivery")
+    args = parser.parse_args()
+
+    if args.serve:
+        broker = LocalBroker("served", args.latency, args.jitter, args.loss, interfaces=args.interfaces)
+        server = BrokerServer(broker, args.host, args.port)
+        print(f"🛰️  Broker stand-in listening on {server.url}", flush=True)
+        if broker.catalog:
+            for namespace, frames in broker.catalog.items():
+                print(f"   {namespace}: {len(frames)} frames")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n\n⏹️  Broker stand-in stopped")
+        finally:
+            server.close()
+        return
+
+    # The throughput check uses its own BenchFrame, so no signal catalog here
+    broker = LocalBroker("bench", args.latency, args.jitter, args.loss)
+    print(f"🛰️  Broker stand-in throughput (latency {args.latency * 1000:g} ms, loss {args.loss:.1%})")
+    rate, lost = benchmark(broker)
+    print(f"   in-process:  {rate:12,.0f} frames/s, {lost} lost")
+    server = BrokerServer(broker, args.host, 0).start()
+    link = EmulatorLink(server.url)
+    rate, lost = benchmark(link)
+    print(f"   thread+IPC:  {rate:12,.0f} frames/s, {lost} lost")
+    link.close()
+    server.close()
+    process, url = spawn_server(0, None, args.latency, args.jitter, args.loss)
+    link = EmulatorLink(url)
+    rate, lost = benchmark(link)
+    print(f"   subprocess:  {rate:12,.0f} frames/s, {lost} lost")
+    link.close()
+    process.terminate()
+
+if __name__ == "__main__":
+    main()
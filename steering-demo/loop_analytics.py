@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Steering Loop Analytics
+Online metrics of the SteeringAngle -> CurrentAngle control loop: rolling RMS
+error, response lag, step overshoot/settling and rate-limit saturation
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from dbc_codec import steering_codec
+from ecu_simulator import MAX_RATE
+from ring_buffer import RingBuffer
+
+WINDOW_SECONDS = 20.0  # Rolling window of the RMS, lag and saturation figures
+NOMINAL_RATE = 200.0  # Samples per second the window is sized for
+MAX_LAG = 5.0  # Longest response delay the cross-correlation looks for
+LAG_RATE = 50.0  # Hz grid the window is resampled onto for the lag estimate
+STEP_THRESHOLD = 5.0  # A command jump leaving the response this many degrees off target is a step
+SETTLE_FRACTION = 0.02  # Settled once within 2% of the step size of the target...
+SETTLE_FLOOR = 1.0  # ...but never a tighter band than this (the ECU snaps within 1°)
+SATURATION = 0.95  # Slewing at 95% of the rate limit or more counts as saturated
+PUBLISH_PERIOD = 0.5
+
+ANALYTICS_SIGNALS = [("SteeringAnalytics", name) for name in
+                     ("TrackingErrorRMS", "ResponseLag", "Overshoot", "SettlingTime", "RateSaturation")]
+
+class StepResponse:
+    """Overshoot and settling time of the response to command steps, tracked block by block"""
+
+    def __init__(self, threshold=STEP_THRESHOLD):
+        self.threshold = threshold
+        self.command = None  # Last command seen, to find a step at a block boundary
+        self.step = None  # (start time, target, size) of the step in progress; size is from the response
+        self.band = SETTLE_FLOOR
+        self.peak = -np.inf  # Furthest the response went past the target, in the step's direction
+        self.last_outside = None  # Last time the response was outside the settling band
+        self.inside = False
+        self.steps = 0
+        self.settled = 0
+        self.overshoot = None  # Percent of the step, for the last completed step
+        self.settling_time = None  # Seconds; None when the last step never settled
+        self.max_overshoot = 0.0
+
+    def update(self, t, command, response):
+        if not len(t):
+            return
+        previous = command[0] if self.command is None else self.command
+        jumps = np.flatnonzero(np.abs(np.diff(command, prepend=previous)) >= self.threshold)
+        # Steps are rare, so the loop is per step; the samples in between are handled as arrays
+        a = 0
+        for start in jumps.tolist() + [len(t)]:
+            if start > a and self.step is not None:
+                self._track(t[a:start], response[a:start])
+            if start < len(t):
+                self._finish()
+                self._begin(t[start], command[start], command[start] - response[start])
+            a = start
+        self.command = command[-1]
+
+    def _begin(self, t, target, size):
+        if abs(size) < self.threshold:
+            return  # The response is already there (e.g. the command jumped back)
+        self.step = (float(t), float(target), float(size))
+        self.band = max(SETTLE_FLOOR, SETTLE_FRACTION * abs(size))
+        self.peak = -np.inf
+        self.last_outside = None
+        self.inside = False
+
+    def _track(self, t, response):
+        start, target, size = self.step
+        error = response - target
+        self.peak = max(self.peak, float((np.sign(size) * error).max()))
+        outside = np.abs(error) > self.band
+        if outside.any():
+            self.last_outside = float(t[outside][-1])
+        self.inside = not outside[-1]
+
+    def _result(self):
+        start, target, size = self.step
+        overshoot = 100.0 * max(0.0, self.peak) / abs(size)
+        settling = (self.last_outside if self.last_outside is not None else start) - start
+        return overshoot, settling if self.inside else None
+
+    def _finish(self):
+        if self.step is None:
+            return
+        self.overshoot, self.settling_time = self._result()
+        self.steps += 1
+        self.settled += self.settling_time is not None
+        self.max_overshoot = max(self.max_overshoot, self.overshoot)
+        self.step = None
+
+    def latest(self):
+        """(overshoot %, settling s) of the current step once it has settled, else of the last one"""
+        if self.step is not None and self.inside:
+            return self._result()
+        return self.overshoot, self.settling_time
+
+class LoopAnalytics:
+    """Rolling control-loop metrics over (time, command, response) sample blocks
+
+    update() costs O(1) per sample: the squared error and the time spent
+    rate-limited are kept as running sums next to a ring of the window,
+    adding what arrives and subtracting what falls out of it, and step
+    responses are tracked incrementally. Only the lag estimate looks at
+    the whole window, and only when it is asked for.
+    """
+
+    def __init__(self, window=WINDOW_SECONDS, rate=NOMINAL_RATE, max_rate=MAX_RATE,
+                 threshold=STEP_THRESHOLD):
+        self.window = window
+        self.max_rate = max_rate
+        self.ring = RingBuffer(int(window * rate), ('time', 'command', 'response', 'error2', 'saturated'))
+        self.steps = StepResponse(threshold)
+        self.samples = 0
+        self._count = 0  # Newest ring samples inside the window; older ones are kept but ignored
+        self._error2 = 0.0
+        self._saturated = 0.0
+        self._since_resum = 0
+        self._last_response = None
+        self._last_move = None  # Time the response last changed
+
+    def _saturated_time(self, t, response):
+        """Per sample: the time since the response last moved, if that move was at the rate limit"""
+        if self._last_response is None:
+            self._last_response, self._last_move = float(response[0]), float(t[0])
+        previous = np.empty_like(response)
+        previous[0] = self._last_response
+        previous[1:] = response[:-1]
+        moved = np.flatnonzero(response != previous)
+        saturated = np.zeros(len(t))
+        if len(moved):
+            # Broker samples hold the response between status frames, so rates are
+            # taken between moves rather than between samples
+            dt = np.diff(t[moved], prepend=self._last_move)
+            rate = np.abs(np.diff(response[moved], prepend=self._last_response)) / np.maximum(dt, 1e-9)
+            saturated[moved] = np.where(rate >= SATURATION * self.max_rate, dt, 0.0)
+            self._last_move = float(t[moved[-1]])
+        self._last_response = float(response[-1])
+        return saturated
+
+    def update(self, block):
+        """Add a (3, n) block of samples, e.g. a SampleQueue drain"""
+        block = np.asarray(block, dtype=np.float64)
+        n = block.shape[1]
+        if not n:
+            return
+        t, command, response = block
+        error2 = (command - response) ** 2
+        saturated = self._saturated_time(t, response)
+        self.steps.update(t, command, response)
+
+        ring = self.ring
+        # Samples the ring is about to overwrite that are still inside the window
+        overwritten = min(self._count, len(ring) + n - ring.capacity - (len(ring) - self._count))
+        self._drop(overwritten)
+        ring.extend(np.vstack([t, command, response, error2, saturated]))
+        self._count = min(ring.capacity, self._count + n)
+        self._error2 += error2[-ring.capacity:].sum()
+        self._saturated += saturated[-ring.capacity:].sum()
+        # Then whatever has aged out of the window (a binary search, the times are sorted)
+        self._drop(int(np.searchsorted(self._view('time'), t[-1] - self.window)))
+
+        self._since_resum += n
+        if self._since_resum >= ring.capacity:
+            # Re-add from scratch once per ring's worth so rounding never accumulates
+            self._error2 = self._view('error2').sum()
+            self._saturated = self._view('saturated').sum()
+            self._since_resum = 0
+        self.samples += n
+
+    def _view(self, column):
+        return self.ring.view(column, last=self._count)
+
+    def _drop(self, count):
+        """Take the oldest count samples of the window out of the running sums"""
+        if count <= 0:
+            return
+        self._error2 -= self._view('error2')[:count].sum()
+        self._saturated -= self._view('saturated')[:count].sum()
+        self._count -= count
+
+    def rms(self):
+        """RMS of command - response over the window, in degrees"""
+        return float(np.sqrt(max(self._error2, 0.0) / self._count)) if self._count else None
+
+    def saturation(self):
+        """Percent of the window's time the response slewed at the rate limit"""
+        if self._count < 2:
+            return None
+        t = self._view('time')
+        span = t[-1] - t[0]
+        return float(min(100.0, 100.0 * max(self._saturated, 0.0) / span)) if span > 0 else None
+
+    def lag(self):
+        """Delay of the response behind the command in seconds (cross-correlation peak)"""
+        if self._count < 2:
+            return None
+        t = self._view('time')
+        if t[-1] - t[0] < 2 * MAX_LAG:
+            return None
+        # Broker samples are irregular, so correlate on a uniform grid
+        grid = np.arange(t[0], t[-1], 1.0 / LAG_RATE)
+        command = np.interp(grid, t, self._view('command'))
+        response = np.interp(grid, t, self._view('response'))
+        command -= command.mean()
+        response -= response.mean()
+        if not command.any() or not response.any():
+            return None  # A flat signal has no lag
+        n = len(grid)
+        size = 1 << (2 * n - 1).bit_length()
+        # corr[k] = sum_i response[i + k] * command[i]: the response k steps after the command
+        corr = np.fft.irfft(np.fft.rfft(response, size) * np.conj(np.fft.rfft(command, size)), size)
+        lags = min(int(MAX_LAG * LAG_RATE), n - 1)
+        corr = corr[:lags + 1] / (n - np.arange(lags + 1))  # Unbiased: fewer overlapping samples per lag
+        k = int(np.argmax(corr))
+        shift = 0.0
+        if 0 < k < lags:
+            y0, y1, y2 = corr[k - 1:k + 2]
+            if y0 - 2 * y1 + y2:
+                shift = 0.5 * (y0 - y2) / (y0 - 2 * y1 + y2)  # Parabolic peak between grid points
+        return (k + shift) / LAG_RATE
+
+    def report(self):
+        overshoot, settling = self.steps.latest()
+        return {
+            'rms_error': self.rms(),
+            'lag': self.lag(),
+            'overshoot': overshoot,
+            'settling_time': settling,
+            'saturation': self.saturation(),
+            'steps': self.steps.steps,
+            'settled': self.steps.settled,
+            'max_overshoot': self.steps.max_overshoot,
+            'samples': self.samples,
+        }
+
+    def format(self, report=None):
+        r = report or self.report()
+
+        def show(value, fmt, none="-"):
+            return none if value is None else format(value, fmt)
+
+        lag = None if r['lag'] is None else r['lag'] * 1000
+        settled = "no step yet" if r['overshoot'] is None else (
+            f"overshoot {r['overshoot']:.1f}%, "
+            f"{'settled in ' + show(r['settling_time'], '.2f') + 's' if r['settling_time'] is not None else 'not settled'}")
+        return (f"RMS {show(r['rms_error'], '.1f')}° | lag {show(lag, '.0f')} ms | "
+                f"saturated {show(r['saturation'], '.0f')}% | {settled} ({r['steps']} steps)")
+
+class AnalyticsPublisher:
+    """Publishes LoopAnalytics reports back to the broker as SteeringAnalytics frames"""
+
+    def __init__(self, link, namespace=None):
+        self.publisher = link.publisher("loop_analytics", ANALYTICS_SIGNALS, namespace=namespace)
+        self.message = steering_codec()["SteeringAnalytics"]
+        self.published = 0
+
+    def publish(self, report):
+        message = self.message
+        physical = {
+            "TrackingErrorRMS": report['rms_error'],
+            "ResponseLag": report['lag'],
+            "Overshoot": report['overshoot'],
+            "RateSaturation": report['saturation'],
+        }
+        if report['overshoot'] is not None:
+            # A step that has not settled reads as the signal's maximum (to_raw clamps)
+            settling = report['settling_time']
+            physical["SettlingTime"] = settling if settling is not None else 1e9
+        values = {name: message.to_raw(name, value) for name, value in physical.items() if value is not None}
+        if values:
+            self.publisher.publish("SteeringAnalytics", values)
+            self.published += 1
+
+def analyze_log(path, analytics):
+    """Feed a recorded log through analytics as fast as it decodes; returns the samples seen"""
+    from traffic_log import open_log, steering_blocks
+
+    log = open_log(path)
+    try:
+        for samples, _, _, _ in steering_blocks(log):
+            analytics.update(samples)
+    finally:
+        log.close()
+    return analytics.samples
+
+def simulate(duration, analytics, link=None, period=PUBLISH_PERIOD):
+    """The built-in simulation on a fast SimClock, analysed (and published) every period"""
+    from signal_source import SimulatedSteering
+    from sim_clock import SimClock
+
+    source = SimulatedSteering(clock=SimClock(step=1.0 / NOMINAL_RATE, mode='fast'))
+    publisher = AnalyticsPublisher(link) if link is not None else None
+
+    def tick(now):
+        analytics.update(source.queue.drain())
+        if publisher is not None:
+            publisher.publish(analytics.report())
+
+    source.schedule()
+    source.clock.every(period, tick, offset=period)
+    source.clock.run(duration)
+    return publisher
+
+def main():
+    from broker_link import connect
+    from metrics import Throttle
+
+    parser = argparse.ArgumentParser(description="Online steering control-loop analytics")
+    parser.add_argument("--broker",
+                        help="analyse live command/status frames on this broker and publish "
+                             "SteeringAnalytics back to it (default: the built-in simulation)")
+    parser.add_argument("--replay", metavar="LOG", help="analyse a recorded log or capture as fast as it decodes")
+    parser.add_argument("--duration", type=float, default=600.0,
+                        help="simulated seconds (simulation), or seconds to run (--broker)")
+    parser.add_argument("--window", type=float, default=WINDOW_SECONDS, help="rolling window in seconds")
+    parser.add_argument("--max-rate", type=float,
+                        help="ECU rate limit in deg/s (default: that of the source's ECU)")
+    parser.add_argument("--step-threshold", type=float, default=STEP_THRESHOLD,
+                        help="command jump in degrees that starts a new step")
+    parser.add_argument("--period", type=float, default=PUBLISH_PERIOD,
+                        help="seconds between published SteeringAnalytics frames")
+    parser.add_argument("--log-rate", type=float, default=1.0, help="console lines per second with --broker")
+    args = parser.parse_args()
+
+    from signal_source import BrokerSteering, SimulatedSteering
+
+    try:
+        if args.broker:
+            source = BrokerSteering(connect(args.broker))
+            analytics = LoopAnalytics(args.window, source.rate, args.max_rate or source.max_rate,
+                                      args.step_threshold)
+            publisher = AnalyticsPublisher(source.link)
+            log = Throttle(args.log_rate)
+            print(f"📐 Loop analytics on {args.broker}: SteeringAnalytics every {args.period:g}s")
+            source.start()
+            start = time.monotonic()
+            try:
+                while args.duration is None or time.monotonic() - start < args.duration:
+                    time.sleep(args.period)
+                    analytics.update(source.queue.drain())
+                    report = analytics.report()
+                    publisher.publish(report)
+                    if log.allow():
+                        print(f"   {analytics.format(report)}")
+            finally:
+                source.stop()
+                source.link.close()
+            print(f"✓ {publisher.published} SteeringAnalytics frames published")
+            return
+
+        if args.replay:
+            analytics = LoopAnalytics(args.window, NOMINAL_RATE, args.max_rate or BrokerSteering.max_rate,
+                                      args.step_threshold)
+            print(f"📐 Loop analytics over {args.replay}")
+            start = time.perf_counter()
+            analyze_log(args.replay, analytics)
+        else:
+            analytics = LoopAnalytics(args.window, NOMINAL_RATE, args.max_rate or SimulatedSteering.max_rate,
+                                      args.step_threshold)
+            print(f"📐 Loop analytics over {args.duration:.0f} simulated seconds, published to local://analytics")
+            start = time.perf_counter()
+            link = connect("local://analytics")
+            publisher = simulate(args.duration, analytics, link, args.period)
+            link.close()
+            print(f"   {publisher.published} SteeringAnalytics frames published")
+        elapsed = time.perf_counter() - start
+        print(f"✓ {analytics.format()}")
+        print(f"   {analytics.samples:,} samples in {elapsed:.2f}s "
+              f"({analytics.samples / max(elapsed, 1e-9) / 1e6:.2f} M samples/s), "
+              f"{analytics.steps.settled}/{analytics.steps.steps} steps settled, "
+              f"max overshoot {analytics.steps.max_overshoot:.1f}%")
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Analytics stopped")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Pipeline Metrics
+Counters, gauges and HDR latency histograms for the publish/receive path,
+exported as Prometheus text or JSON over HTTP or to a file
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+from latency_stats import HISTOGRAM_EDGES_MS
+
+METRICS_PORT = 9108
+SUB_BITS = 8  # HDR precision: 2**SUB_BITS sub-buckets per power of two (< 0.8% error)
+MAX_EXPONENT = 44  # Largest recordable value is about 2**44 ns (4.9 hours)
+QUANTILES = (50, 90, 99, 99.9)
+EXPORT_INTERVAL = 5.0
+
+def _sample_text(value):
+    """A sample value at full precision (:g would turn 1234567 into 1.23457e+06)"""
+    if isinstance(value, int):
+        return str(int(value))  # int() also turns a gauge's True into 1
+    if value != value:
+        return "NaN"
+    if value in (float('inf'), float('-inf')):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+class Counter:
+    """Monotonic count"""
+
+    kind = 'counter'
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def export(self):
+        return self.value
+
+class Gauge:
+    """Value that goes up and down, or is read from a callback at export time"""
+
+    kind = 'gauge'
+
+    def __init__(self, read=None):
+        self.value = 0.0
+        self.read = read
+
+    def set(self, value):
+        self.value = value
+
+    def export(self):
+        return self.read() if self.read is not None else self.value
+
+class Histogram:
+    """HDR histogram of durations: log-linear integer buckets, constant-time record
+
+    Values are kept in nanoseconds. Below 2**SUB_BITS every value has its
+    own bucket; above that each power of two is split into 2**(SUB_BITS-1)
+    buckets, so any recorded value is reproduced within 1/2**(SUB_BITS-1).
+    """
+
+    kind = 'histogram'
+
+    def __init__(self):
+        half = 1 << (SUB_BITS - 1)
+        self.counts = [0] * ((MAX_EXPONENT - SUB_BITS + 2) * half)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _index(ns):
+        if ns < (1 << SUB_BITS):
+            return ns
+        shift = ns.bit_length() - SUB_BITS
+        return (shift << (SUB_BITS - 1)) + (ns >> shift)
+
+    @staticmethod
+    def _value(index):
+        """Upper edge (ns) of a bucket"""
+        if index < (1 << SUB_BITS):
+            return index
+        shift = (index >> (SUB_BITS - 1)) - 1
+        mantissa = index - (shift << (SUB_BITS - 1))
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds):
+        ns = max(0, int(seconds * 1e9))
+        index = min(self._index(ns), len(self.counts) - 1)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if ns > self.max:
+                self.max = ns
+
+    def time(self):
+        """Context manager recording the duration of its block"""
+        return _Timer(self)
+
+    def quantile(self, p):
+        """p-th percentile (0-100) in seconds"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(p / 100.0 * self.count)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._value(index), self.max) / 1e9
+        return self.max / 1e9
+
+    def buckets(self, edges_ms=HISTOGRAM_EDGES_MS):
+        """Cumulative counts at each edge (ms), as Prometheus 'le' buckets"""
+        cumulative = []
+        seen = 0
+        index = 0
+        counts = self.counts
+        for edge in edges_ms:
+            limit = self._index(int(edge * 1e6)) + 1  # 'le' includes the edge
+            while index < limit:
+                seen += counts[index]
+                index += 1
+            cumulative.append(seen)
+        return cumulative
+
+    def export(self):
+        summary = {'count': self.count, 'sum': self.sum, 'max': self.max / 1e9}
+        for p in QUANTILES:
+            summary[f'p{p:g}'] = self.quantile(p)
+        return summary
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.start)
+
+class MetricsRegistry:
+    """Named metric families, each with one child per label set"""
+
+    def __init__(self):
+        self._families = {}  # name -> (kind, help, {labels: metric})
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = (cls.kind, help, {})
+            elif family[0] != cls.kind:
+                raise ValueError(f"{name} is already a {family[0]}")
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = cls(**kwargs)
+            return metric
+
+    def counter(self, name, help="", **labels):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help="", read=None, **labels):
+        return self._get(Gauge, name, help, labels, read=read)
+
+    def histogram(self, name, help="", **labels):
+        return self._get(Histogram, name, help, labels)
+
+    def snapshot(self):
+        """{name: {'type', 'help', 'values': [{'labels', 'value'}]}} for JSON export"""
+        with self._lock:
+            families = {name: (kind, help, dict(children)) for name, (kind, help, children) in
+                        self._families.items()}
+        return {name: {'type': kind, 'help': help,
+                       'values': [{'labels': dict(labels), 'value': metric.export()}
+                                  for labels, metric in children.items()]}
+                for name, (kind, help, children) in sorted(families.items())}
+
+    def prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            families = sorted((name, kind, help, list(children.items())) for name, (kind, help, children)
+                              in self._families.items())
+        lines = []
+        for name, kind, help, children in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in children:
+                if kind != 'histogram':
+                    lines.append(f"{name}{_label_text(labels)} {_sample_text(metric.export())}")
+                    continue
+                for edge, count in zip(HISTOGRAM_EDGES_MS, metric.buckets()):
+                    lines.append(f"{name}_bucket{_label_text(labels + (('le', f'{edge / 1000:g}'),))} {count}")
+                lines.append(f"{name}_bucket{_label_text(labels + (('le', '+Inf'),))} {metric.count}")
+                lines.append(f"{name}_sum{_label_text(labels)} {_sample_text(metric.sum)}")
+                lines.append(f"{name}_count{_label_text(labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()  # Process-wide default, like prometheus_client's
+
+class MetricsLink:
+    """Broker link wrapper counting published and received frames and handler time"""
+
+    def __init__(self, link, registry=REGISTRY):
+        self.link = link
+        self.registry = registry
+        self.handler_time = registry.histogram("steering_receive_handler_seconds",
+                                               "Time spent in subscriber callbacks")
+
+    def publisher(self, client_id, signals, namespace=None):
+        return MetricsPublisher(self.link.publisher(client_id, signals, namespace), self.registry)
+
+    def subscribe(self, client_id, signals, on_frame, on_change=True, namespace=None):
+        registry = self.registry
+        received = {}
+        handler_time = self.handler_time
+
+        def counted(frame, values, timestamp):
+            counter = received.get(frame)
+            if counter is None:
+                counter = received[frame] = registry.counter(
+                    "steering_frames_received_total", "Frames delivered to subscribers", frame=frame)
+            counter.inc()
+            start = time.perf_counter()
+            on_frame(frame, values, timestamp)
+            handler_time.record(time.perf_counter() - start)
+        return self.link.subscribe(client_id, signals, counted, on_change, namespace)
+
+    def list_signals(self, namespace=None):
+        return self.link.list_signals(namespace)
+
+    def close(self):
+        self.link.close()
+
+class MetricsPublisher:
+    """Publisher wrapper counting frames and timing the publish call"""
+
+    def __init__(self, publisher, registry=REGISTRY):
+        self.publisher = publisher
+        self.registry = registry
+        self.publish_time = registry.histogram("steering_publish_seconds", "Time spent in publish calls")
+        self._published = {}
+
+    def _count(self, frame):
+        counter = self._published.get(frame)
+        if counter is None:
+            counter = self._published[frame] = self.registry.counter(
+                "steering_frames_published_total", "Frames handed to the broker", frame=frame)
+        counter.inc()
+
+    def publish(self, frame, values):
+        start = time.perf_counter()
+        self.publisher.publish(frame, values)
+        self.publish_time.record(time.perf_counter() - start)
+        self._count(frame)
+
+    def publish_batch(self, frames):
+        start = time.perf_counter()
+        self.publisher.publish_batch(frames)
+        self.publish_time.record(time.perf_counter() - start)
+        for frame, _ in frames:
+            self._count(frame)
+
+class Throttle:
+    """Allows at most rate events per second (None: unlimited, 0: none)"""
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self.suppressed = 0
+        self._next = 0.0
+
+    def allow(self):
+        if self.rate is None:
+            return True
+        now = time.monotonic()
+        if self.rate > 0 and now >= self._next:
+            self._next = max(self._next + 1.0 / self.rate, now - 1.0)
+            return True
+        self.suppressed += 1
+        return False
+
+class MetricsServer:
+    """/metrics (Prometheus text) and /metrics.json on a background HTTP server"""
+
+    def __init__(self, registry=REGISTRY, host="127.0.0.1", port=METRICS_PORT):
+        import http.server  # Only exporting processes pay for the HTTP stack
+
+        registry_ = registry
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body = json.dumps(registry_.snapshot()).encode()
+                    content_type = "application/json"
+                elif self.path.startswith("/metrics"):
+                    body = registry_.prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are not worth a console line each
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}/metrics"
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class FileSink:
+    """Rewrites a metrics file every interval: Prometheus text, or JSON for *.json
+
+    Each write goes to a temporary file that is renamed over the target, so
+    a node_exporter textfile collector or a tail never sees half a file.
+    """
+
+    def __init__(self, path, registry=REGISTRY, interval=EXPORT_INTERVAL):
+        self.path = path
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+        self.thread.start()
+
+    def write(self):
+        if self.path.endswith(".json"):
+            text = json.dumps({'time': time.time(), 'metrics': self.registry.snapshot()}, indent=1)
+        else:
+            text = self.registry.prometheus()
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            f.write(text)
+        os.replace(temporary, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def close(self):
+        self._stop.set()
+        self.thread.join()
+        self.write()  # Final values on exit
+
+def add_metrics_arguments(parser, log_rate=True):
+    """The --metrics-port/--metrics-file (and --log-rate) options shared by the demo scripts"""
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help=f"serve /metrics and /metrics.json on this port (e.g. {METRICS_PORT})")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="rewrite this file with the metrics (JSON if it ends in .json)")
+    parser.add_argument("--metrics-interval", type=float, default=EXPORT_INTERVAL,
+                        help="seconds between --metrics-file writes")
+    if log_rate:
+        parser.add_argument("--log-rate", type=float, metavar="HZ",
+                            help="at most this many per-message console lines per second (0: none)")
+
+def start_metrics(args, link, registry=REGISTRY):
+    """(link, exporters): link instrumented and exporters started when metrics were requested"""
+    exporters = []
+    if args.metrics_port is not None:
+        server = MetricsServer(registry, port=args.metrics_port)
+        print(f"📈 Metrics at {server.url} (and {server.url}.json)")
+        exporters.append(server)
+    if args.metrics_file:
+        exporters.append(FileSink(args.metrics_file, registry, args.metrics_interval))
+        print(f"📈 Metrics written to {args.metrics_file} every {args.metrics_interval:g}s")
+    if exporters:
+        link = MetricsLink(link, registry)
+    return link, exporters
+
+def benchmark(records=1_000_000):
+    """Nanoseconds per Histogram.record and Counter.inc"""
+    histogram = Histogram()
+    counter = Counter()
+    start = time.perf_counter()
+    for i in range(records):
+        histogram.record(i * 1e-9)
+    record_ns = (time.perf_counter() - start) / records * 1e9
+    start = time.perf_counter()
+    for _ in range(records):
+        counter.inc()
+    return record_ns, (time.perf_counter() - start) / records * 1e9, histogram
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline metrics")
+    parser.add_argument("--records", type=int, default=1_000_000, help="samples for the overhead benchmark")
+    args = parser.parse_args()
+
+    print("📈 Metrics instrumentation overhead")
+    record_ns, inc_ns, histogram = benchmark(args.records)
+    print(f"   Histogram.record: {record_ns:6.0f} ns | Counter.inc: {inc_ns:6.0f} ns")
+    exact = (args.records - 1) * 0.99
+    error = abs(histogram.quantile(99) * 1e9 - exact) / exact * 100
+    print(f"   p99 of 0..{args.records - 1} ns: {histogram.quantile(99) * 1e9:,.0f} ns "
+          f"({error:.2f}% off the exact value)")
+
+if __name__ == "__main__":
+    main()
@@ -4,35 +4,67 @@ Modern CAN Bus Network Topology Visualizer
 Uses NetworkX for professional graph rendering with animated message flow
 """
 
+import argparse
+
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
 import networkx as nx
-from collections import deque
 import numpy as np
 import time
 import math
 
+from decimate import METHODS, axes_points, decimate
+from ring_buffer import RingBuffer
+from broker_link import connect
+from signal_source import REPLAY_URL, make_source
+from rate_meter import RateMeter, scale
+from topology_model import DEFAULT_INTERFACES, build_topology, frame_catalog, load_layout
+
 # Configuration
-MAX_POINTS = 50  # Reduced from 100 to reduce memory
+HISTORY_SECONDS = 11  # Default visible window; the plots are decimated, so hours work too
 UPDATE_INTERVAL = 100  # Increased from 50ms to 100ms (10 FPS instead of 20 FPS)
+WINDOW_STEP = 5 / 11  # Jump the time axis by this fraction so the blit background stays valid
+
+# Edge rendering
+EDGE_CURVATURE = 0.1  # Same bend as connectionstyle='arc3,rad=0.1'
+EDGE_SAMPLES = 16
+ARROW_POSITION = 0.7  # Arrow heads sit 70% of the way along each edge
+ARROW_SIZE = 0.06
+LEGEND_TX_LIMIT = 6
+
+# Traffic → edge styling
+FULL_SCALE_MSGS = 1000  # msgs/s at which an edge reaches full width
+FULL_SCALE_BYTES = 62500  # bytes/s at full opacity (a saturated 500 kbit/s bus)
+SIMULATED_FRAMES = 1  # Frames per simulated sample on networks without the steering frames
 
 class ModernCANTopology:
-    def __init__(self):
-        # Data buffers
-        self.times = deque(maxlen=MAX_POINTS)
-        self.commands = deque(maxlen=MAX_POINTS)
-        self.responses = deque(maxlen=MAX_POINTS)
-
-        # Simulation state
-        self.current_angle = 0.0
-        self.target_angle = 0.0
-        self.start_time = time.time()
-        self.message_activity = {'command': 0, 'status': 0}
-
-        # Create network graph
-        self.G = nx.DiGraph()
+    def __init__(self, interfaces=DEFAULT_INTERFACES, broker=None, window=HISTORY_SECONDS,
+                 method='minmax', replay=None, speed=1.0):
+        # Samples are produced on their own thread at full rate; frames only drain them
+        self.source = make_source(broker, self._simulate_traffic, replay, speed)
+        if replay:
+            broker = REPLAY_URL  # Measure the replayed frames like live ones
+
+        # Data buffers (preallocated; views feed set_data without list copies)
+        self.window = window
+        self.method = method
+        self.samples = RingBuffer(int(window * self.source.rate),
+                                  ('time', 'command', 'response'))
+
+        # Create network graph from interfaces.json and its DBC files
+        self.interfaces = interfaces
         self._build_network()
 
+        # Edge highlighting follows measured per-frame-id rates
+        self.meter = RateMeter()
+        self.catalog = frame_catalog(interfaces)
+        self.subscription = None
+        if broker:
+            self.link = connect(broker)
+            self.subscription = self.meter.attach(self.link, self.catalog, "topology_visualizer")
+
         # Create figure
         self.fig = plt.figure(figsize=(18, 10))
         gs = self.fig.add_gridspec(2, 2, height_ratios=[2, 1], width_ratios=[1.5, 1],
@@ -53,80 +85,10 @@ class ModernCANTopology:
         self._setup_data_plots()
 
     def _build_network(self):
-        """Build the network graph using NetworkX"""
-        # Add nodes with attributes
-        self.G.add_node('Gateway',
-                       node_type='ecu',
-                       color='lightblue',
-                       size=3000,
-                       label='Gateway\n(Publisher)')
-
-        self.G.add_node('RemotiveBroker',
-                       node_type='broker',
-                       color='lightgreen',
-                       size=4000,
-                       label='RemotiveBroker\nlocalhost:50051')
-
-        self.G.add_node('Steering_ECU',
-                       node_type='ecu',
-                       color='lightcoral',
-                       size=3000,
-                       label='Steering ECU\n(Subscriber)')
-
-        self.G.add_node('CAN_Bus',
-                       node_type='bus',
-                       color='gold',
-                       size=2500,
-                       label='Virtual CAN\nSteeringBus')
-
-        # Add edges with message types
-        # Gateway publishes commands to bus
-        self.G.add_edge('Gateway', 'CAN_Bus',
-                       message='SteeringCommand',
-                       msg_id='100',
-                       direction='TX',
-                       color='blue',
-                       weight=2)
-
-        # Bus routes to broker
-        self.G.add_edge('CAN_Bus', 'RemotiveBroker',
-                       message='CAN Traffic',
-                       msg_id='*',
-                       direction='RX/TX',
-                       color='gray',
-                       weight=3)
-
-        # Broker routes to ECU
-        self.G.add_edge('RemotiveBroker', 'Steering_ECU',
-                       message='SteeringCommand',
-                       msg_id='100',
-                       direction='RX',
-                       color='blue',
-                       weight=2)
-
-        # ECU responds with status
-        self.G.add_edge('Steering_ECU', 'RemotiveBroker',
-                       message='SteeringStatus',
-                       msg_id='200',
-                       direction='TX',
-                       color='red',
-                       weight=2)
-
-        # Broker routes back to bus
-        self.G.add_edge('RemotiveBroker', 'CAN_Bus',
-                       message='CAN Traffic',
-                       msg_id='*',
-                       direction='RX/TX',
-                       color='gray',
-                       weight=3)
-
-        # Bus delivers to gateway
-        self.G.add_edge('CAN_Bus', 'Gateway',
-                       message='SteeringStatus',
-                       msg_id='200',
-                       direction='RX',
-                       color='red',
-                       weight=2)
+        """Build the network graph from the configured chains and DBC node lists"""
+        self.G = build_topology(self.interfaces)
+        self.frame_ids = np.array(sorted({frame_id for _, _, data in self.G.edges(data=True)
+                                          for frame_id, _ in data['frames']}), dtype=np.int64)
 
     def _setup_network_view(self):
         """Setup the network topology visualization"""
@@ -135,26 +97,21 @@ class ModernCANTopology:
                                  fontsize=14, fontweight='bold', pad=20)
         self.ax_network.axis('off')
 
-        # Use better spacing for clear visualization
-        # Arrange in a diamond/star pattern with broker in center
-        pos = {
-            'Gateway': (0, 1),           # Left
-            'CAN_Bus': (1, 2),           # Top
-            'RemotiveBroker': (1, 1),    # Center
-            'Steering_ECU': (2, 1)       # Right
-        }
-        self.pos = pos
-
-        # Adjust axis limits for better view
-        self.ax_network.set_xlim(-0.5, 2.5)
-        self.ax_network.set_ylim(0.3, 2.7)
-
-        # Draw boundary boxes to separate RemotiveLabs infrastructure from demo
+        # Layout is computed once per topology and cached on disk
+        self.pos = pos = load_layout(self.G)
+        xy = np.array(list(pos.values()))
+        (xmin, ymin), (xmax, ymax) = xy.min(axis=0), xy.max(axis=0)
+        self.ax_network.set_xlim(xmin - 0.6, xmax + 0.6)
+        self.ax_network.set_ylim(ymin - 0.5, ymax + 0.7)
+
+        # Draw boundary box to separate RemotiveLabs infrastructure from the ECUs
         from matplotlib.patches import FancyBboxPatch
 
-        # RemotiveLabs Infrastructure box (covers broker and CAN bus)
+        infra = np.array([pos[n] for n, d in self.G.nodes(data=True)
+                          if d.get('node_type') in ('broker', 'bus')])
+        (ix0, iy0), (ix1, iy1) = infra.min(axis=0) - 0.3, infra.max(axis=0) + 0.3
         remotive_box = FancyBboxPatch(
-            (0.4, 0.5), 1.3, 1.9,
+            (ix0, iy0), ix1 - ix0, iy1 - iy0,
             boxstyle="round,pad=0.05",
             facecolor='lightgreen',
             edgecolor='darkgreen',
@@ -163,50 +120,18 @@ class ModernCANTopology:
             zorder=0
         )
         self.ax_network.add_patch(remotive_box)
-        self.ax_network.text(1.05, 2.55, 'RemotiveLabs Infrastructure',
+        self.ax_network.text((ix0 + ix1) / 2, iy1 + 0.12, 'RemotiveLabs Infrastructure',
                            ha='center', fontsize=10, fontweight='bold',
                            color='darkgreen', bbox=dict(boxstyle='round,pad=0.3',
                                                        facecolor='lightgreen',
                                                        alpha=0.8))
 
-        # Demo/Simulation box (covers gateway and ECU)
-        demo_box_left = FancyBboxPatch(
-            (-0.4, 0.5), 0.7, 1.0,
-            boxstyle="round,pad=0.05",
-            facecolor='lightyellow',
-            edgecolor='orange',
-            linewidth=3,
-            alpha=0.15,
-            zorder=0
-        )
-        self.ax_network.add_patch(demo_box_left)
-
-        demo_box_right = FancyBboxPatch(
-            (1.8, 0.5), 0.7, 1.0,
-            boxstyle="round,pad=0.05",
-            facecolor='lightyellow',
-            edgecolor='orange',
-            linewidth=3,
-            alpha=0.15,
-            zorder=0
-        )
-        self.ax_network.add_patch(demo_box_right)
-
-        self.ax_network.text(-0.05, 0.45, 'Demo Code',
-                           ha='center', fontsize=9, fontweight='bold',
-                           color='darkorange', bbox=dict(boxstyle='round,pad=0.3',
-                                                        facecolor='lightyellow',
-                                                        alpha=0.8))
-        self.ax_network.text(2.15, 0.45, 'Demo Code',
-                           ha='center', fontsize=9, fontweight='bold',
-                           color='darkorange', bbox=dict(boxstyle='round,pad=0.3',
-                                                        facecolor='lightyellow',
-                                                        alpha=0.8))
-
         # Get node attributes
         node_colors = [self.G.nodes[node]['color'] for node in self.G.nodes()]
         node_sizes = [self.G.nodes[node]['size'] for node in self.G.nodes()]
-        node_labels = {node: self.G.nodes[node]['label'] for node in self.G.nodes()}
+        show_all = self.G.graph['show_labels']
+        node_labels = {node: data['label'] for node, data in self.G.nodes(data=True)
+                       if show_all or data.get('node_type') != 'ecu'}
 
         # Draw nodes
         nx.draw_networkx_nodes(self.G, pos,
@@ -216,64 +141,104 @@ class ModernCANTopology:
                               alpha=0.9,
                               ax=self.ax_network,
                               edgecolors='black',
-                              linewidths=2)
+                              linewidths=2 if show_all else 0.5)
 
         # Draw node labels
         nx.draw_networkx_labels(self.G, pos,
                                labels=node_labels,
-                               font_size=9,
+                               font_size=9 if show_all else 7,
                                font_weight='bold',
                                ax=self.ax_network)
 
-        # Store edge artists for animation
-        self.edge_artists = {}
-
-    def _draw_animated_edges(self):
-        """Draw edges with animation based on message activity"""
-        # Remove old edge drawings
-        for artist in self.edge_artists.values():
-            if artist in self.ax_network.collections or artist in self.ax_network.patches:
-                artist.remove()
-        self.edge_artists.clear()
-
-        # Draw each edge with appropriate styling
-        for edge in self.G.edges(data=True):
-            src, dst, data = edge
-
-            # Calculate edge intensity based on message type
-            alpha = 0.4
-            width = data.get('weight', 1)
-
-            # Animate command flow (blue edges)
-            if data.get('color') == 'blue':
-                if self.message_activity['command'] > 0:
-                    alpha = 0.9
-                    width = width * 1.5
-
-            # Animate status flow (red edges)
-            elif data.get('color') == 'red':
-                if self.message_activity['status'] > 0:
-                    alpha = 0.9
-                    width = width * 1.5
-
-            # Draw edge
-            edge_collection = nx.draw_networkx_edges(
-                self.G, self.pos,
-                edgelist=[(src, dst)],
-                edge_color=data.get('color', 'gray'),
-                width=width,
-                alpha=alpha,
-                arrows=True,
-                arrowsize=20,
-                arrowstyle='->',
-                connectionstyle='arc3,rad=0.1',
-                ax=self.ax_network
-            )
-
-            if edge_collection:
-                self.edge_artists[f"{src}-{dst}"] = edge_collection
-
-        # Draw edge labels (message info)
+        # Edges, labels and legend are created once; frames only restyle them
+        self._create_edge_artists()
+        if show_all:
+            self._draw_edge_labels()
+        self._add_legend()
+
+        # Live status lives inside the axes so it can be blitted
+        self.status_text = self.ax_network.text(
+            0.5, 0.01, '', transform=self.ax_network.transAxes,
+            ha='center', va='bottom', fontsize=11, fontweight='bold')
+
+    def _node_radius(self, node):
+        """Approximate node marker radius in data units"""
+        radius_px = math.sqrt(self.G.nodes[node].get('size', 300)) / 2 * self.fig.dpi / 72
+        origin, unit = self.ax_network.transData.transform([[0, 0], [1, 1]])
+        return radius_px / max(abs(unit[0] - origin[0]), 1e-9)
+
+    def _edge_curves(self, edges, rad=EDGE_CURVATURE, samples=EDGE_SAMPLES):
+        """Sample arc3-style quadratic curves for all edges at once -> (E, samples, 2)"""
+        start = np.array([self.pos[src] for src, dst in edges], dtype=float)
+        end = np.array([self.pos[dst] for src, dst in edges], dtype=float)
+        delta = end - start
+        # Same control point as matplotlib's arc3 connection style
+        control = (start + end) / 2 + rad * np.column_stack([delta[:, 1], -delta[:, 0]])
+        # Start and end at the node outlines rather than the centres
+        length = np.maximum(np.linalg.norm(delta, axis=1), 1e-9)
+        radius = {node: self._node_radius(node) for node in self.G.nodes()}
+        u0 = np.array([radius[src] for src, dst in edges]) / length
+        u1 = 1 - np.array([radius[dst] for src, dst in edges]) / length
+        u = np.linspace(0.0, 1.0, samples)[None, :]
+        u = (u0[:, None] + (u1 - u0)[:, None] * u)[:, :, None]
+        return ((1 - u) ** 2 * start[:, None, :] + 2 * (1 - u) * u * control[:, None, :]
+                + u ** 2 * end[:, None, :])
+
+    def _arrow_heads(self, curves, at=ARROW_POSITION, size=ARROW_SIZE):
+        """Triangles pointing along each curve, placed part-way along it"""
+        index = int(at * (curves.shape[1] - 1))
+        tip = curves[:, index + 1]
+        direction = tip - curves[:, index - 1]
+        direction /= np.maximum(np.linalg.norm(direction, axis=1, keepdims=True), 1e-9)
+        normal = np.column_stack([-direction[:, 1], direction[:, 0]])
+        back = tip - direction * size
+        return np.stack([tip, back + normal * size * 0.5, back - normal * size * 0.5], axis=1)
+
+    def _create_edge_artists(self):
+        """Draw all edges once as static background plus an overlay for active flows"""
+        edges = list(self.G.edges(data=True))
+        self.edge_list = [(src, dst) for src, dst, _ in edges]
+        self.edge_base_width = np.array([data.get('weight', 1) for _, _, data in edges], dtype=float)
+        self.edge_rgba = np.array([to_rgba(data.get('color', 'gray')) for _, _, data in edges])
+        # Edge/frame incidence: an edge's rate is the sum of the frames it carries.
+        # Bus <-> broker edges carry everything on their bus.
+        bus_frames = {}
+        for src, dst, data in edges:
+            for bus in (src, dst):
+                if self.G.nodes[bus].get('node_type') == 'bus':
+                    bus_frames.setdefault(bus, set()).update(f for f, _ in data['frames'])
+        rows, columns = [], []
+        for i, (src, dst, data) in enumerate(edges):
+            carried = {f for f, _ in data['frames']}
+            if not carried:
+                bus = src if self.G.nodes[src].get('node_type') == 'bus' else dst
+                carried = bus_frames.get(bus, set())
+            rows += [i] * len(carried)
+            columns += sorted(carried)
+        self.incidence_edge = np.array(rows, dtype=np.int64)
+        self.incidence_frame = np.searchsorted(self.frame_ids, np.array(columns, dtype=np.int64))
+        self.edge_curves = self._edge_curves(self.edge_list)
+        self.edge_heads = self._arrow_heads(self.edge_curves)
+
+        # Idle styling never changes, so it is rendered into the blit background
+        idle_rgba = self.edge_rgba.copy()
+        idle_rgba[:, 3] = 0.4
+        self.ax_network.add_collection(LineCollection(
+            self.edge_curves, colors=idle_rgba, linewidths=self.edge_base_width,
+            zorder=1, capstyle='round'))
+        self.ax_network.add_collection(PolyCollection(
+            self.edge_heads, facecolors=idle_rgba, edgecolors='none', zorder=1))
+
+        # Only edges carrying traffic are redrawn each frame, so frame cost
+        # follows the number of active flows rather than the topology size
+        self.edge_collection = LineCollection([], zorder=2, capstyle='round')
+        self.arrow_collection = PolyCollection([], edgecolors='none', zorder=2)
+        self.ax_network.add_collection(self.edge_collection)
+        self.ax_network.add_collection(self.arrow_collection)
+        self._update_edge_styles()
+
+    def _draw_edge_labels(self):
+        """Draw edge labels (message info) once as part of the static background"""
         edge_labels = {}
         for src, dst, data in self.G.edges(data=True):
             if data.get('message'):
@@ -290,35 +255,75 @@ class ModernCANTopology:
                                              edgecolor='none'),
                                      ax=self.ax_network)
 
-        # Decay message activity
-        if self.message_activity['command'] > 0:
-            self.message_activity['command'] -= 1
-        if self.message_activity['status'] > 0:
-            self.message_activity['status'] -= 1
-
-        # Add legend
-        self._add_legend()
+    def _edge_rates(self):
+        """Measured (msgs/s, bytes/s) per edge from the rate meter"""
+        ids, msgs, sizes = self.meter.rates()
+        self.total_rate = msgs.sum()
+        frame_msgs = np.zeros(len(self.frame_ids))
+        frame_bytes = np.zeros(len(self.frame_ids))
+        if len(ids) and len(self.frame_ids):
+            column = np.minimum(np.searchsorted(self.frame_ids, ids), len(self.frame_ids) - 1)
+            known = self.frame_ids[column] == ids
+            frame_msgs[column[known]] = msgs[known]
+            frame_bytes[column[known]] = sizes[known]
+        edges = len(self.edge_list)
+        return (np.bincount(self.incidence_edge, weights=frame_msgs[self.incidence_frame],
+                            minlength=edges),
+                np.bincount(self.incidence_edge, weights=frame_bytes[self.incidence_frame],
+                            minlength=edges))
+
+    def _update_edge_styles(self):
+        """Restyle the retained overlay in place from measured traffic"""
+        msgs, sizes = self._edge_rates()
+        active = msgs > 0
+
+        # Width follows msgs/s, opacity follows bytes/s (both log-scaled)
+        rgba = self.edge_rgba[active]
+        rgba[:, 3] = 0.3 + 0.7 * scale(sizes[active], FULL_SCALE_BYTES)
+        self.edge_collection.set_segments(self.edge_curves[active])
+        self.edge_collection.set_color(rgba)
+        self.edge_collection.set_linewidths(
+            self.edge_base_width[active] * (1 + 2 * scale(msgs[active], FULL_SCALE_MSGS)))
+        self.arrow_collection.set_verts(self.edge_heads[active])
+        self.arrow_collection.set_facecolor(rgba)
+
+    def _simulate_traffic(self, index):
+        """Producer thread: count the frames each simulated sample stands for"""
+        if 'SteeringCommand' in self.catalog:
+            for name in ('SteeringCommand', 'SteeringStatus'):
+                frame_id, dlc, _ = self.catalog[name]
+                self.meter.record(frame_id, dlc)
+        elif len(self.frame_ids):
+            # Sweep a window of frames through the network
+            count = min(len(self.frame_ids), SIMULATED_FRAMES)
+            start = (index * count) % len(self.frame_ids)
+            self.meter.record_many(np.take(self.frame_ids, range(start, start + count), mode='wrap'))
 
     def _add_legend(self):
         """Add legend for network elements"""
         legend_elements = [
             plt.Line2D([0], [0], marker='o', color='w',
                       markerfacecolor='lightblue', markersize=10,
-                      label='Gateway (Publisher)', markeredgecolor='black'),
+                      label='ECU (mostly TX)', markeredgecolor='black'),
+            plt.Line2D([0], [0], marker='o', color='w',
+                      markerfacecolor='lightcoral', markersize=10,
+                      label='ECU (mostly RX)', markeredgecolor='black'),
             plt.Line2D([0], [0], marker='o', color='w',
                       markerfacecolor='lightgreen', markersize=12,
                       label='RemotiveBroker', markeredgecolor='black'),
-            plt.Line2D([0], [0], marker='o', color='w',
-                      markerfacecolor='lightcoral', markersize=10,
-                      label='ECU (Subscriber)', markeredgecolor='black'),
             plt.Line2D([0], [0], marker='o', color='w',
                       markerfacecolor='gold', markersize=10,
                       label='CAN Bus', markeredgecolor='black'),
-            plt.Line2D([0], [0], color='blue', linewidth=3,
-                      label='Command Flow (ID 100)'),
-            plt.Line2D([0], [0], color='red', linewidth=3,
-                      label='Status Flow (ID 200)')
         ]
+        tx_colors = list(self.G.graph['tx_colors'].items())
+        for ecu, color in tx_colors[:LEGEND_TX_LIMIT]:
+            legend_elements.append(plt.Line2D([0], [0], color=color, linewidth=3,
+                                              label=f'Frames from {ecu}'))
+        if len(tx_colors) > LEGEND_TX_LIMIT:
+            legend_elements.append(plt.Line2D([0], [0], color='w',
+                                              label=f'… {len(tx_colors) - LEGEND_TX_LIMIT} more transmitters'))
+        legend_elements.append(plt.Line2D([0], [0], color='gray', linewidth=3,
+                                          label='Bus ↔ Broker'))
 
         self.ax_network.legend(handles=legend_elements,
                               loc='upper left',
@@ -336,6 +341,7 @@ class ModernCANTopology:
         self.ax_cmd.grid(True, alpha=0.3)
         self.ax_cmd.legend(loc='upper right', fontsize=8)
         self.ax_cmd.set_ylim(-600, 600)
+        self.ax_cmd.set_xlim(0, self.window)
 
         # Response plot
         self.line_resp, = self.ax_resp.plot([], [], 'r-', linewidth=2,
@@ -347,66 +353,73 @@ class ModernCANTopology:
         self.ax_resp.grid(True, alpha=0.3)
         self.ax_resp.legend(loc='upper right', fontsize=8)
         self.ax_resp.set_ylim(-600, 600)
-
-    def generate_command(self, t):
-        """Generate realistic steering command"""
-        base = 500 * math.sin(t * 0.5)
-        noise = 50 * math.sin(t * 2.3) + 30 * math.sin(t * 3.7)
-        return base + noise
-
-    def update_ecu(self, command, dt=0.05):
-        """Simulate ECU response with lag"""
-        self.target_angle = command
-        diff = self.target_angle - self.current_angle
-        max_change = 150 * dt
-
-        if abs(diff) > max_change:
-            step = max_change if diff > 0 else -max_change
-        else:
-            step = diff
-
-        self.current_angle += step
-        return self.current_angle
+        self.ax_resp.set_xlim(0, self.window)
 
     def update(self, frame):
         """Animation update function"""
-        t = time.time() - self.start_time
-
-        # Generate new data
-        command = self.generate_command(t)
-        response = self.update_ecu(command)
-
-        # Trigger message activity (less frequent)
-        if frame % 20 == 0:
-            self.message_activity['command'] = 10
-        if frame % 20 == 10:
-            self.message_activity['status'] = 10
+        # Take everything produced since the last frame, however long that was
+        self.samples.extend(self.source.queue.drain())
 
-        # Update network topology (only every 2 frames to reduce load)
-        if frame % 2 == 0:
-            self._draw_animated_edges()
-
-        # Store data
-        self.times.append(t)
-        self.commands.append(command)
-        self.responses.append(response)
+        # Restyle network edges in place (cheap enough for every frame)
+        self._update_edge_styles()
+        artists = [self.edge_collection, self.arrow_collection, self.status_text,
+                   self.line_cmd, self.line_resp]
+        if not len(self.samples):
+            return artists
+        t, command, response = self.samples.latest()
 
         # Update data plots
-        if len(self.times) > 1:
-            times_list = list(self.times)
-
-            self.line_cmd.set_data(times_list, list(self.commands))
-            self.ax_cmd.set_xlim(max(0, t - 10), t + 1)
-
-            self.line_resp.set_data(times_list, list(self.responses))
-            self.ax_resp.set_xlim(max(0, t - 10), t + 1)
-
-        # Update title
-        status = (f'Live CAN Traffic | Command: {command:6.1f}° | '
+        if len(self.samples) > 1:
+            times = self.samples.view('time')
+            # Decimate to the axes' pixel width so long windows stay cheap
+            points = axes_points(self.ax_cmd)
+            self.line_cmd.set_data(*decimate(times, self.samples.view('command'), points, self.method))
+            self.line_resp.set_data(*decimate(times, self.samples.view('response'), points, self.method))
+            self._scroll_time_axis(t)
+
+        # Update live status
+        status = (f'Live CAN Traffic | {self.total_rate:6.0f} msg/s | Command: {command:6.1f}° | '
                  f'ECU Response: {response:6.1f}° | Lag: {abs(command-response):5.1f}°')
-        self.fig.suptitle(status, fontsize=12, fontweight='bold')
-
-        return [self.line_cmd, self.line_resp]
+        self.status_text.set_text(status)
+
+        return artists
+
+    def _scroll_time_axis(self, t):
+        """Move the time axis in steps; each step re-renders the static background once"""
+        xmin, xmax = self.ax_cmd.get_xlim()
+        if t < xmax - 0.5:
+            return
+        xmin = max(0, t - self.window * (1 - WINDOW_STEP))
+        self.ax_cmd.set_xlim(xmin, xmin + self.window)
+        self.ax_resp.set_xlim(xmin, xmin + self.window)
+        # Animated artists are skipped by a full draw, so this refreshes
+        # ticks and grid without smearing the previous frame into the blit cache.
+        # A time axis that is itself animated (batch_render.py) is redrawn every frame anyway.
+        if not self.ax_cmd.xaxis.get_animated():
+            self.fig.canvas.draw()
+
+    def describe(self):
+        """One-line summary of the loaded topology"""
+        kinds = [data.get('node_type') for _, data in self.G.nodes(data=True)]
+        return (f"{kinds.count('ecu')} ECUs on {kinds.count('bus')} buses, "
+                f"{len(self.frame_ids)} frames, {self.G.number_of_edges()} edges")
+
+    def benchmark(self, frames=200):
+        """Time blitted frame updates without an interactive window"""
+        canvas = self.fig.canvas
+        self.source.start()
+        canvas.draw()
+        background = canvas.copy_from_bbox(self.fig.bbox)
+        start = time.perf_counter()
+        for frame in range(frames):
+            artists = self.update(frame)
+            canvas.restore_region(background)
+            for artist in artists:
+                artist.axes.draw_artist(artist)
+            canvas.blit(self.fig.bbox)
+        elapsed = time.perf_counter() - start
+        self.source.stop()
+        return elapsed / frames
 
     def run(self):
         """Start the visualization"""
@@ -414,13 +427,13 @@ class ModernCANTopology:
         print("  Modern CAN Bus Network Topology Visualizer")
         print("=" * 80)
         print()
-        print("Network Architecture:")
-        print("  • Gateway (blue) → CAN Bus → RemotiveBroker → Steering ECU (red)")
+        print(f"Network Architecture ({self.interfaces}):")
+        print(f"  • {self.describe()}")
         print("  • Watch edges light up as messages flow through the network!")
         print()
         print("Message Flow:")
-        print("  • Blue edges: SteeringCommand (ID 100) - Gateway → ECU")
-        print("  • Red edges: SteeringStatus (ID 200) - ECU → Gateway")
+        for ecu, color in list(self.G.graph['tx_colors'].items())[:LEGEND_TX_LIMIT]:
+            print(f"  • {color.capitalize()} edges: frames transmitted by {ecu}")
         print("  • Gray edges: CAN Bus infrastructure")
         print()
         print("Real-time Data:")
@@ -435,16 +448,48 @@ class ModernCANTopology:
             self.fig,
             self.update,
             interval=UPDATE_INTERVAL,
-            blit=False,
+            blit=True,
             cache_frame_data=False
         )
 
         plt.tight_layout()
-        plt.show()
+        self.source.start()
+        try:
+            plt.show()
+        finally:
+            self.source.stop()
 
 def main():
+    parser = argparse.ArgumentParser(description="Modern CAN Bus Network Topology Visualizer")
+    parser.add_argument("--interfaces", default=DEFAULT_INTERFACES,
+                        help="broker interfaces.json whose chains and DBC files define the network")
+    parser.add_argument("--broker",
+                        help="measure real traffic from this broker URL (default: simulated traffic)")
+    parser.add_argument("--window", type=float, default=HISTORY_SECONDS,
+                        help="seconds of history shown in the signal plots (minutes to hours are fine)")
+    parser.add_argument("--decimate", choices=sorted(METHODS), default="minmax",
+                        help="downsampling applied before plotting long windows")
+    parser.add_argument("--replay", metavar="LOG",
+                        help="play back a traffic_log.py recording instead of live or simulated data")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="with --replay: playback speed (1 = recorded timing)")
+    parser.add_argument("--benchmark", type=int, metavar="FRAMES",
+                        help="render FRAMES updates off-screen and report the time per frame")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        plt.switch_backend("Agg")
+        start = time.perf_counter()
+        viz = ModernCANTopology(args.interfaces, window=args.window, method=args.decimate)
+        setup_s = time.perf_counter() - start
+        print(f"🕸️  {viz.describe()}")
+        print(f"   setup {setup_s * 1000:.0f} ms | "
+              f"{viz.benchmark(args.benchmark) * 1000:.1f} ms/frame over {args.benchmark} frames")
+        return
+
     try:
-        viz = ModernCANTopology()
+        viz = ModernCANTopology(args.interfaces, args.broker, args.window, args.decimate,
+                                args.replay, args.replay_speed)
         viz.run()
     except KeyboardInterrupt:
         print("\n\nVisualization stopped")
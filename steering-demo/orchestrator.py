@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Steering Demo Orchestrator
+Runs publisher, ECU, fleet, decoder and visualizer workers as supervised
+processes pinned to CPU cores, sharing decoded signals through shared memory
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+from broker_link import BROKER_URL
+
+RING_NAME = "steering_demo"  # shm://steering_demo for visualizers started by hand
+RING_SECONDS = 60  # Decoded history the ring holds for slow consumers
+HEARTBEAT_INTERVAL = 0.5
+HEALTH_TIMEOUT = 5.0  # A worker silent this long is killed and restarted
+BACKOFF_START = 0.5  # First restart delay; doubles per consecutive failure
+BACKOFF_MAX = 30.0
+BACKOFF_RESET = 30.0  # Healthy this long and the failure count starts over
+STATUS_INTERVAL = 1.0
+
+def available_cpus():
+    """CPU cores this process may run on (all of them where affinity is unsupported)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def pin(cpu):
+    """Pin the calling process to one core; a no-op where affinity is unsupported (macOS)"""
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cpu})
+
+class Board:
+    """Per-worker heartbeat times and progress counters in shared memory"""
+
+    def __init__(self, slots):
+        self.heartbeat = multiprocessing.Array('d', slots, lock=False)
+        self.progress = multiprocessing.Array('q', slots, lock=False)
+
+    def beat(self, slot, progress):
+        self.progress[slot] = progress
+        self.heartbeat[slot] = time.monotonic()  # Monotonic time is system-wide on Linux and macOS
+
+def _worker(target, board, slot, cpu, args):
+    """Child-process entry: pin, start the heartbeat thread, then run the worker"""
+    # Ctrl+C reaches the whole process group; shutdown is the supervisor's job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    pin(cpu)
+    parent = os.getppid()
+    progress = [lambda: 0]
+
+    def heartbeat():
+        while True:
+            if os.getppid() != parent:
+                os._exit(1)  # Orphaned: the supervisor died without stopping us
+            board.beat(slot, progress[0]())
+            time.sleep(HEARTBEAT_INTERVAL)
+
+    board.beat(slot, 0)
+    threading.Thread(target=heartbeat, name="heartbeat", daemon=True).start()
+    target(progress, *args)
+
+def run_publisher(progress, url, period):
+    """Sine-wave command stream"""
+    from broker_link import connect
+    from publisher import COMMAND_SIGNALS, SineCommander
+
+    commander = SineCommander(connect(url).publisher("steering_gateway", COMMAND_SIGNALS), verbose=False)
+    sent = [0]
+    progress[0] = lambda: sent[0]
+    start = time.monotonic()
+    while True:
+        commander.send()
+        sent[0] += 1
+        time.sleep(max(0.0, start + sent[0] * period - time.monotonic()))
+
+def run_ecu(progress, url):
+    """The steering ECU answering on the default namespace"""
+    import asyncio
+
+    from broker_link import connect
+    from ecu_simulator import AsyncECUService
+
+    service = AsyncECUService(connect(url), verbose=False)
+    progress[0] = lambda: service.published
+    asyncio.run(service.run())
+
+def run_fleet(progress, url, count):
+    """Vectorized ECU fleet, one namespace per ECU"""
+    from broker_link import connect
+    from ecu_fleet import FleetService
+
+    service = FleetService(connect(url), count)
+    progress[0] = lambda: service.published
+    service.run()
+
+def run_decoder(progress, url, ring, epoch):
+    """The one subscriber that decodes command/status frames into the shared ring"""
+    from broker_link import connect
+    from ring_buffer import SharedSampleQueue
+    from signal_source import COLUMNS, BrokerSteering
+
+    queue = SharedSampleQueue(ring, columns=COLUMNS)
+    source = BrokerSteering(connect(url), queue=queue)
+    source.start_time = epoch  # Restarts continue the same time axis
+    base = queue.written
+    progress[0] = lambda: queue.written - base
+    source.start()
+    threading.Event().wait()
+
+def run_visualizer(progress, ring):
+    """steering_visualizer.py reading the shared ring"""
+    from signal_source import SHARED_PREFIX
+    from steering_visualizer import SteeringSimulator
+
+    sim = SteeringSimulator(broker=SHARED_PREFIX + ring)
+    progress[0] = lambda: sim.samples.total
+    sim.run()
+
+class Worker:
+    """One supervised process: what it runs, where it is pinned and how it is doing"""
+
+    def __init__(self, name, target, args, unit, cpu=None):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.unit = unit
+        self.cpu = cpu
+        self.slot = None
+        self.process = None
+        self.state = 'pending'
+        self.started = 0.0
+        self.restarts = 0
+        self.failures = 0  # Consecutive, for the restart backoff
+        self.next_start = 0.0
+        self.last_progress = 0
+        self.rate = 0.0
+        self.last_exit = None
+
+class Supervisor:
+    """Starts workers, checks their heartbeats and restarts them with backoff"""
+
+    def __init__(self, workers, health_timeout=HEALTH_TIMEOUT):
+        self.workers = workers
+        self.health_timeout = health_timeout
+        self.board = Board(len(workers))
+        for slot, worker in enumerate(workers):
+            worker.slot = slot
+
+    def _start(self, worker, now):
+        self.board.heartbeat[worker.slot] = now
+        self.board.progress[worker.slot] = 0
+        worker.process = multiprocessing.Process(
+            target=_worker, name=worker.name, daemon=True,
+            args=(worker.target, self.board, worker.slot, worker.cpu, worker.args))
+        worker.process.start()
+        worker.started = now
+        worker.last_progress = 0
+        worker.state = 'running'
+
+    def _failed(self, worker, now, reason):
+        worker.failures += 1
+        worker.last_exit = reason
+        delay = min(BACKOFF_MAX, BACKOFF_START * 2 ** (worker.failures - 1))
+        worker.next_start = now + delay
+        worker.state = 'backoff'
+
+    def check(self, interval):
+        """One supervision pass: start, health-check and restart as needed"""
+        now = time.monotonic()
+        for worker in self.workers:
+            process = worker.process
+            if worker.state in ('pending', 'backoff'):
+                if now >= worker.next_start:
+                    if worker.state == 'backoff':
+                        worker.restarts += 1
+                    self._start(worker, now)
+                continue
+            if worker.state != 'running':
+                continue
+            if not process.is_alive():
+                process.join()
+                if process.exitcode == 0:
+                    worker.state = 'finished'  # e.g. a visualizer whose window was closed
+                else:
+                    self._failed(worker, now, f"exit {process.exitcode}")
+                continue
+            if now - self.board.heartbeat[worker.slot] > self.health_timeout:
+                process.kill()
+                process.join()
+                self._failed(worker, now, "no heartbeat")
+                continue
+            progress = self.board.progress[worker.slot]
+            worker.rate = max(0, progress - worker.last_progress) / interval
+            worker.last_progress = progress
+            if worker.failures and now - worker.started > BACKOFF_RESET:
+                worker.failures = 0
+
+    def stop(self, timeout=2.0):
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.join(timeout)
+                if worker.process.is_alive():
+                    worker.process.kill()
+                    worker.process.join()
+            worker.state = 'stopped'
+
+def status_lines(supervisor, ring, url, uptime):
+    """The aggregated status/throughput view"""
+    lines = [f"🎛️  Steering demo | {url} | up {uptime:,.0f}s",
+             f"   {'worker':12s} {'pid':>7s} {'cpu':>4s} {'state':9s} {'restarts':>8s} "
+             f"{'progress':>12s} {'rate/s':>9s}"]
+    for worker in supervisor.workers:
+        pid = worker.process.pid if worker.process is not None else "-"
+        cpu = "-" if worker.cpu is None else worker.cpu
+        note = f"  (last: {worker.last_exit})" if worker.last_exit else ""
+        lines.append(f"   {worker.name:12s} {pid!s:>7s} {cpu!s:>4s} {worker.state:9s} {worker.restarts:8d} "
+                     f"{supervisor.board.progress[worker.slot]:12,d} {worker.rate:9,.1f} {worker.unit}{note}")
+    lines.append(f"   ring shm://{ring.name}: {ring.written:,} samples "
+                 f"({ring.capacity:,} kept, decoded once for every reader)")
+    if ring.written:
+        _, command, response = ring.latest()
+        lines.append(f"   SteeringCommand.SteeringAngle {command:7.1f}° | "
+                     f"SteeringStatus.CurrentAngle {response:7.1f}°")
+    return lines
+
+def build_workers(args, url):
+    """Worker list for the command line, with cores handed out round-robin"""
+    epoch = time.monotonic()
+    workers = [Worker("publisher", run_publisher, (url, args.period), "commands"),
+               Worker("ecu", run_ecu, (url,), "status")]
+    if args.fleet:
+        workers.append(Worker("fleet", run_fleet, (url, args.fleet), "status"))
+    workers.append(Worker("decoder", run_decoder, (url, args.ring, epoch), "samples"))
+    for i in range(args.viz):
+        workers.append(Worker(f"viz{i}" if args.viz > 1 else "viz", run_visualizer, (args.ring,), "samples"))
+    cpus = available_cpus() if args.cpus is None else [int(c) for c in args.cpus.split(",") if c]
+    if cpus and not args.no_pin:
+        for i, worker in enumerate(workers):
+            worker.cpu = cpus[i % len(cpus)]
+    return workers
+
+def main():
+    parser = argparse.ArgumentParser(description="Supervised multi-process steering demo")
+    parser.add_argument("--broker", default=BROKER_URL, help="broker URL the workers connect to")
+    parser.add_argument("--spawn-broker", action="store_true",
+                        help="start the broker stand-in (local_broker.py --serve) instead of using Docker")
+    parser.add_argument("--fleet", type=int, default=0, metavar="N", help="also run an N-ECU fleet worker")
+    parser.add_argument("--viz", type=int, default=0, metavar="N",
+                        help="visualizer windows reading the shared ring")
+    parser.add_argument("--period", type=float, default=0.5, help="publisher command period in seconds")
+    parser.add_argument("--cpus", help="comma-separated cores to pin workers to (default: all allowed)")
+    parser.add_argument("--no-pin", action="store_true", help="leave CPU placement to the OS")
+    parser.add_argument("--ring", default=RING_NAME, help="shared memory name of the decoded-signal ring")
+    parser.add_argument("--health-timeout", type=float, default=HEALTH_TIMEOUT,
+                        help="seconds without a heartbeat before a worker is restarted")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    # The ring pulls in NumPy and the signal sources; --help does not need them
+    from ring_buffer import SharedSampleQueue
+    from signal_source import COLUMNS, SAMPLE_RATE
+
+    server = None
+    url = args.broker
+    if args.spawn_broker:
+        from local_broker import spawn_server
+        server, url = spawn_server(0)
+
+    print("🚗 RemotiveBroker Steering Demo")
+    ring = SharedSampleQueue(args.ring, int(SAMPLE_RATE * RING_SECONDS), COLUMNS, create=True)
+    supervisor = Supervisor(build_workers(args, url), args.health_timeout)
+    interactive = sys.stdout.isatty()
+    start = time.monotonic()
+    try:
+        while args.duration is None or time.monotonic() - start < args.duration:
+            supervisor.check(STATUS_INTERVAL)
+            if server is not None and server.poll() is not None:
+                raise RuntimeError(f"broker stand-in exited with {server.returncode}")
+            lines = status_lines(supervisor, ring, url, time.monotonic() - start)
+            if interactive:
+                print("\033[H\033[J" + "\n".join(lines), flush=True)
+            else:
+                print("\n".join(lines) + "\n", flush=True)
+            time.sleep(STATUS_INTERVAL)
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Demo stopped")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        print("🛑 Stopping all components...")
+        supervisor.stop()
+        ring.close()
+        if server is not None:
+            server.terminate()
+            server.wait()
+        print("✓ Demo stopped")
+
+if __name__ == "__main__":
+    main()
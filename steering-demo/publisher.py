@@ -4,48 +4,192 @@ Steering Command Publisher
 Publishes steering angle commands to the RemotiveBroker
 """
 
-import time
+import argparse
 import math
-from remotivelabs.broker.sync import SignalCreator, PublisherConfig, create_channel
+import time
 
-BROKER_URL = "http://localhost:50051"
+from broker_link import BROKER_URL, connect
+from change_filter import add_change_arguments, apply_change_arguments
+from latency_stats import LatencyStats
+from metrics import REGISTRY, Throttle, add_metrics_arguments, start_metrics
+from sim_clock import add_clock_arguments, make_clock, wait_until
 
-def main():
-    print("🚗 Steering Command Publisher")
-    print(f"📡 Connecting to broker at {BROKER_URL}...")
+COMMAND_SIGNALS = [("SteeringCommand", "SteeringAngle"), ("SteeringCommand", "SteeringSpeed")]
 
-    # Create channel to broker
-    channel = create_channel(BROKER_URL)
+MAX_WAKEUPS_PER_SECOND = 1000
 
-    # Create signal publisher
-    publisher_config = PublisherConfig(
-        clientId="steering_gateway",
-        signals=SignalCreator()
-            .signal("SteeringCommand", "SteeringAngle")
-            .signal("SteeringCommand", "SteeringSpeed")
-    )
+ENCODE_TIME = REGISTRY.histogram("publisher_encode_seconds", "Physical to raw command encoding time")
 
-    print("✓ Connected to broker")
-    print("\n📊 Publishing steering commands...")
-    print("   (Sine wave pattern: -500° to +500°)\n")
+def build_command_table(step=0.1):
+    """Pre-build one full sine period of SteeringCommand frames"""
+    from dbc_codec import steering_codec
 
-    try:
-        # Publish steering commands in a sine wave pattern
-        angle = 0
+    command = steering_codec()["SteeringCommand"]
+    frames = []
+    for i in range(int(round(2 * math.pi / step))):
+        steering_angle = 500 * math.sin(i * step)
+        frames.append(("SteeringCommand", {
+            "SteeringAngle": command.to_raw("SteeringAngle", steering_angle),
+            "SteeringSpeed": command.to_raw("SteeringSpeed", 100),
+        }))
+    return frames
+
+class LoadGenerator:
+    """Deadline-scheduled batch publisher for finding the broker's throughput limit"""
+
+    def __init__(self, publisher, rate, batch=None, table=None):
+        self.publisher = publisher
+        self.rate = float(rate)
+        # Default to at most MAX_WAKEUPS_PER_SECOND batches per second
+        self.batch = batch or max(1, int(math.ceil(self.rate / MAX_WAKEUPS_PER_SECOND)))
+        self.table = table or build_command_table()
+        self.jitter = LatencyStats()
+        self.sent = 0
+        self.late_batches = 0
+
+    def run(self, duration):
+        """Publish for duration seconds; return the achieved-rate report"""
+        # Repeat the table so that one batch never wraps more than once
+        table = self.table * int(math.ceil(self.batch / len(self.table)))
+        table_len = len(table)
+        interval = self.batch / self.rate
+        publish_batch = self.publisher.publish_batch
+
+        start = time.perf_counter()
+        end = start + duration
+        position = 0
+        k = 0
         while True:
-            # Generate sine wave steering angle (-500 to +500 degrees)
-            steering_angle = 500 * math.sin(angle)
-            steering_speed = 100  # degrees per second
+            # Deadlines are computed from the start, so errors never accumulate
+            deadline = start + k * interval
+            if deadline >= end:
+                break
+            wait_until(deadline)
+            sent_at = time.perf_counter()
+            lateness = sent_at - deadline
+            self.jitter.record(lateness)
+            if lateness > interval:
+                self.late_batches += 1
+
+            stop = position + self.batch
+            if stop <= table_len:
+                batch = table[position:stop]
+            else:
+                batch = table[position:] + table[:stop - table_len]
+            publish_batch(batch)
+            position = stop % table_len
+            self.sent += self.batch
+            k += 1
+
+        wait_until(end)
+        elapsed = time.perf_counter() - start
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        """Summary of target vs achieved rate and send jitter"""
+        jitter = self.jitter.summary()
+        return {
+            'target_hz': self.rate,
+            'achieved_hz': self.sent / elapsed if elapsed > 0 else 0.0,
+            'frames': self.sent,
+            'batch': self.batch,
+            'elapsed_s': elapsed,
+            'late_batches': self.late_batches,
+            'jitter_p50_ms': jitter['p50_ms'],
+            'jitter_p99_ms': jitter['p99_ms'],
+            'jitter_max_ms': jitter['max_ms'],
+        }
+
+class SineCommander:
+    """Classic demo command stream: the angle advances by 0.1 rad per command"""
+
+    def __init__(self, publisher, verbose=True, log_rate=None):
+        self.publisher = publisher
+        self.verbose = verbose
+        self.log = Throttle(log_rate)
+        from dbc_codec import steering_codec
 
-            # Publish signals
-            publisher_config.signals.signal("SteeringCommand", "SteeringAngle").raw(int(steering_angle * 10))
-            publisher_config.signals.signal("SteeringCommand", "SteeringSpeed").raw(int(steering_speed))
+        self.command = steering_codec()["SteeringCommand"]
+        self.angle = 0
 
+    def send(self):
+        """Publish the next command of the sine wave"""
+        # Generate sine wave steering angle (-500 to +500 degrees)
+        steering_angle = 500 * math.sin(self.angle)
+        steering_speed = 100  # degrees per second
+
+        # Publish signals
+        encode_start = time.perf_counter()
+        values = {
+            "SteeringAngle": self.command.to_raw("SteeringAngle", steering_angle),
+            "SteeringSpeed": self.command.to_raw("SteeringSpeed", steering_speed),
+        }
+        ENCODE_TIME.record(time.perf_counter() - encode_start)
+        self.publisher.publish("SteeringCommand", values)
+
+        if self.verbose and self.log.allow():
             print(f"📤 Steering Angle: {steering_angle:6.1f}° | Speed: {steering_speed} deg/s")
 
-            # Increment angle
-            angle += 0.1
-            time.sleep(0.5)
+        # Increment angle
+        self.angle += 0.1
+
+def run_sine(publisher, clock=None, duration=None, log_rate=None):
+    """Classic demo mode: one command every 0.5 s (of wall or simulated time)"""
+    clock = clock or make_clock()
+    commander = SineCommander(publisher, log_rate=log_rate)
+    print("\n📊 Publishing steering commands...")
+    print("   (Sine wave pattern: -500° to +500°)\n")
+
+    # Publish steering commands in a sine wave pattern
+    while duration is None or clock.time() < duration:
+        commander.send()
+        clock.sleep(0.5)
+
+def run_load(publisher, rate, batch, duration):
+    """Load mode: publish at a target frame rate and report what was achieved"""
+    generator = LoadGenerator(publisher, rate, batch)
+    print(f"\n🔥 Load mode: target {rate:,.0f} frames/s in batches of {generator.batch} for {duration:.0f}s\n")
+    result = generator.run(duration)
+    print(f"📈 Achieved: {result['achieved_hz']:,.0f} frames/s "
+          f"({100 * result['achieved_hz'] / result['target_hz']:.1f}% of target, {result['frames']:,} frames)")
+    print(f"⏱️  Send jitter: p50={result['jitter_p50_ms']:.3f} ms "
+          f"p99={result['jitter_p99_ms']:.3f} ms max={result['jitter_max_ms']:.3f} ms "
+          f"| late batches: {result['late_batches']}")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Steering Command Publisher")
+    parser.add_argument("--broker", default=BROKER_URL,
+                        help="broker URL, or local://<name> for the in-process stand-in")
+    parser.add_argument("--rate", type=float,
+                        help="load mode: target frame rate in Hz (1 to tens of thousands)")
+    parser.add_argument("--batch", type=int,
+                        help="frames per publish call in load mode (default: rate/1000)")
+    parser.add_argument("--duration", type=float,
+                        help="run time in seconds (load mode default: 10)")
+    add_clock_arguments(parser)
+    add_change_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    print("🚗 Steering Command Publisher")
+    print(f"📡 Connecting to broker at {args.broker}...")
+
+    # Create channel to broker
+    clock = make_clock(args.clock, args.step, args.speed)
+    link, exporters = start_metrics(args, connect(args.broker))
+    link = apply_change_arguments(link, args, clock)
+
+    # Create signal publisher with handles resolved up front
+    publisher = link.publisher("steering_gateway", COMMAND_SIGNALS)
+
+    print("✓ Connected to broker")
+
+    try:
+        if args.rate:
+            run_load(publisher, args.rate, args.batch, args.duration or 10.0)
+        else:
+            run_sine(publisher, clock, args.duration, args.log_rate)
 
     except KeyboardInterrupt:
         print("\n\n⏹️  Publisher stopped")
@@ -53,6 +197,12 @@ def main():
         print(f"\n❌ Error: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        link.close()
+        for exporter in exporters:
+            exporter.close()
+        if args.on_change:
+            print(f"🗜️  On-change publishing: {link.stats.format()}")
 
 if __name__ == "__main__":
     main()
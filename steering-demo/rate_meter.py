@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Rate Meter
+Per-frame-id message and byte rates over a sliding window of fixed time
+buckets, cheap enough to feed from a subscriber callback at full bus rate
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from dbc_codec import FRAME_BYTES
+
+WINDOW_SECONDS = 1.0
+BUCKETS = 10
+
+class RateMeter:
+    """Sliding-window msgs/s and bytes/s per CAN id
+
+    The hot path (record) only bumps two running totals in plain lists, so
+    it is a dict lookup and two integer adds. Bucketing happens on the
+    reader side: tick() takes the difference of the totals since the last
+    bucket and stores it in a small NumPy history. Because the writer only
+    increments and the reader only reads, a subscriber thread can record
+    while the GUI thread reads rates without any lock.
+    """
+
+    def __init__(self, window=WINDOW_SECONDS, buckets=BUCKETS, clock=time.monotonic):
+        self.bucket_seconds = window / buckets
+        self.buckets = buckets
+        self.clock = clock
+        self._index = {}  # frame_id -> column
+        self._ids = []
+        self._counts = []  # Running totals, written only by record()
+        self._bytes = []
+        self._last_counts = np.zeros(0, dtype=np.int64)
+        self._last_bytes = np.zeros(0, dtype=np.int64)
+        self._history_counts = np.zeros((buckets, 0), dtype=np.int64)
+        self._history_bytes = np.zeros((buckets, 0), dtype=np.int64)
+        self._durations = np.zeros(buckets)
+        self._position = 0
+        self._bucket_start = clock()
+
+    def _register(self, frame_id):
+        # Append the totals before publishing the index so a concurrent
+        # reader never sees an id without its counters
+        self._counts.append(0)
+        self._bytes.append(0)
+        self._ids.append(frame_id)
+        self._index[frame_id] = column = len(self._ids) - 1
+        return column
+
+    def record(self, frame_id, nbytes=FRAME_BYTES):
+        """Count one received frame"""
+        column = self._index.get(frame_id)
+        if column is None:
+            column = self._register(frame_id)
+        self._counts[column] += 1
+        self._bytes[column] += nbytes
+
+    def record_many(self, frame_ids, nbytes=None):
+        """Count a batch of frames (array of ids, optional per-frame byte counts)"""
+        frame_ids = np.asarray(frame_ids)
+        if not len(frame_ids):
+            return
+        unique, inverse, counts = np.unique(frame_ids, return_inverse=True, return_counts=True)
+        if nbytes is None:
+            sizes = counts * FRAME_BYTES
+        else:
+            sizes = np.bincount(inverse, weights=np.broadcast_to(nbytes, frame_ids.shape),
+                                minlength=len(unique))
+        for frame_id, count, size in zip(unique.tolist(), counts.tolist(), sizes.tolist()):
+            column = self._index.get(frame_id)
+            if column is None:
+                column = self._register(frame_id)
+            self._counts[column] += count
+            self._bytes[column] += int(size)
+
+    def tick(self, now=None):
+        """Close the current bucket if it is due; called from the reader side"""
+        now = self.clock() if now is None else now
+        elapsed = now - self._bucket_start
+        if elapsed < self.bucket_seconds:
+            return False
+
+        # Snapshot the totals (list copies are atomic under the GIL)
+        n = len(self._ids)
+        counts = np.array(self._counts[:n], dtype=np.int64)
+        sizes = np.array(self._bytes[:n], dtype=np.int64)
+        if n > self._history_counts.shape[1]:
+            grow = ((0, 0), (0, n - self._history_counts.shape[1]))
+            self._history_counts = np.pad(self._history_counts, grow)
+            self._history_bytes = np.pad(self._history_bytes, grow)
+            self._last_counts = np.pad(self._last_counts, (0, n - len(self._last_counts)))
+            self._last_bytes = np.pad(self._last_bytes, (0, n - len(self._last_bytes)))
+
+        # A stalled reader makes one wide bucket; its true duration keeps rates right
+        self._history_counts[self._position] = counts - self._last_counts
+        self._history_bytes[self._position] = sizes - self._last_bytes
+        self._durations[self._position] = elapsed
+        self._last_counts = counts
+        self._last_bytes = sizes
+        self._position = (self._position + 1) % self.buckets
+        self._bucket_start = now
+        return True
+
+    def rates(self, now=None):
+        """Return (frame_ids, msgs/s, bytes/s) arrays over the window"""
+        self.tick(now)
+        span = self._durations.sum()
+        n = self._history_counts.shape[1]
+        ids = np.array(self._ids[:n], dtype=np.int64)
+        if span <= 0:
+            return ids, np.zeros(n), np.zeros(n)
+        return (ids, self._history_counts.sum(axis=0) / span,
+                self._history_bytes.sum(axis=0) / span)
+
+    def rate(self, frame_id):
+        """Messages per second for one frame id (0.0 if never seen)"""
+        ids, msgs, _ = self.rates()
+        column = self._index.get(frame_id)
+        return float(msgs[column]) if column is not None and column < len(msgs) else 0.0
+
+    def total(self):
+        """Frames recorded since creation"""
+        return sum(self._counts)
+
+    def attach(self, link, catalog, client_id="rate_meter"):
+        """Count every frame of catalog {name: (frame_id, dlc, signals)} arriving on link"""
+        routes = {name: (frame_id, dlc) for name, (frame_id, dlc, _) in catalog.items()}
+        signals = [(name, signal) for name, (_, _, names) in catalog.items() for signal in names]
+
+        def on_frame(frame, values, timestamp):
+            frame_id, dlc = routes[frame]
+            self.record(frame_id, dlc)
+
+        return link.subscribe(client_id, signals, on_frame, on_change=False)
+
+def scale(values, full_scale):
+    """Map rates onto 0..1 logarithmically (1 at full_scale and above)"""
+    return np.minimum(1.0, np.log1p(values) / np.log1p(full_scale))
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    ids = np.random.default_rng(0).integers(0, 2000, size=frames).tolist()
+    meter = RateMeter()
+
+    start = time.perf_counter()
+    for frame_id in ids:
+        meter.record(frame_id)
+    record_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    meter.record_many(ids)
+    batch_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(100):
+        meter.tick(meter.clock() + meter.bucket_seconds * 2)
+        meter.rates()
+    read_s = (time.perf_counter() - start) / 100
+
+    print(f"📈 Rate meter over {len(meter._ids)} frame ids")
+    print(f"   record():      {frames / record_s / 1e6:6.2f} M frames/s")
+    print(f"   record_many(): {frames / batch_s / 1e6:6.2f} M frames/s")
+    print(f"   tick + rates:  {read_s * 1000:6.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Ring Buffer
+Fixed-size NumPy circular buffer for live plots - appends never allocate and
+the most recent samples are always available as a contiguous view
+"""
+
+import numpy as np
+
+class RingBuffer:
+    """Multi-column circular buffer backed by one preallocated array
+
+    Every sample is written twice, at i and i + capacity, so the newest
+    len(self) samples always sit in one contiguous slice. view() can then
+    return a slice of the backing store instead of stitching two halves
+    together (and instead of list(deque)).
+    """
+
+    def __init__(self, capacity, columns=("value",), dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = int(capacity)
+        self.columns = tuple(columns)
+        self._column = {name: i for i, name in enumerate(self.columns)}
+        # One row per column keeps each column's view contiguous in memory
+        self._data = np.zeros((len(self.columns), 2 * self.capacity), dtype=dtype)
+        self._head = 0  # Next write position in [0, capacity)
+        self._size = 0
+        self.total = 0  # Samples ever written
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        """Forget all samples (storage is kept)"""
+        self._head = 0
+        self._size = 0
+
+    def append(self, *values):
+        """Append one sample; pass one value per column"""
+        head = self._head
+        data = self._data
+        mirror = head + self.capacity
+        for i, value in enumerate(values):
+            data[i, head] = value
+            data[i, mirror] = value
+        self._head = head + 1 if head + 1 < self.capacity else 0
+        if self._size < self.capacity:
+            self._size += 1
+        self.total += 1
+
+    def extend(self, block):
+        """Append many samples at once from a (columns, n) array-like"""
+        block = np.asarray(block, dtype=self._data.dtype)
+        if block.ndim == 1:
+            block = block[None, :]
+        n = block.shape[1]
+        if n == 0:
+            return
+        self.total += n
+        if n >= self.capacity:
+            # Only the newest capacity samples survive
+            block = block[:, -self.capacity:]
+            self._data[:, :self.capacity] = block
+            self._data[:, self.capacity:] = block
+            self._head = 0
+            self._size = self.capacity
+            return
+        cap = self.capacity
+        head = self._head
+        first = min(n, cap - head)
+        self._data[:, head:head + first] = block[:, :first]
+        self._data[:, head + cap:head + cap + first] = block[:, :first]
+        rest = n - first
+        if rest:
+            self._data[:, :rest] = block[:, first:]
+            self._data[:, cap:cap + rest] = block[:, first:]
+        self._head = (head + n) % cap
+        self._size = min(cap, self._size + n)
+
+    def _window(self, last=None):
+        size = self._size if last is None else min(int(last), self._size)
+        # Oldest retained sample lives at head (or 0 before the buffer wraps)
+        end = self._head + self.capacity if self._size == self.capacity else self._head
+        return end - size, end
+
+    def view(self, column=None, last=None):
+        """Read-only contiguous view of the newest samples (oldest first)
+
+        With column=None all columns are returned as a (columns, n) view.
+        The view aliases the buffer: it is only valid until the next write.
+        """
+        start, end = self._window(last)
+        if column is None:
+            window = self._data[:, start:end]
+        else:
+            index = column if isinstance(column, int) else self._column[column]
+            window = self._data[index, start:end]
+        window = window.view()
+        window.flags.writeable = False
+        return window
+
+    def snapshot(self, column=None, last=None):
+        """Copy of view() that stays valid after further writes"""
+        return self.view(column, last).copy()
+
+    def latest(self, column=None):
+        """Most recent sample of one column (or a tuple of all columns)"""
+        if not self._size:
+            raise IndexError("ring buffer is empty")
+        position = (self._head - 1) % self.capacity
+        if column is None:
+            return tuple(self._data[:, position].tolist())
+        index = column if isinstance(column, int) else self._column[column]
+        return self._data[index, position].item()
+
+class SampleQueue:
+    """Single-producer/single-consumer sample channel with no lock
+
+    The producer writes a sample into the preallocated store and only then
+    advances written; the consumer copies everything between its cursor and
+    written. Each counter has exactly one writer, so a producer thread can
+    ingest at full rate while the GUI thread drains at display rate. If the
+    consumer falls more than capacity samples behind, the oldest samples
+    are overwritten and counted in dropped.
+    """
+
+    def __init__(self, capacity, columns=("value",), dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = int(capacity)
+        self.columns = tuple(columns)
+        self._data = np.zeros((len(self.columns), self.capacity), dtype=dtype)
+        self.written = 0  # Advanced only by the producer
+        self.read = 0  # Advanced only by the consumer
+        self.dropped = 0
+
+    def __len__(self):
+        return min(self.written - self.read, self.capacity)
+
+    def push(self, *values):
+        """Producer side: append one sample (one value per column)"""
+        position = self.written % self.capacity
+        for i, value in enumerate(values):
+            self._data[i, position] = value
+        self.written += 1
+
+    def push_block(self, block):
+        """Producer side: append a (columns, n) block"""
+        block = np.asarray(block, dtype=self._data.dtype)
+        n = block.shape[1]
+        if n > self.capacity:
+            block = block[:, -self.capacity:]
+            self.written += n - self.capacity
+            n = self.capacity
+        position = self.written % self.capacity
+        first = min(n, self.capacity - position)
+        self._data[:, position:position + first] = block[:, :first]
+        self._data[:, :n - first] = block[:, first:]
+        self.written += n
+
+    def latest(self):
+        """Most recent sample as a tuple, without consuming anything"""
+        if not self.written:
+            raise IndexError("sample queue is empty")
+        return tuple(self._data[:, (self.written - 1) % self.capacity].tolist())
+
+    def drain(self, limit=None):
+        """Consumer side: copy out all samples written since the last drain"""
+        written = self.written
+        start = self.read
+        if written - start > self.capacity:
+            self.dropped += written - start - self.capacity
+            start = written - self.capacity
+        if limit is not None:
+            written = min(written, start + limit)
+        index = np.arange(start, written) % self.capacity
+        block = self._data[:, index]
+
+        # Anything the producer lapped while we copied is stale
+        overrun = min(self.written - self.capacity - start, block.shape[1])
+        if overrun > 0:
+            block = block[:, overrun:]
+            self.dropped += overrun
+        self.read = written
+        return block
+
+class SharedSampleQueue(SampleQueue):
+    """SampleQueue whose store lives in multiprocessing.shared_memory
+
+    One producer process pushes and any number of consumer processes drain
+    with their own read cursors, so samples are decoded once and shared
+    instead of every consumer subscribing and decoding on its own. The
+    write counter sits in the segment's header; data is always written
+    before the counter is advanced, exactly as in SampleQueue.
+    """
+
+    HEADER = 64  # Bytes reserved before the data: written, capacity, columns
+
+    def __init__(self, name, capacity=None, columns=("value",), create=False):
+        from multiprocessing import parent_process, resource_tracker, shared_memory
+
+        self.columns = tuple(columns)
+        if create:
+            if capacity is None or capacity < 1:
+                raise ValueError("capacity must be at least 1")
+            size = self.HEADER + len(self.columns) * int(capacity) * 8
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name)
+            if parent_process() is None:
+                # A process started on its own would otherwise unlink the
+                # segment on exit; its creator owns the cleanup
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+        self._header = np.ndarray((3,), dtype=np.int64, buffer=self.shm.buf)
+        if create:
+            self._header[:] = (0, capacity, len(self.columns))
+        elif self._header[2] != len(self.columns):
+            raise ValueError(f"{name} holds {self._header[2]} columns, not {len(self.columns)}")
+        self.name = name
+        self.owner = create
+        self.capacity = int(self._header[1])
+        self._data = np.ndarray((len(self.columns), self.capacity), dtype=np.float64,
+                                buffer=self.shm.buf, offset=self.HEADER)
+        self.read = self.written  # Consumers start at the live edge
+        self.dropped = 0
+
+    @property
+    def written(self):
+        return int(self._header[0])
+
+    @written.setter
+    def written(self, value):
+        self._header[0] = value
+
+    def close(self):
+        """Detach; the creating process also removes the segment"""
+        self._header = self._data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
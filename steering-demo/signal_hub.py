@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Signal Hub
+One broker connection shared by many in-process consumers: subscriptions are
+merged per namespace upstream and fanned out into bounded per-consumer queues
+"""
+
+import argparse
+import collections
+import sys
+import threading
+import time
+
+from broker_link import BROKER_URL, connect
+
+DEFAULT_QUEUE = 4096  # Frames a consumer may fall behind before backpressure applies
+POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+class Consumer:
+    """Bounded frame queue for one in-process consumer
+
+    When the queue is full, 'block' holds the hub's delivery thread (and so
+    the upstream reader) until there is room. 'drop_oldest' keeps the newest
+    frames, which suits displays. 'drop_newest' keeps the backlog. A consumer
+    whose dispatch callback raises is detached, so it cannot hold the hub up.
+    """
+
+    def __init__(self, hub, name, groups, on_change=True, maxsize=DEFAULT_QUEUE, policy='block'):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {', '.join(POLICIES)}, not {policy!r}")
+        self.hub = hub
+        self.name = name
+        self.groups = groups  # namespace -> frame -> set of signal names
+        self.on_change = on_change
+        self.maxsize = maxsize
+        self.policy = policy
+        self.queue = collections.deque()
+        self.delivered = 0
+        self.dropped = 0
+        self.blocked = 0.0  # Seconds the hub spent waiting for room in this queue
+        self.high_water = 0
+        self._last = {}
+        self._ready = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+    def offer(self, namespace, frame, values, timestamp):
+        """Hub side: queue the consumer's part of a frame, applying the full-queue policy"""
+        wanted = self.groups[namespace][frame]
+        selected = {name: value for name, value in values.items() if name in wanted}
+        if not selected:
+            return
+        if self.on_change:
+            key = (namespace, frame)
+            if self._last.get(key) == selected:
+                return
+            self._last[key] = selected
+        abandoned = False
+        with self._ready:
+            if len(self.queue) >= self.maxsize:
+                if self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return
+                if self.policy == 'drop_oldest':
+                    self.queue.popleft()
+                    self.dropped += 1
+                else:
+                    start = time.perf_counter()
+                    while len(self.queue) >= self.maxsize and not self._closed:
+                        if self._thread is not None and not self._thread.is_alive():
+                            # Nobody will ever make room; don't hold up the other consumers
+                            abandoned = True
+                            break
+                        self._ready.wait(0.1)
+                    self.blocked += time.perf_counter() - start
+                    if self._closed or abandoned:
+                        self.dropped += 1
+            if not self._closed and not abandoned:
+                self.queue.append((namespace, frame, selected, timestamp))
+                self.high_water = max(self.high_water, len(self.queue))
+                self._ready.notify_all()
+        if abandoned:
+            print(f"⚠️  Hub consumer {self.name}: detached after its dispatch thread stopped",
+                  file=sys.stderr)
+            self.cancel()
+
+    def get(self, timeout=None):
+        """Next (namespace, frame, values, timestamp), or None on timeout or close"""
+        with self._ready:
+            if not self.queue and not self._closed:
+                self._ready.wait(timeout)
+            if not self.queue:
+                return None
+            item = self.queue.popleft()
+            self.delivered += 1
+            self._ready.notify_all()  # Room for a blocked hub
+            return item
+
+    def drain(self, limit=None):
+        """Everything queued right now (up to limit), without waiting"""
+        with self._ready:
+            count = len(self.queue) if limit is None else min(limit, len(self.queue))
+            items = [self.queue.popleft() for _ in range(count)]
+            self.delivered += count
+            self._ready.notify_all()
+        return items
+
+    def start(self, on_frame):
+        """Call on_frame(frame, values, timestamp) for each queued frame on a dispatch thread"""
+        def dispatch():
+            while not self._closed:
+                item = self.get(timeout=0.1)
+                if item is None:
+                    continue
+                try:
+                    on_frame(item[1], item[2], item[3])
+                except Exception as e:
+                    # Detach rather than die attached: a dead dispatcher with a full
+                    # 'block' queue would stall the upstream reader for everyone
+                    print(f"⚠️  Hub consumer {self.name}: detached after its callback raised "
+                          f"{type(e).__name__}: {e}", file=sys.stderr)
+                    self.cancel()
+        self._thread = threading.Thread(target=dispatch, name=f"hub-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Detach from the hub and release anything waiting on this queue"""
+        self.hub._detach(self)
+        with self._ready:
+            self._closed = True
+            self._ready.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def stats(self):
+        return {'queued': len(self.queue), 'delivered': self.delivered, 'dropped': self.dropped,
+                'blocked_s': self.blocked, 'high_water': self.high_water, 'policy': self.policy}
+
+class SignalHub:
+    """Multiplexes one upstream link across consumers; also usable as a broker link itself"""
+
+    def __init__(self, link, client_id="signal_hub"):
+        self.link = link
+        self.client_id = client_id
+        self.upstream_frames = 0
+        self._lock = threading.Lock()
+        self._consumers = []
+        self._routes = {}  # (namespace, frame) -> tuple of consumers
+        self._upstream = {}  # namespace -> (subscription, {frame: signals}, generation)
+        self._generation = 0
+
+    def attach(self, name, groups, on_change=True, maxsize=DEFAULT_QUEUE, policy='block'):
+        """Consumer for {namespace: [(frame, signal), ...]} across any number of namespaces"""
+        frames_by_namespace = {}
+        for namespace, signals in groups.items():
+            frames = frames_by_namespace.setdefault(namespace, {})
+            for frame, signal in signals:
+                frames.setdefault(frame, set()).add(signal)
+        consumer = Consumer(self, name, frames_by_namespace, on_change, maxsize, policy)
+        with self._lock:
+            self._consumers.append(consumer)
+            for namespace, frames in frames_by_namespace.items():
+                for frame in frames:
+                    key = (namespace, frame)
+                    self._routes[key] = self._routes.get(key, ()) + (consumer,)
+                self._widen(namespace, frames)
+        return consumer
+
+    def _widen(self, namespace, frames):
+        """Make sure the upstream subscription for namespace covers frames (lock held)"""
+        subscription, current, _ = self._upstream.get(namespace, (None, {}, None))
+        merged = {frame: set(signals) for frame, signals in current.items()}
+        for frame, signals in frames.items():
+            merged.setdefault(frame, set()).update(signals)
+        if merged == current:
+            return
+        # Subscribe the wider set before dropping the old one; the generation
+        # check discards the old subscription's frames once the new one is live
+        self._generation += 1
+        generation = self._generation
+        signals = [(frame, signal) for frame, names in merged.items() for signal in sorted(names)]
+        replacement = self.link.subscribe(f"{self.client_id}_{namespace or 'default'}", signals,
+                                          self._forward(namespace, generation), on_change=False,
+                                          namespace=namespace)
+        self._upstream[namespace] = (replacement, merged, generation)
+        if subscription is not None:
+            subscription.cancel()
+
+    def _forward(self, namespace, generation):
+        def on_frame(frame, values, timestamp):
+            if self._upstream.get(namespace, (None, None, None))[2] != generation:
+                return
+            self.upstream_frames += 1
+            for consumer in self._routes.get((namespace, frame), ()):
+                consumer.offer(namespace, frame, values, timestamp)
+        return on_frame
+
+    def _detach(self, consumer):
+        with self._lock:
+            if consumer not in self._consumers:
+                return
+            self._consumers.remove(consumer)
+            for namespace, frames in consumer.groups.items():
+                for frame in frames:
+                    key = (namespace, frame)
+                    routes = tuple(c for c in self._routes.get(key, ()) if c is not consumer)
+                    if routes:
+                        self._routes[key] = routes
+                    else:
+                        self._routes.pop(key, None)
+            # Upstream subscriptions are kept: consumers come and go far more
+            # often than the set of watched namespaces changes
+
+    # Broker link interface, so existing components can attach unchanged
+
+    def subscribe(self, client_id, signals, on_frame, on_change=True, namespace=None):
+        """Call on_frame(frame, values, timestamp) from a per-consumer dispatch thread"""
+        return self.attach(client_id, {namespace: list(signals)}, on_change).start(on_frame)
+
+    def publisher(self, client_id, signals, namespace=None):
+        """Publishers share the hub's upstream connection"""
+        return self.link.publisher(client_id, signals, namespace)
+
+    def list_signals(self, namespace=None):
+        return self.link.list_signals(namespace)
+
+    def stats(self):
+        """{consumer name: queue statistics}"""
+        with self._lock:
+            consumers = list(self._consumers)
+        return {consumer.name: consumer.stats() for consumer in consumers}
+
+    def close(self):
+        """Detach every consumer and drop the upstream subscriptions"""
+        for consumer in list(self._consumers):
+            consumer.cancel()
+        with self._lock:
+            for subscription, _, _ in self._upstream.values():
+                subscription.cancel()
+            self._upstream.clear()
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+def get_hub(name, url=BROKER_URL):
+    """The hub registered under name (hub://name URLs), created on first use"""
+    with _hubs_lock:
+        if name not in _hubs:
+            _hubs[name] = SignalHub(connect(url), client_id=f"signal_hub_{name}")
+        return _hubs[name]
+
+def namespace_groups(interfaces):
+    """{namespace: [(frame, signal), ...]} for every chain of an interfaces.json"""
+    from local_broker import namespace_catalog
+
+    return {namespace: [(frame, signal) for frame, signals in frames.items() for signal in sorted(signals)]
+            for namespace, frames in namespace_catalog(interfaces).items()}
+
+def main():
+    from topology_model import DEFAULT_INTERFACES
+
+    parser = argparse.ArgumentParser(description="Shared multi-namespace subscriber")
+    parser.add_argument("--broker", default=BROKER_URL, help="upstream broker URL")
+    parser.add_argument("--interfaces", default=DEFAULT_INTERFACES,
+                        help="interfaces.json whose namespaces are watched")
+    parser.add_argument("--ecu", action="store_true", help="run the steering ECU in this process")
+    parser.add_argument("--publisher", action="store_true",
+                        help="run the sine command publisher in this process")
+    parser.add_argument("--viz", action="store_true",
+                        help="show the steering visualizer in this process (hub://main)")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    print(f"🔀 Signal hub on {args.broker}")
+    hub = get_hub("main", args.broker)
+    groups = namespace_groups(args.interfaces)
+    # The demo scripts publish without a namespace; watch that traffic too
+    from ecu_simulator import COMMAND_SIGNALS, STATUS_SIGNALS
+    groups[None] = COMMAND_SIGNALS + STATUS_SIGNALS
+    monitor = hub.attach("monitor", groups, on_change=False, policy='drop_oldest')
+    for namespace, signals in groups.items():
+        print(f"   {namespace or '(no namespace)'}: {len(signals)} signals")
+
+    workers = []
+    stop = threading.Event()
+    if args.ecu:
+        import asyncio
+        from ecu_simulator import AsyncECUService
+
+        ecu = AsyncECUService(hub, verbose=False)
+        workers.append(threading.Thread(target=lambda: asyncio.run(ecu.run(args.duration)), daemon=True))
+    if args.publisher:
+        from publisher import SineCommander
+
+        commander = SineCommander(hub.publisher("steering_gateway", COMMAND_SIGNALS), verbose=False)
+
+        def publish():
+            while not stop.wait(0.5):
+                commander.send()
+        workers.append(threading.Thread(target=publish, daemon=True))
+    for worker in workers:
+        worker.start()
+
+    start = time.monotonic()
+    try:
+        if args.viz:
+            from steering_visualizer import SteeringSimulator
+            SteeringSimulator(broker="hub://main").run()
+        else:
+            while args.duration is None or time.monotonic() - start < args.duration:
+                time.sleep(1.0)
+                monitor.drain()
+                consumers = " | ".join(f"{name}: {s['delivered']} ok {s['dropped']} dropped"
+                                       for name, s in hub.stats().items())
+                print(f"\r📥 {hub.upstream_frames:,} upstream frames | {consumers}", end="", flush=True)
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Signal hub stopped")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        stop.set()
+        served = len(hub.stats())
+        hub.close()
+        print(f"\n✓ One upstream connection served {served} consumers")
+
+if __name__ == "__main__":
+    main()
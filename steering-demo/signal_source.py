@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Signal Sources
+Producer threads that sample steering command/response at full rate into a
+lock-free SampleQueue, so the visualizers only drain snapshots at display rate
+"""
+
+import math
+import sys
+import threading
+import time
+
+from broker_link import connect
+from dbc_codec import load_database, steering_codec
+from ecu_simulator import COMMAND_SIGNALS, MAX_RATE, STATUS_SIGNALS
+from ring_buffer import SampleQueue, SharedSampleQueue
+from sim_clock import SimClock
+
+SAMPLE_RATE = 200.0  # Simulated samples per second (independent of the frame rate)
+BUFFER_SECONDS = 30  # How long the GUI may stall before samples are dropped
+COLUMNS = ('time', 'command', 'response')
+ECU_MAX_RATE = 150  # deg/s the simulated ECU can follow
+REPLAY_URL = "local://replay"  # In-process broker a replayed log is published on
+SHARED_PREFIX = "shm://"  # Samples decoded by another process into a SharedSampleQueue
+
+def generate_command(t):
+    """Generate realistic steering command (sine wave + noise)"""
+    # Main sine wave pattern
+    base = 500 * math.sin(t * 0.5)
+
+    # Add smaller oscillations for realism
+    noise = 50 * math.sin(t * 2.3) + 30 * math.sin(t * 3.7)
+
+    return base + noise
+
+class SimulatedSteering:
+    """Producer thread sampling the simulated command and ECU response on a fixed schedule"""
+
+    max_rate = ECU_MAX_RATE  # deg/s the response can slew (for loop analytics)
+
+    def __init__(self, rate=SAMPLE_RATE, buffer_seconds=BUFFER_SECONDS, on_sample=None, clock=None):
+        self.rate = rate
+        self.queue = SampleQueue(int(rate * buffer_seconds), COLUMNS)
+        self.on_sample = on_sample  # Called on the producer thread with the sample index
+        self.current_angle = 0.0
+        self.index = 0
+        # Fixed steps paced to real time unless a shared clock is given
+        self.clock = clock or SimClock(step=1.0 / rate, mode='realtime')
+        self._stop = threading.Event()
+        self._thread = None
+
+    def update_ecu(self, command, dt):
+        """Simulate ECU response with realistic lag and smoothing"""
+        # ECU responds with damping (can't follow instantly)
+        diff = command - self.current_angle
+        max_change = ECU_MAX_RATE * dt
+
+        if abs(diff) > max_change:
+            step = max_change if diff > 0 else -max_change
+        else:
+            step = diff
+
+        self.current_angle += step
+        return self.current_angle
+
+    def sample(self, now):
+        """Take one sample at simulated time now"""
+        command = generate_command(now)
+        self.queue.push(now, command, self.update_ecu(command, 1.0 / self.rate))
+        if self.on_sample is not None:
+            self.on_sample(self.index)
+        self.index += 1
+
+    def schedule(self):
+        """Register sampling on the clock (for callers that run the clock themselves)"""
+        self.clock.every(1.0 / self.rate, self.sample)
+
+    def start(self):
+        self.schedule()
+        self._thread = threading.Thread(target=self.clock.run, kwargs={'stop': self._stop},
+                                        name="simulated-steering", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+class BrokerSteering:
+    """Producer fed by broker callbacks: one sample per received command or status frame"""
+
+    max_rate = MAX_RATE  # The ECU answering on the broker
+
+    def __init__(self, link, rate=SAMPLE_RATE, buffer_seconds=BUFFER_SECONDS, queue=None):
+        self.link = link
+        self.rate = rate  # Nominal only, for sizing the display buffers
+        self.queue = queue if queue is not None else SampleQueue(int(rate * buffer_seconds), COLUMNS)
+        codec = steering_codec()
+        self.command_codec = codec["SteeringCommand"]
+        self.status_codec = codec["SteeringStatus"]
+        self.command = 0.0
+        self.response = 0.0
+        self.start_time = None  # Set beforehand to share a time origin across processes
+        self.subscription = None
+        # The local broker delivers on each publisher's thread; this keeps the
+        # queue single-producer without making the GUI side wait on anything
+        self._push_lock = threading.Lock()
+
+    def start(self):
+        if self.start_time is None:
+            self.start_time = time.monotonic()
+        self.subscription = self.link.subscribe("steering_visualizer", COMMAND_SIGNALS + STATUS_SIGNALS,
+                                                self._on_frame, on_change=False)
+        return self
+
+    def stop(self):
+        if self.subscription is not None:
+            self.subscription.cancel()
+
+    def _on_frame(self, frame, values, timestamp):
+        with self._push_lock:
+            if "SteeringAngle" in values:
+                self.command = self.command_codec.to_physical("SteeringAngle", values["SteeringAngle"])
+            if "CurrentAngle" in values:
+                self.response = self.status_codec.to_physical("CurrentAngle", values["CurrentAngle"])
+            self.queue.push(time.monotonic() - self.start_time, self.command, self.response)
+
+class ReplaySteering(BrokerSteering):
+    """Broker-fed source whose frames come from a recorded traffic log
+
+    The log is replayed onto the local stand-in at REPLAY_URL, so anything
+    else connected there (e.g. a topology rate meter) sees the same traffic.
+    """
+
+    def __init__(self, path, speed=1.0, url=REPLAY_URL):
+        super().__init__(connect(url))
+        self.path = path
+        self.speed = speed
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        super().start()  # Subscribe before the first frame goes out
+        self._thread = threading.Thread(target=self._play, name="traffic-replay", daemon=True)
+        self._thread.start()
+        return self
+
+    def _play(self):
+        from traffic_log import BrokerSink, open_log, replay
+
+        log = open_log(self.path)
+        try:
+            sink = BrokerSink(self.link, load_database(log.metadata["database"]))
+            replay(log, sink, self.speed, stop=self._stop)
+        finally:
+            log.close()
+
+    def stop(self):
+        self._stop.set()
+        super().stop()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+class SharedSteering:
+    """Consumer of samples another process decodes into shared memory (shm://name)
+
+    orchestrator.py runs one decoder process per broker; any number of
+    visualizers attach to its ring without subscribing or decoding again.
+    """
+
+    max_rate = MAX_RATE
+
+    def __init__(self, name, rate=SAMPLE_RATE):
+        self.rate = rate
+        self.queue = SharedSampleQueue(name, columns=COLUMNS)
+
+    def start(self):
+        return self
+
+    def stop(self):
+        self.queue.close()
+
+def make_source(broker=None, on_sample=None, replay=None, speed=1.0):
+    """Simulated source by default, or one fed by a broker URL, a shared ring or a recorded log"""
+    if replay:
+        return ReplaySteering(replay, speed)
+    if broker and broker.startswith(SHARED_PREFIX):
+        return SharedSteering(broker[len(SHARED_PREFIX):])
+    if broker:
+        return BrokerSteering(connect(broker))
+    return SimulatedSteering(on_sample=on_sample)
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    source = SimulatedSteering().start()
+    drained = 0
+    stall = seconds / 2
+    time.sleep(stall)  # A stalled GUI: nothing drains for a while
+    drained += source.queue.drain().shape[1]
+    time.sleep(seconds - stall)
+    source.stop()
+    drained += source.queue.drain().shape[1]
+    print(f"📥 {drained} samples in {seconds:.1f}s at {SAMPLE_RATE:.0f} Hz "
+          f"(written {source.queue.written}, dropped {source.queue.dropped})")
+
+if __name__ == "__main__":
+    main()
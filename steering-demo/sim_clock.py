@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Simulation Clock
+Shared time source for the publisher, ECU and visualizer models: wall time,
+fixed steps paced to real time (optionally Nx), or fixed steps as fast as possible
+"""
+
+import argparse
+import hashlib
+import heapq
+import time
+
+MODES = ('wall', 'realtime', 'fast')
+DEFAULT_STEP = 0.001  # Simulated time resolution in seconds
+
+# Sleep granularity: wait the last stretch before a deadline by spinning
+SPIN_THRESHOLD = 0.0005
+
+def wait_until(deadline):
+    """Sleep until a perf_counter deadline, spinning for the final fraction of a ms"""
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return
+        if remaining > SPIN_THRESHOLD:
+            time.sleep(remaining - SPIN_THRESHOLD)
+
+class WallClock:
+    """Real time, as the demo scripts have always used it"""
+
+    mode = 'wall'
+
+    def __init__(self):
+        self.start = time.perf_counter()
+
+    def time(self):
+        """Seconds since the clock was created"""
+        return time.perf_counter() - self.start
+
+    def sleep(self, seconds):
+        wait_until(time.perf_counter() + seconds)
+
+class SimClock:
+    """Deterministic fixed-step clock
+
+    Simulated time is an integer tick count times step, so it never
+    accumulates float error and every run sees exactly the same
+    timestamps. In 'realtime' mode each step is held back until the wall
+    clock catches up (speed=10 runs ten times faster than real time); in
+    'fast' mode steps are taken back to back.
+    """
+
+    def __init__(self, step=DEFAULT_STEP, mode='fast', speed=1.0):
+        if mode not in ('realtime', 'fast'):
+            raise ValueError(f"SimClock mode must be 'realtime' or 'fast', not {mode!r}")
+        self.step = float(step)
+        self.mode = mode
+        self.speed = float(speed)
+        self.ticks = 0
+        self._tasks = []  # Heap of (due tick, order, period ticks, callback)
+        self._order = 0
+        self._wall_start = None
+
+    def time(self):
+        """Current simulated time in seconds"""
+        return self.ticks * self.step
+
+    def to_ticks(self, seconds):
+        ticks = int(round(seconds / self.step))
+        if ticks < 1 and seconds > 0:
+            raise ValueError(f"{seconds}s is shorter than the clock step {self.step}s")
+        return ticks
+
+    def _pace(self, stop=None):
+        if self.mode != 'realtime':
+            return
+        if self._wall_start is None:
+            self._wall_start = time.perf_counter() - self.time() / self.speed
+        deadline = self._wall_start + self.time() / self.speed
+        if stop is None:
+            wait_until(deadline)
+        else:
+            remaining = deadline - time.perf_counter()
+            if remaining > 0:
+                stop.wait(remaining)
+
+    def sleep(self, seconds):
+        """Advance simulated time (blocking code paths, e.g. the sine publisher)"""
+        if seconds <= 0:
+            return
+        self.ticks += self.to_ticks(seconds)
+        self._pace()
+
+    def every(self, period, callback, offset=0.0):
+        """Call callback(now) every period seconds of simulated time, first at offset"""
+        period_ticks = self.to_ticks(period)
+        heapq.heappush(self._tasks, (self.ticks + int(round(offset / self.step)), self._order,
+                                     period_ticks, callback))
+        self._order += 1
+
+    def run(self, duration=None, stop=None):
+        """Fire scheduled callbacks in time order (ties in registration order)"""
+        end = None if duration is None else self.ticks + self.to_ticks(duration)
+        tasks = self._tasks
+        while tasks and (stop is None or not stop.is_set()):
+            due, order, period, callback = tasks[0]
+            if end is not None and due > end:
+                break
+            self.ticks = due
+            self._pace(stop)
+            if stop is not None and stop.is_set():
+                break
+            callback(self.time())
+            heapq.heapreplace(tasks, (due + period, order, period, callback))
+        if end is not None and (stop is None or not stop.is_set()):
+            self.ticks = max(self.ticks, end)
+
+def make_clock(mode='wall', step=DEFAULT_STEP, speed=1.0):
+    """Clock for a --clock command-line choice"""
+    if mode == 'wall':
+        return WallClock()
+    return SimClock(step, mode, speed)
+
+def add_clock_arguments(parser, default='wall'):
+    """The --clock/--speed/--step options shared by the demo scripts"""
+    parser.add_argument("--clock", choices=MODES, default=default,
+                        help="wall time, fixed steps paced to real time, or fixed steps as fast as possible")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="with --clock realtime: simulated seconds per wall second")
+    parser.add_argument("--step", type=float, default=DEFAULT_STEP,
+                        help="fixed simulation step in seconds")
+
+def simulate_steering(duration, clock):
+    """Publisher -> ECU -> visualizer model through the local broker on one clock
+
+    Returns (status times, ECU angles, visualizer response samples). With
+    a SimClock the result is identical on every run.
+    """
+    import numpy as np
+
+    from broker_link import connect
+    from ecu_simulator import STATUS_SIGNALS, ClockedECUService
+    from publisher import COMMAND_SIGNALS, SineCommander
+    from signal_source import SimulatedSteering
+
+    link = connect(f"local://simulation-{id(clock)}")
+    commander = SineCommander(link.publisher("steering_gateway", COMMAND_SIGNALS), verbose=False)
+    ecu = ClockedECUService(link, clock)
+    viewer = SimulatedSteering(buffer_seconds=duration + 1, clock=clock)
+
+    status = []
+    link.subscribe("monitor", STATUS_SIGNALS,
+                   lambda frame, values, timestamp: status.append((clock.time(), values["CurrentAngle"])),
+                   on_change=False)
+
+    clock.every(0.5, lambda now: commander.send())
+    ecu.schedule()
+    viewer.schedule()
+    clock.run(duration)
+    link.close()
+
+    status = np.array(status, dtype=np.float64).reshape(-1, 2)
+    return status[:, 0], ecu.status.to_physical("CurrentAngle", status[:, 1]), viewer.queue.drain()
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic steering simulation")
+    parser.add_argument("--duration", type=float, default=3600.0, help="simulated seconds")
+    add_clock_arguments(parser, default='fast')
+    args = parser.parse_args()
+    if args.clock == 'wall':
+        parser.error("the simulation needs a fixed-step clock (--clock realtime or fast)")
+
+    clock = make_clock(args.clock, args.step, args.speed)
+    print(f"⏱️  Simulating {args.duration:.0f}s of steering traffic ({args.clock}, step {args.step * 1000:g} ms)")
+    start = time.perf_counter()
+    times, angles, samples = simulate_steering(args.duration, clock)
+    elapsed = time.perf_counter() - start
+
+    import numpy as np
+
+    digest = hashlib.sha1()
+    for array in (times, angles, samples):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    print(f"✓ {len(times):,} status frames, {samples.shape[1]:,} visualizer samples "
+          f"in {elapsed:.2f}s ({args.duration / elapsed:,.0f}x real time)")
+    print(f"🔒 Output digest: {digest.hexdigest()[:16]} (identical on every run)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Steering Demo Command Line
+One entry point for the demo tools (steering-demo publish|ecu|viz|bench ...);
+a subcommand's module is only imported once that subcommand runs
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# subcommand -> (module whose main() it runs, description)
+COMMANDS = {
+    'publish': ('publisher', "sine-wave SteeringCommand publisher"),
+    'ecu': ('ecu_simulator', "steering ECU answering commands with status"),
+    'fleet': ('ecu_fleet', "many ECUs at once, one namespace each"),
+    'viz': ('steering_visualizer', "real-time command/response plots"),
+    'topology': ('network_topology_visualizer', "network topology with live message flow"),
+    'render': ('batch_render', "headless rendering of logs and simulations"),
+    'log': ('traffic_log', "record, replay and inspect traffic logs"),
+    'analytics': ('loop_analytics', "online control-loop metrics, published as SteeringAnalytics"),
+    'udp': ('udp_can_bridge', "UDP CAN frame pump/sink and frames/s + drop benchmark"),
+    'demo': ('orchestrator', "supervised multi-process demo"),
+    'bench': (None, "cold-start time of every subcommand against its budget"),
+}
+
+# Cold start of `steering-demo <command> --help` on top of the bare interpreter, in ms.
+# Budgets sit about twice above typical measurements so only real regressions trip
+# them. Broker-side tools are launched by the dozen, so they import neither numpy
+# nor asyncio before their options are parsed; the array tools pay for numpy up
+# front and the GUI tools for matplotlib.
+IMPORT_BUDGET_MS = {
+    'publish': 80,
+    'ecu': 80,
+    'demo': 80,
+    'fleet': 300,
+    'log': 300,
+    'analytics': 300,
+    'udp': 300,
+    'viz': 1200,
+    'topology': 1500,
+    'render': 1500,
+}
+BENCH_REPEAT = 5
+
+def load(command):
+    """main() of a subcommand, importing its module now"""
+    import importlib
+
+    return importlib.import_module(COMMANDS[command][0]).main
+
+def _cold_start(argv, repeat):
+    """Best wall time in seconds of running argv in a fresh interpreter"""
+    import time
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def slowest_imports(module, count=3):
+    """[(ms, name)] of the module's heaviest direct imports, from python -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=HERE, capture_output=True, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | name", indented two spaces per level
+        fields = line.split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2]
+        if name.startswith("   ") and not name.startswith("     "):
+            imports.append((int(fields[1]) / 1000, name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+def bench(argv):
+    """Measure each subcommand's cold start; returns 1 if any is over its budget"""
+    parser = argparse.ArgumentParser(prog="steering-demo bench",
+                                     description="Cold-start time of each subcommand against its budget")
+    parser.add_argument("commands", nargs="*", help="subcommands to measure (default: all)")
+    parser.add_argument("--repeat", type=int, default=BENCH_REPEAT, help="runs per command; the best counts")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply every budget (for slow or heavily loaded machines)")
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.commands) - set(IMPORT_BUDGET_MS))
+    if unknown:
+        parser.error(f"no budget for {', '.join(unknown)} (choose from {', '.join(IMPORT_BUDGET_MS)})")
+
+    baseline = _cold_start([sys.executable, "-c", "pass"], args.repeat)
+    print(f"⏱️  Cold start of `steering-demo COMMAND --help`, best of {args.repeat}, "
+          f"on top of python itself ({baseline * 1000:.0f} ms)")
+    over = []
+    for command in args.commands or list(IMPORT_BUDGET_MS):
+        budget = IMPORT_BUDGET_MS[command] * args.scale
+        elapsed = _cold_start([sys.executable, os.path.join(HERE, "steering_demo.py"), command, "--help"],
+                              args.repeat)
+        cost = max(0.0, elapsed - baseline) * 1000
+        ok = cost <= budget
+        print(f"   {command:9s} {cost:6.0f} ms / {budget:4.0f} ms {'✓' if ok else '❌ over budget'}")
+        if not ok:
+            over.append(command)
+            heaviest = ", ".join(f"{name} {ms:.0f} ms" for ms, name in
+                                 slowest_imports(COMMANDS[command][0]))
+            print(f"      slowest imports: {heaviest}")
+    if over:
+        print(f"❌ {len(over)} over budget: {', '.join(over)}")
+        return 1
+    print("✓ All within budget")
+    return 0
+
+def main():
+    commands = "\n".join(f"  {name:9s} {description}" for name, (_, description) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog="steering-demo", description="Steering demo tools",
+        epilog=f"commands:\n{commands}\n\nsteering-demo COMMAND --help shows a command's options",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=list(COMMANDS), metavar="COMMAND")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        sys.exit(bench(args.args))
+    # The subcommand parses its own options and sees itself as the program name
+    sys.argv = [f"steering-demo {args.command}"] + args.args
+    load(args.command)()
+
+if __name__ == "__main__":
+    main()
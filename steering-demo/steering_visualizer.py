@@ -4,28 +4,32 @@ Real-time Steering CAN Bus Visualizer
 Shows simulated CAN traffic: input commands and ECU output
 """
 
+import argparse
+
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from collections import deque
-import numpy as np
-import time
-import math
+
+from decimate import METHODS, axes_points, decimate
+from loop_analytics import LoopAnalytics
+from ring_buffer import RingBuffer
+from signal_source import make_source
 
 # Configuration
-MAX_POINTS = 100  # Show last 100 data points
+HISTORY_SECONDS = 10  # Default visible window; the plots are decimated, so hours work too
 UPDATE_INTERVAL = 50  # Update every 50ms
 
 class SteeringSimulator:
-    def __init__(self):
-        # Data buffers
-        self.times = deque(maxlen=MAX_POINTS)
-        self.commands = deque(maxlen=MAX_POINTS)  # Input: steering commands
-        self.responses = deque(maxlen=MAX_POINTS)  # Output: ECU response
-
-        # Simulation state
-        self.current_angle = 0.0
-        self.target_angle = 0.0
-        self.start_time = time.time()
+    def __init__(self, broker=None, window=HISTORY_SECONDS, method='minmax', replay=None, speed=1.0):
+        # Samples are produced on their own thread at full rate; frames only drain them
+        self.source = make_source(broker, replay=replay, speed=speed)
+
+        # Data buffers (preallocated; views feed set_data without list copies)
+        self.window = window
+        self.method = method
+        self.samples = RingBuffer(int(window * self.source.rate),
+                                  ('time', 'command', 'response'))
+        # Loop metrics over their own rolling window, whatever the visible one
+        self.analytics = LoopAnalytics(rate=self.source.rate, max_rate=self.source.max_rate)
 
         # Create figure with two subplots
         self.fig, (self.ax1, self.ax2) = plt.subplots(2, 1, figsize=(12, 8))
@@ -35,6 +39,9 @@ class SteeringSimulator:
         # Initialize plots
         self.line_command, = self.ax1.plot([], [], 'b-', linewidth=2, label='Steering Command (Input)')
         self.line_response, = self.ax2.plot([], [], 'r-', linewidth=2, label='ECU Response (Output)')
+        self.analytics_text = self.ax2.text(0.01, 0.96, '', transform=self.ax2.transAxes, va='top',
+                                            fontsize=10, family='monospace',
+                                            bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
 
         # Configure axes
         self._setup_axes()
@@ -58,65 +65,39 @@ class SteeringSimulator:
 
         plt.tight_layout()
 
-    def generate_command(self, t):
-        """Generate realistic steering command (sine wave + noise)"""
-        # Main sine wave pattern
-        base = 500 * math.sin(t * 0.5)
-
-        # Add smaller oscillations for realism
-        noise = 50 * math.sin(t * 2.3) + 30 * math.sin(t * 3.7)
-
-        return base + noise
-
-    def update_ecu(self, command, dt=0.05):
-        """Simulate ECU response with realistic lag and smoothing"""
-        self.target_angle = command
-
-        # ECU responds with damping (can't follow instantly)
-        diff = self.target_angle - self.current_angle
-        max_change = 150 * dt  # Max 150 degrees per second
-
-        if abs(diff) > max_change:
-            step = max_change if diff > 0 else -max_change
-        else:
-            step = diff
-
-        self.current_angle += step
-        return self.current_angle
+    def ingest(self, block):
+        """Add a (3, n) block of samples to the plots and the loop analytics"""
+        self.samples.extend(block)
+        self.analytics.update(block)
 
     def update(self, frame):
         """Animation update function"""
-        # Get current time
-        t = time.time() - self.start_time
-
-        # Generate new command
-        command = self.generate_command(t)
-
-        # ECU processes command
-        response = self.update_ecu(command)
-
-        # Store data
-        self.times.append(t)
-        self.commands.append(command)
-        self.responses.append(response)
+        # Take everything produced since the last frame, however long that was
+        self.ingest(self.source.queue.drain())
+        if not len(self.samples):
+            return self.line_command, self.line_response, self.analytics_text
+        t, command, response = self.samples.latest()
 
         # Update plots
-        if len(self.times) > 1:
-            times_list = list(self.times)
+        if len(self.samples) > 1:
+            times = self.samples.view('time')
 
             # Update command line
-            self.line_command.set_data(times_list, list(self.commands))
-            self.ax1.set_xlim(max(0, t - 10), t + 1)
+            # Decimate to the axes' pixel width so long windows stay cheap
+            points = axes_points(self.ax1)
+            self.line_command.set_data(*decimate(times, self.samples.view('command'), points, self.method))
+            self.ax1.set_xlim(max(0, t - self.window), t + self.window / 10)
 
             # Update response line
-            self.line_response.set_data(times_list, list(self.responses))
-            self.ax2.set_xlim(max(0, t - 10), t + 1)
+            self.line_response.set_data(*decimate(times, self.samples.view('response'), points, self.method))
+            self.ax2.set_xlim(max(0, t - self.window), t + self.window / 10)
 
         # Update status in title
         status = f'🚗 CAN Bus Steering Simulation | Command: {command:6.1f}° | ECU Output: {response:6.1f}° | Δ: {abs(command-response):5.1f}°'
+        self.analytics_text.set_text(self.analytics.format().replace(' | ', '\n'))
         self.fig.suptitle(status, fontsize=12, fontweight='bold')
 
-        return self.line_command, self.line_response
+        return self.line_command, self.line_response, self.analytics_text
 
     def run(self):
         """Start the visualization"""
@@ -129,6 +110,8 @@ class SteeringSimulator:
         print("⏸️  Close the window to stop")
         print("")
 
+        self.source.start()
+
         # Create animation
         ani = animation.FuncAnimation(
             self.fig,
@@ -138,12 +121,31 @@ class SteeringSimulator:
             cache_frame_data=False
         )
 
-        plt.show()
+        try:
+            plt.show()
+        finally:
+            self.source.stop()
+            if self.source.queue.dropped:
+                print(f"⚠️  {self.source.queue.dropped} samples dropped while the GUI stalled")
 
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Real-time Steering CAN Bus Visualizer")
+    parser.add_argument("--broker",
+                        help="plot live signals from this broker URL, or shm://NAME for an orchestrator.py "
+                             "ring (default: built-in simulation)")
+    parser.add_argument("--window", type=float, default=HISTORY_SECONDS,
+                        help="seconds of history shown in the signal plots (minutes to hours are fine)")
+    parser.add_argument("--decimate", choices=sorted(METHODS), default="minmax",
+                        help="downsampling applied before plotting long windows")
+    parser.add_argument("--replay", metavar="LOG",
+                        help="play back a traffic_log.py recording instead of live or simulated data")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="with --replay: playback speed (1 = recorded timing)")
+    args = parser.parse_args()
+
     try:
-        sim = SteeringSimulator()
+        sim = SteeringSimulator(args.broker, args.window, args.decimate, args.replay, args.replay_speed)
         sim.run()
     except KeyboardInterrupt:
         print("\n\n⏹️  Visualization stopped")
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Topology Model
+Builds the vehicle network graph from interfaces.json chains and the BU_/BO_
+definitions of their signal databases, with a disk-cached layout
+"""
+
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+
+from dbc_codec import CACHE_DIR, HERE, load_database
+
+DEFAULT_INTERFACES = os.path.join(HERE, "..", "broker-setup", "configuration", "interfaces.json")
+BROKER_NODE = "RemotiveBroker"
+BROKER_ADDRESS = "localhost:50051"
+IGNORED_NODES = {"Vector__XXX", ""}
+
+# Transmitter colours: the first two match the original command/status flows
+TX_COLORS = ['blue', 'red', 'green', 'purple', 'darkorange', 'teal', 'brown', 'magenta',
+             'olive', 'navy', 'crimson', 'darkcyan']
+LABEL_LIMIT = 30  # Above this many ECUs node/edge labels become clutter
+LAYOUT_VERSION = 2  # Bump when the layout algorithm changes to invalidate cached layouts
+
+def load_chains(path=DEFAULT_INTERFACES):
+    """Return the chains of an interfaces.json with database paths made absolute
+
+    A database that does not exist is set to None and its path kept in
+    chain["missing"], so one broken chain does not take the others down.
+    """
+    with open(path) as f:
+        config = json.load(f)
+    chains = list(config.get("chains", []))
+    for node in config.get("nodes", []):
+        chains += node.get("chains", [])
+
+    base = os.path.dirname(os.path.abspath(path))
+    resolved = []
+    for chain in chains:
+        database = chain.get("database") or chain.get("config", {}).get("database")
+        chain = dict(chain)
+        chain["database"] = os.path.join(base, database) if database else None
+        if chain["database"] and not os.path.exists(chain["database"]):
+            chain["missing"] = chain["database"]
+            chain["database"] = None
+        resolved.append(chain)
+    return resolved
+
+def _add_frame(G, src, dst, frame_id, name, color):
+    if G.has_edge(src, dst):
+        G.edges[src, dst]['frames'].append((frame_id, name))
+    else:
+        G.add_edge(src, dst, frames=[(frame_id, name)], color=color, weight=2)
+
+def build_topology(interfaces=DEFAULT_INTERFACES):
+    """Directed graph: ECU -> bus for transmitted frames, bus -> ECU for received ones"""
+    G = nx.DiGraph(source=os.path.abspath(interfaces))
+    G.add_node(BROKER_NODE, node_type='broker', color='lightgreen', size=4000,
+               label=f'{BROKER_NODE}\n{BROKER_ADDRESS}')
+    tx_colors = {}
+
+    for chain in load_chains(interfaces):
+        bus = chain["namespace"]
+        database = chain["database"]
+        db_name = os.path.basename(database) if database else "no database"
+        if chain.get("missing"):
+            db_name = f"missing {os.path.basename(chain['missing'])}"
+            print(f"⚠️  Skipping the frames of {bus}: database {chain['missing']} not found")
+        G.add_node(bus, node_type='bus', color='gold', size=2500,
+                   label=f'{chain.get("type", "can")}\n{bus}', database=db_name)
+        G.add_edge(bus, BROKER_NODE, frames=[], message='CAN Traffic', msg_id='*',
+                   color='gray', weight=3)
+        G.add_edge(BROKER_NODE, bus, frames=[], message='CAN Traffic', msg_id='*',
+                   color='gray', weight=3)
+        if not database:
+            continue
+
+        db = load_database(database)
+        for ecu in db.nodes:
+            if ecu not in IGNORED_NODES:
+                G.add_node(ecu, node_type='ecu')
+                G.nodes[ecu].setdefault('bus', bus)  # Places ECUs that send and receive nothing
+        for frame_id, name, transmitter, receivers in db.routes():
+            if transmitter not in IGNORED_NODES:
+                if transmitter not in tx_colors:
+                    tx_colors[transmitter] = TX_COLORS[len(tx_colors) % len(TX_COLORS)]
+                G.add_node(transmitter, node_type='ecu')
+                _add_frame(G, transmitter, bus, frame_id, name, tx_colors[transmitter])
+            color = tx_colors.get(transmitter, 'gray')
+            for receiver in sorted(receivers - IGNORED_NODES):
+                G.add_node(receiver, node_type='ecu')
+                _add_frame(G, bus, receiver, frame_id, name, color)
+
+    _decorate(G, tx_colors)
+    return G
+
+def frame_catalog(interfaces=DEFAULT_INTERFACES):
+    """{frame name: (frame_id, dlc, signal names)} for every frame on the configured chains"""
+    catalog = {}
+    for chain in load_chains(interfaces):
+        if not chain["database"]:
+            continue
+        a = load_database(chain["database"]).arrays
+        signals = a['sig_name'].tolist()
+        for name, frame_id, dlc, first, count in zip(
+                a['msg_name'].tolist(), a['msg_id'].tolist(), a['msg_dlc'].tolist(),
+                a['msg_first'].tolist(), a['msg_count'].tolist()):
+            catalog[name] = (frame_id, dlc, signals[first:first + count])
+    return catalog
+
+def _decorate(G, tx_colors):
+    """Fill in display attributes that depend on the whole graph"""
+    ecus = [n for n, data in G.nodes(data=True) if data.get('node_type') == 'ecu']
+    ecu_size = max(150, int(3000 * min(1.0, 6.0 / max(1, len(ecus)))))
+    G.graph['tx_colors'] = tx_colors
+    G.graph['show_labels'] = len(ecus) <= LABEL_LIMIT
+    for node in ecus:
+        data = G.nodes[node]
+        tx = sum(len(G.edges[e]['frames']) for e in G.out_edges(node))
+        rx = sum(len(G.edges[e]['frames']) for e in G.in_edges(node))
+        data['color'] = 'lightblue' if tx >= rx else 'lightcoral'
+        data['size'] = ecu_size
+        data['label'] = f'{node}\n(TX {tx} / RX {rx})'
+    for src, dst, data in G.edges(data=True):
+        frames = data['frames']
+        if frames:
+            names = [name for _, name in frames]
+            data['message'] = names[0] if len(names) == 1 else f'{names[0]} +{len(names) - 1}'
+            data['msg_id'] = ','.join(str(frame_id) for frame_id, _ in frames[:3])
+            if len(frames) > 3:
+                data['msg_id'] += ',…'
+            data['weight'] = 1 + min(3, math.log2(len(frames)) if len(frames) > 1 else 0)
+
+def graph_digest(G):
+    """Stable hash of the graph structure (what the layout depends on)"""
+    h = hashlib.sha1(f"layout-v{LAYOUT_VERSION}\n".encode())
+    for node in sorted(G.nodes()):
+        h.update(f"n:{node}:{G.nodes[node].get('node_type')}\n".encode())
+    for src, dst in sorted(G.edges()):
+        h.update(f"e:{src}>{dst}\n".encode())
+    return h.hexdigest()
+
+def _rings(members):
+    """Split members into concentric rings; each ring holds more nodes than the last"""
+    rings = []
+    while members:
+        capacity = 8 * (len(rings) + 1)
+        rings.append(members[:capacity])
+        members = members[capacity:]
+    return rings
+
+def _ring_radius(ring):
+    return 0.7 + 0.45 * ring
+
+def _initial_layout(G):
+    """Broker in the centre, buses around it, ECUs on rings around their bus"""
+    buses = [n for n, d in G.nodes(data=True) if d.get('node_type') == 'bus']
+    pos = {BROKER_NODE: np.zeros(2)}
+    placed = {BROKER_NODE, *buses}
+    rings = {}
+    for bus in buses:
+        declared = {n for n, d in G.nodes(data=True) if d.get('bus') == bus}
+        members = sorted((set(G.predecessors(bus)) | set(G.successors(bus)) | declared) - placed)
+        members = [m for m in members if G.nodes[m].get('node_type') == 'ecu']
+        rings[bus] = _rings(members)
+        placed.update(members)
+
+    # Keep every bus far enough out that its ECU rings clear the broker
+    for i, bus in enumerate(buses):
+        extent = _ring_radius(len(rings[bus]) - 1) if rings[bus] else 0.0
+        distance = max(1.0, extent + 0.6)
+        angle = 2 * math.pi * i / len(buses) + math.pi / 2
+        pos[bus] = np.array([math.cos(angle), math.sin(angle)]) * distance
+        for ring, chunk in enumerate(rings[bus]):
+            for j, node in enumerate(chunk):
+                angle = 2 * math.pi * j / len(chunk) + math.pi
+                pos[node] = pos[bus] + np.array([math.cos(angle), math.sin(angle)]) * _ring_radius(ring)
+    # Anything else gets a ring of its own outside the buses, never the broker's spot
+    rest = [node for node in G.nodes() if node not in pos]
+    outer = max(float(np.hypot(*xy)) for xy in pos.values()) + 0.8
+    for j, node in enumerate(rest):
+        angle = 2 * math.pi * j / len(rest) + math.pi / 4
+        pos[node] = np.array([math.cos(angle), math.sin(angle)]) * outer
+    return pos
+
+def compute_layout(G, refine=True):
+    """Deterministic layout: hierarchical seed, optionally relaxed with a spring model"""
+    pos = _initial_layout(G)
+    anchors = [n for n, d in G.nodes(data=True) if d.get('node_type') in ('broker', 'bus')]
+    # The dense spring solver is O(n^2); beyond a few hundred nodes keep the rings
+    if refine and 2 < G.number_of_nodes() <= 400 and len(anchors) < G.number_of_nodes():
+        pos = nx.spring_layout(G.to_undirected(), pos=pos, fixed=anchors,
+                               iterations=50, seed=0, k=0.35)
+    return {node: (float(x), float(y)) for node, (x, y) in pos.items()}
+
+def load_layout(G, cache_dir=None, use_cache=True):
+    """Layout for G, computed once per graph structure and cached as JSON"""
+    path = os.path.join(cache_dir or CACHE_DIR, f"layout-{graph_digest(G)[:16]}.json")
+    if use_cache and os.path.exists(path):
+        try:
+            with open(path) as f:
+                return {node: tuple(xy) for node, xy in json.load(f).items()}
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable layout cache {path}: {e}")
+
+    pos = compute_layout(G)
+    if use_cache:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(pos, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️  Could not write layout cache {path}: {e}")
+    return pos
+
+def synthesize(directory, ecus=120, frames=2000, buses=2, signals=8):
+    """Write a scaled-up test.dbc-style network (interfaces.json + DBCs) for benchmarks"""
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(0)
+    chains = []
+    names = [f"ECU{i:03d}" for i in range(ecus)]
+    for b in range(buses):
+        members = names[b::buses]
+        lines = ['VERSION ""', '', 'BS_:', '', f'BU_: {" ".join(members)}', '']
+        for f in range(b, frames, buses):
+            tx = members[int(rng.integers(len(members)))]
+            rx = sorted(set(rng.choice(members, size=3).tolist()) - {tx}) or ["Vector__XXX"]
+            lines.append(f"BO_ {f + 1} Frame{f:04d}: 8 {tx}")
+            for s in range(signals):
+                lines.append(f" SG_ Frame{f:04d}_Sig{s} : {s * 8}|8@1+ (1,0) [0|255] \"\" "
+                             f"{','.join(rx)}")
+            lines.append("")
+        database = f"bus{b}.dbc"
+        with open(os.path.join(directory, database), "w") as f:
+            f.write("\n".join(lines))
+        chains.append({"namespace": f"Bus{b}", "type": "can", "database": database,
+                       "device_name": f"vcan{b}"})
+    path = os.path.join(directory, "interfaces.json")
+    with open(path, "w") as f:
+        json.dump({"chains": chains}, f, indent=2)
+    return path
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--synthesize":
+        directory = sys.argv[2] if len(sys.argv) > 2 else "/tmp/steering-demo-topology"
+        ecus = int(sys.argv[3]) if len(sys.argv) > 3 else 120
+        frames = int(sys.argv[4]) if len(sys.argv) > 4 else 2000
+        print(f"📝 Wrote {synthesize(directory, ecus, frames)}")
+        return
+
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_INTERFACES
+    start = time.perf_counter()
+    G = build_topology(path)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    compute_layout(G)
+    layout_s = time.perf_counter() - start
+    load_layout(G)
+    start = time.perf_counter()
+    load_layout(G)
+    cached_s = time.perf_counter() - start
+
+    kinds = [d.get('node_type') for _, d in G.nodes(data=True)]
+    frames = sum(len(d['frames']) for _, _, d in G.edges(data=True))
+    print(f"🕸️  {os.path.basename(path)}: {kinds.count('ecu')} ECUs, {kinds.count('bus')} buses, "
+          f"{G.number_of_edges()} edges carrying {frames} frame routes")
+    print(f"   build {build_s * 1000:.1f} ms | layout {layout_s * 1000:.1f} ms | "
+          f"cached layout {cached_s * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
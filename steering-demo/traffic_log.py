@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Traffic Log
+Records broker frames to an append-only, chunked, zlib-compressed columnar
+file (timestamp, frame id, payload) and replays it by time at 1x, Nx or max speed
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from broker_link import BROKER_URL, connect
+from dbc_codec import FRAME_BYTES, STEERING_DBC, load_database
+from sim_clock import wait_until
+
+MAGIC = b"SDTLOG01"
+CHUNK_MAGIC = b"CHNK"
+INDEX_MAGIC = b"SDTIDX01"
+# magic, rows, t_first, t_last, then compressed sizes of the four columns
+CHUNK_HEADER = struct.Struct("<4sIdd4I")
+TRAILER = struct.Struct("<Q8s")  # Index offset + INDEX_MAGIC, always the last bytes
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('rows', '<u4'), ('t_first', '<f8'), ('t_last', '<f8')])
+
+CHUNK_ROWS = 65536  # Frames per chunk: the unit of compression, seeking and replay
+CHUNK_SPAN = 60.0  # ...or this many recorded seconds, whichever comes first
+FLUSH_INTERVAL = 5.0  # Wall seconds a live capture may hold frames before writing them
+COMPRESSION_LEVEL = 6
+REPLAY_SLICE = 0.002  # Frames due within this many seconds are published together
+
+def _encode_columns(times, frame_ids, dlcs, payloads, t_first, level):
+    # Timestamps as delta-coded integer nanoseconds compress far better than floats
+    ns = np.rint((times - t_first) * 1e9).astype(np.int64)
+    columns = (np.diff(ns, prepend=np.int64(0)).astype('<i8'),
+               frame_ids.astype('<u4'),
+               dlcs.astype(np.uint8),
+               # Byte planes (all first bytes, then all second bytes, ...) keep
+               # slowly changing signal bytes next to each other
+               np.ascontiguousarray(payloads.T))
+    return [zlib.compress(column.tobytes(), level) for column in columns]
+
+class TrafficRecorder:
+    """Append-only writer; chunks are flushed as they fill and indexed on close"""
+
+    def __init__(self, path, database=STEERING_DBC, chunk_rows=CHUNK_ROWS, level=COMPRESSION_LEVEL):
+        self.path = path
+        self.database = load_database(database)
+        self.chunk_rows = chunk_rows
+        self.level = level
+        self.rows = 0
+        self.chunks = []
+        self._lock = threading.Lock()  # Callbacks may arrive on several broker threads
+        self._pending = []  # (timestamp, frame name, raw values)
+        self._pending_since = None
+        self._file = open(path, "wb")
+        metadata = json.dumps({"database": os.path.abspath(database), "created": time.time(),
+                               "frames": {str(fid): name for fid, name in
+                                          zip(self.database.frame_ids.tolist(), self.database.names)}})
+        self._file.write(MAGIC + struct.pack("<I", len(metadata)) + metadata.encode())
+
+    def append(self, timestamp, frame, values):
+        """Queue one frame given as raw signal values (what the broker carries)"""
+        with self._lock:
+            self._pending.append((timestamp, frame, values))
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            if (len(self._pending) >= self.chunk_rows
+                    or timestamp - self._pending[0][0] >= CHUNK_SPAN
+                    or time.monotonic() - self._pending_since >= FLUSH_INTERVAL):
+                self._flush_locked()
+
+    def append_payloads(self, times, frame_ids, payloads, dlcs=None):
+        """Write frames that are already encoded (e.g. from a CAN log importer)"""
+        times = np.asarray(times, dtype=np.float64)
+        payloads = np.asarray(payloads, dtype=np.uint8).reshape(-1, FRAME_BYTES)
+        if dlcs is None:
+            dlcs = np.full(len(times), FRAME_BYTES, dtype=np.uint8)
+        with self._lock:
+            self._flush_locked()
+            for start in range(0, len(times), self.chunk_rows):
+                rows = slice(start, start + self.chunk_rows)
+                self._write_chunk(times[rows], np.asarray(frame_ids)[rows],
+                                  np.asarray(dlcs)[rows], payloads[rows])
+
+    def _flush_locked(self):
+        pending, self._pending = self._pending, []
+        self._pending_since = None
+        if not pending:
+            return
+        times = np.array([row[0] for row in pending], dtype=np.float64)
+        frame_ids = np.zeros(len(pending), dtype=np.uint32)
+        dlcs = np.zeros(len(pending), dtype=np.uint8)
+        payloads = np.zeros((len(pending), FRAME_BYTES), dtype=np.uint8)
+
+        # Encode per frame type in one vectorized call
+        groups = {}
+        for i, (_, frame, _) in enumerate(pending):
+            groups.setdefault(frame, []).append(i)
+        for frame, rows in groups.items():
+            message = self.database[frame]
+            names = {name for i in rows for name in pending[i][2]}
+            raws = {name: np.array([pending[i][2].get(name, 0) for i in rows], dtype=np.int64)
+                    for name in names}
+            payloads[rows] = message.encode_raw(raws, len(rows))
+            frame_ids[rows] = message.frame_id
+            dlcs[rows] = message.dlc
+        self._write_chunk(times, frame_ids, dlcs, payloads)
+
+    def _write_chunk(self, times, frame_ids, dlcs, payloads):
+        if not len(times):
+            return
+        t_first, t_last = float(times.min()), float(times.max())
+        blobs = _encode_columns(times, frame_ids, dlcs, payloads, t_first, self.level)
+        offset = self._file.tell()
+        self._file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, len(times), t_first, t_last,
+                                           *(len(blob) for blob in blobs)))
+        for blob in blobs:
+            self._file.write(blob)
+        self._file.flush()
+        self.chunks.append((offset, len(times), t_first, t_last))
+        self.rows += len(times)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """Flush the last chunk and append the chunk index"""
+        with self._lock:
+            self._flush_locked()
+            index = np.array(self.chunks, dtype=INDEX_DTYPE)
+            offset = self._file.tell()
+            self._file.write(INDEX_MAGIC + index.tobytes())
+            self._file.write(TRAILER.pack(offset, INDEX_MAGIC))
+            self._file.close()
+
+    def attach(self, link, signals, clock=None):
+        """Record every frame of the given (frame, signal) pairs arriving on link"""
+        def on_frame(frame, values, timestamp):
+            self.append(clock.time() if clock is not None else timestamp, frame, dict(values))
+        return link.subscribe("traffic_recorder", signals, on_frame, on_change=False)
+
+class TrafficLog:
+    """Memory-mapped reader: only the chunks being read are decompressed"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a traffic log")
+        (length,) = struct.unpack_from("<I", self._map, len(MAGIC))
+        header_end = len(MAGIC) + 4 + length
+        self.metadata = json.loads(self._map[len(MAGIC) + 4:header_end])
+        self.frame_names = {int(fid): name for fid, name in self.metadata["frames"].items()}
+        self.index = self._read_index(header_end)
+
+    def _read_index(self, header_end):
+        size = len(self._map)
+        if size >= header_end + TRAILER.size:
+            offset, magic = TRAILER.unpack_from(self._map, size - TRAILER.size)
+            if magic == INDEX_MAGIC and self._map[offset:offset + len(INDEX_MAGIC)] == INDEX_MAGIC:
+                start = offset + len(INDEX_MAGIC)
+                return np.frombuffer(self._map[start:size - TRAILER.size], dtype=INDEX_DTYPE)
+        # No index (recording was interrupted): walk the chunk headers instead
+        chunks = []
+        offset = header_end
+        while offset + CHUNK_HEADER.size <= size:
+            magic, rows, t_first, t_last, *sizes = CHUNK_HEADER.unpack_from(self._map, offset)
+            end = offset + CHUNK_HEADER.size + sum(sizes)
+            if magic != CHUNK_MAGIC or end > size:
+                break
+            chunks.append((offset, rows, t_first, t_last))
+            offset = end
+        return np.array(chunks, dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return int(self.index['rows'].sum())
+
+    @property
+    def start(self):
+        return float(self.index['t_first'].min()) if len(self.index) else 0.0
+
+    @property
+    def end(self):
+        return float(self.index['t_last'].max()) if len(self.index) else 0.0
+
+    def read_chunk(self, i):
+        """(times, frame_ids, dlcs, payloads) of chunk i"""
+        offset = int(self.index['offset'][i])
+        magic, rows, t_first, t_last, *sizes = CHUNK_HEADER.unpack_from(self._map, offset)
+        view = memoryview(self._map)
+        position = offset + CHUNK_HEADER.size
+        columns = []
+        for size in sizes:
+            columns.append(zlib.decompress(view[position:position + size]))
+            position += size
+        view.release()
+        times = np.cumsum(np.frombuffer(columns[0], dtype='<i8')) / 1e9 + t_first
+        frame_ids = np.frombuffer(columns[1], dtype='<u4')
+        dlcs = np.frombuffer(columns[2], dtype=np.uint8)
+        payloads = np.frombuffer(columns[3], dtype=np.uint8).reshape(FRAME_BYTES, rows).T
+        return times, frame_ids, dlcs, payloads
+
+    def seek(self, t):
+        """Index of the first chunk that can contain frames at or after time t"""
+        return int(np.searchsorted(self.index['t_last'], t, side='left'))
+
+    def chunks(self, start=None, end=None):
+        """Yield (times, frame_ids, dlcs, payloads) between start and end, chunk by chunk"""
+        first = self.seek(start) if start is not None else 0
+        for i in range(first, len(self.index)):
+            if end is not None and self.index['t_first'][i] > end:
+                break
+            times, frame_ids, dlcs, payloads = self.read_chunk(i)
+            keep = np.ones(len(times), dtype=bool)
+            if start is not None:
+                keep &= times >= start
+            if end is not None:
+                keep &= times <= end
+            if not keep.all():
+                times, frame_ids, dlcs, payloads = times[keep], frame_ids[keep], dlcs[keep], payloads[keep]
+            yield times, frame_ids, dlcs, payloads
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+def open_log(path):
+    """TrafficLog for a recording, or a streamed CaptureLog for a candump/ASC/BLF capture"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) == MAGIC:
+            return TrafficLog(path)
+    from can_import import CaptureLog
+    return CaptureLog(path)
+
+def steering_blocks(log):
+    """Yield (samples, frame_times, frame_ids, dlcs) per log chunk, with time 0 at the log start
+
+    Samples are (time, command, response) rows for every steering frame,
+    with the signal a frame does not carry held from the previous one.
+    """
+    database = load_database(log.metadata["database"])
+    signals = [(database.get("SteeringCommand"), "SteeringAngle"),
+               (database.get("SteeringStatus"), "CurrentAngle")]
+    origin = log.start
+    last = np.zeros(len(signals))  # Held values carry across chunks
+    for times, frame_ids, dlcs, payloads in log.chunks():
+        times = times - origin
+        values = np.full((len(signals), len(times)), np.nan)
+        for row, (message, name) in enumerate(signals):
+            if message is not None:
+                rows = np.flatnonzero(frame_ids == message.frame_id)
+                if len(rows):
+                    values[row, rows] = message.decode(payloads[rows])[name]
+        steering = ~np.isnan(values).all(axis=0)
+        for row in range(len(signals)):
+            # Vectorized forward fill: index of the latest valid value at each row
+            valid = ~np.isnan(values[row])
+            latest = np.maximum.accumulate(np.where(valid, np.arange(len(times)), -1))
+            filled = np.where(latest >= 0, values[row][np.maximum(latest, 0)], last[row])
+            if valid.any():
+                last[row] = filled[-1]
+            values[row] = filled
+        yield (np.vstack([times[steering], values[:, steering]]), times,
+               np.asarray(frame_ids, dtype=np.int64), dlcs)
+
+def replay(log, sink, speed=1.0, start=None, end=None, stop=None):
+    """Feed sink(times, frame_ids, payloads) in time order at speed x real time
+
+    speed=math.inf replays as fast as the sink accepts whole chunks.
+    Returns the number of frames replayed.
+    """
+    origin = log.start if start is None else start
+    wall_start = time.perf_counter()
+    sent = 0
+    for times, frame_ids, _, payloads in log.chunks(start, end):
+        if stop is not None and stop.is_set():
+            break
+        if math.isinf(speed):
+            sink(times, frame_ids, payloads)
+            sent += len(times)
+            continue
+        due = wall_start + (times - origin) / speed
+        i = 0
+        while i < len(times):
+            if stop is not None and stop.is_set():
+                return sent
+            wait_until(due[i])
+            # Everything due within the next slice goes out in one batch
+            j = int(np.searchsorted(due, time.perf_counter() + REPLAY_SLICE, side='right'))
+            j = max(j, i + 1)
+            sink(times[i:j], frame_ids[i:j], payloads[i:j])
+            sent += j - i
+            i = j
+    return sent
+
+class BrokerSink:
+    """Publishes replayed payloads to a broker link as raw signal values"""
+
+    def __init__(self, link, database, client_id="traffic_replay"):
+        self.database = database
+        signals = [(m.name, name) for m in database.messages for name in m.names]
+        self.publisher = link.publisher(client_id, signals)
+
+    def __call__(self, times, frame_ids, payloads):
+        batch = [None] * len(frame_ids)
+        # Decode each frame type in one call, then put rows back in recorded order
+        for frame_id in np.unique(frame_ids).tolist():
+            message = self.database.get(frame_id)
+            if message is None:
+                continue
+            rows = np.flatnonzero(frame_ids == frame_id)
+            raw = message.decode_raw(payloads[rows]).tolist()
+            for row, values in zip(rows.tolist(), raw):
+                batch[row] = (message.name, dict(zip(message.names, values)))
+        self.publisher.publish_batch([entry for entry in batch if entry is not None])
+
+def synthesize(path, duration, rate=2.0):
+    """Record a simulated session (sine publisher + ECU on a fast SimClock)"""
+    from ecu_simulator import COMMAND_SIGNALS, STATUS_SIGNALS, ClockedECUService
+    from publisher import SineCommander
+    from sim_clock import SimClock
+
+    clock = SimClock(mode='fast')
+    link = connect(f"local://synthesize-{id(clock)}")
+    recorder = TrafficRecorder(path)
+    recorder.attach(link, COMMAND_SIGNALS + STATUS_SIGNALS, clock)
+    commander = SineCommander(link.publisher("steering_gateway", COMMAND_SIGNALS), verbose=False)
+    clock.every(1.0 / rate, lambda now: commander.send())
+    ClockedECUService(link, clock).schedule()
+    clock.run(duration)
+    recorder.close()
+    link.close()
+    return recorder.rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay steering traffic")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="capture broker traffic to a log")
+    record.add_argument("log")
+    record.add_argument("--broker", default=BROKER_URL)
+    record.add_argument("--duration", type=float, help="stop after this many seconds")
+
+    play = commands.add_parser("replay", help="publish a log (or a candump/ASC/BLF capture) to a broker")
+    play.add_argument("log")
+    play.add_argument("--broker", default=BROKER_URL)
+    play.add_argument("--speed", default="1", help="replay speed: 1, 10, ... or max")
+    play.add_argument("--start", type=float, help="seek to this many seconds into the log")
+    play.add_argument("--end", type=float, help="stop this many seconds into the log")
+
+    info = commands.add_parser("info", help="summarize a log")
+    info.add_argument("log")
+
+    synth = commands.add_parser("synthesize", help="write a simulated session as a log")
+    synth.add_argument("log")
+    synth.add_argument("--duration", type=float, default=3600.0, help="simulated seconds")
+    synth.add_argument("--rate", type=float, default=2.0, help="command frames per second")
+    args = parser.parse_args()
+
+    if args.command == "synthesize":
+        start = time.perf_counter()
+        rows = synthesize(args.log, args.duration, args.rate)
+        print(f"📝 {rows:,} frames ({args.duration:.0f}s simulated) → {args.log} "
+              f"({os.path.getsize(args.log) / 1e6:.2f} MB) in {time.perf_counter() - start:.1f}s")
+        return
+
+    if args.command == "info":
+        log = TrafficLog(args.log)
+        size = os.path.getsize(args.log)
+        print(f"📼 {args.log}: {len(log):,} frames in {len(log.index)} chunks, "
+              f"{log.end - log.start:.1f}s, {size / 1e6:.2f} MB "
+              f"({size / max(1, len(log)):.1f} bytes/frame)")
+        start = time.perf_counter()
+        decoded = sum(len(chunk[0]) for chunk in log.chunks())
+        elapsed = time.perf_counter() - start
+        print(f"   full scan: {decoded / elapsed / 1e6:.1f} M frames/s")
+        log.close()
+        return
+
+    link = connect(args.broker)
+    if args.command == "record":
+        from ecu_simulator import COMMAND_SIGNALS, STATUS_SIGNALS
+
+        recorder = TrafficRecorder(args.log)
+        subscription = recorder.attach(link, COMMAND_SIGNALS + STATUS_SIGNALS)
+        print(f"⏺️  Recording SteeringCommand/SteeringStatus from {args.broker} to {args.log}")
+        try:
+            if args.duration:
+                time.sleep(args.duration)
+            else:
+                while True:
+                    time.sleep(1)
+        except KeyboardInterrupt:
+            print("\n\n⏹️  Recording stopped")
+        finally:
+            subscription.cancel()
+            recorder.close()
+            link.close()
+            print(f"✓ {recorder.rows:,} frames in {len(recorder.chunks)} chunks")
+        return
+
+    log = open_log(args.log)
+    speed = math.inf if args.speed == "max" else float(args.speed)
+    database = load_database(log.metadata["database"])
+    start = None if args.start is None else log.start + args.start
+    end = None if args.end is None else log.start + args.end
+    print(f"▶️  Replaying {args.log} to {args.broker} at "
+          f"{'max speed' if math.isinf(speed) else f'{speed:g}x'}")
+    begin = time.perf_counter()
+    sent = 0
+    try:
+        sent = replay(log, BrokerSink(link, database), speed, start, end)
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Replay stopped")
+    finally:
+        elapsed = time.perf_counter() - begin
+        log.close()
+        link.close()
+        print(f"✓ {sent:,} frames in {elapsed:.2f}s ({sent / max(elapsed, 1e-9):,.0f} frames/s)")
+
+if __name__ == "__main__":
+    main()
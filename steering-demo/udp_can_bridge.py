@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+UDP CAN Bridge
+Frame pump and sink for the broker's UDP CAN chains (udp2: the broker listens on
+2002 and sends to 2001), with a loopback stand-in and a frames/s + drop benchmark
+"""
+
+import argparse
+import json
+import os
+import select
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from dbc_codec import HERE
+
+DISTRIBUTED_INTERFACES = os.path.join(HERE, "..", "broker-setup", "configuration_distributed",
+                                      "interfaces.json")
+DEFAULT_DEVICE = "udp2"
+PAYLOAD_SIZE = 8  # Chains without fixed_payload_size carry classic 8-byte CAN payloads
+BATCH = 256  # Datagrams per send/receive batch
+MAX_PACK = 64  # Most frames one datagram may carry (sizes the receive slots)
+SOCKET_BUFFER = 8 * 1024 * 1024  # Requested SO_SNDBUF/SO_RCVBUF; the kernel may cap it
+BENCH_SECONDS = 3.0
+BENCH_RATES = "50000,100000,200000,max"
+QUIET_SECONDS = 0.3  # The sink stops counting once the link has been silent this long
+
+def record_dtype(payload_size=PAYLOAD_SIZE):
+    """One frame on the wire: 32-bit big-endian frame id, then the fixed-size payload"""
+    return np.dtype([('id', '>u4'), ('payload', 'u1', (payload_size,))])
+
+def load_chain(interfaces=DISTRIBUTED_INTERFACES, device=DEFAULT_DEVICE):
+    """The UDP chain with this device_name, plus the frame ids of its database"""
+    from dbc_codec import load_database
+    from topology_model import load_chains
+
+    for chain in load_chains(interfaces):
+        if chain.get("type") == "udp" and chain.get("device_name") == device:
+            if not chain["database"]:
+                raise ValueError(f"udp chain {device!r} has no database "
+                                 f"({chain.get('missing', 'none configured')})")
+            chain = dict(chain)
+            chain.setdefault("target_host", "127.0.0.1")
+            chain.setdefault("fixed_payload_size", PAYLOAD_SIZE)
+            chain["frame_ids"] = load_database(chain["database"]).frame_ids.tolist()
+            return chain
+    raise ValueError(f"no udp chain {device!r} in {interfaces}")
+
+def _socket(buffer_option):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, buffer_option, SOCKET_BUFFER)
+    return sock
+
+class DatagramBatch:
+    """Preallocated receive slots, filled a batch at a time from a non-blocking socket
+
+    CPython has no recvmmsg, so a wakeup from select() is followed by
+    recv_into() calls until the socket would block or the slots are full;
+    nothing is allocated per datagram.
+    """
+
+    def __init__(self, batch=BATCH, slot_bytes=MAX_PACK * record_dtype().itemsize):
+        self.slots = np.zeros((batch, slot_bytes), dtype=np.uint8)
+        self.views = [memoryview(row) for row in self.slots]
+        self.lengths = np.zeros(batch, dtype=np.int64)
+
+    def receive(self, sock, timeout):
+        """Wait up to timeout for traffic, then read up to a batch; returns the datagrams read"""
+        if not select.select([sock], [], [], timeout)[0]:
+            return 0
+        recv_into = sock.recv_into
+        lengths = self.lengths
+        count = 0
+        for view in self.views:
+            try:
+                lengths[count] = recv_into(view)
+            except BlockingIOError:
+                break
+            count += 1
+        return count
+
+class FramePump:
+    """Sends CAN frames to a UDP chain from one preallocated buffer, a batch of datagrams per call
+
+    Every frame carries a 64-bit sequence number in the first payload bytes
+    (Intel order, so it also decodes as the chain's own signals), which lets
+    a sink count drops and reordering. The frame ids cycle through the
+    chain's database.
+    """
+
+    def __init__(self, host, port, frame_ids, payload_size=PAYLOAD_SIZE, pack=1, batch=BATCH):
+        if payload_size < 8:
+            raise ValueError("the sequence number needs a payload of at least 8 bytes")
+        self.sock = _socket(socket.SO_SNDBUF)
+        self.sock.connect((host, port))  # Once, instead of an address lookup per datagram
+        self.pack = pack
+        self.frames = np.zeros(batch * pack, record_dtype(payload_size))
+        raw = self.frames.view(np.uint8).reshape(len(self.frames), -1)
+        self._sequence = raw[:, 4:12].view('<u8')[:, 0]  # Writes land in the frame buffer
+        self._offsets = np.arange(len(self.frames), dtype=np.uint64)
+        frame_ids = np.asarray(frame_ids, dtype=np.uint32)
+        self._ids = np.resize(frame_ids, len(self.frames) + len(frame_ids))
+        self._id_count = len(frame_ids)
+        size = pack * self.frames.itemsize
+        buffer = memoryview(self.frames.view(np.uint8))
+        self._datagrams = [buffer[i * size:(i + 1) * size] for i in range(batch)]
+        self.sequence = 0  # Frames handed to the socket so far, sent or not
+        self.errors = 0  # Datagrams the socket refused (e.g. nothing listening on loopback)
+
+    @property
+    def sent(self):
+        return self.sequence - self.errors * self.pack
+
+    def send_batch(self):
+        """Stamp the next batch of frames and send it"""
+        np.add(self._offsets, self.sequence, out=self._sequence)
+        start = self.sequence % self._id_count
+        self.frames['id'] = self._ids[start:start + len(self.frames)]
+        send = self.sock.send
+        for datagram in self._datagrams:
+            try:
+                send(datagram)
+            except (BlockingIOError, ConnectionRefusedError):
+                self.errors += 1
+        self.sequence += len(self.frames)
+
+    def run(self, duration, rate=None):
+        """Send for duration seconds at rate frames/s (None: as fast as the socket takes them)"""
+        start = time.perf_counter()
+        first = self.sequence
+        end = start + duration
+        while True:
+            now = time.perf_counter()
+            if now >= end:
+                break
+            if rate:
+                due = start + (self.sequence - first) / rate
+                if due > now:
+                    time.sleep(min(due, end) - now)
+                    continue
+            self.send_batch()
+        return time.perf_counter() - start
+
+    def close(self):
+        self.sock.close()
+
+class FrameSink:
+    """Receives a UDP chain's datagrams and accounts frames, drops and reordering by sequence"""
+
+    def __init__(self, port, host="127.0.0.1", payload_size=PAYLOAD_SIZE, batch=BATCH, on_frames=None):
+        self.sock = _socket(socket.SO_RCVBUF)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self.port = self.sock.getsockname()[1]
+        self.record = record_dtype(payload_size)
+        self.batch = DatagramBatch(batch, MAX_PACK * self.record.itemsize)
+        self.on_frames = on_frames  # Called with (ids, payloads) of each received batch
+        self.reset()
+
+    def reset(self):
+        self.datagrams = 0
+        self.frames = 0
+        self.bytes = 0
+        self.malformed = 0  # Datagrams that are not a whole number of frames
+        self.reordered = 0
+        self.lowest = None
+        self.highest = -1
+        self.first_time = None  # perf_counter of the first and latest batch received
+        self.last_time = None
+
+    @property
+    def rate(self):
+        """Frames per second between the first and the latest batch received"""
+        if self.first_time is None or self.last_time <= self.first_time:
+            return 0.0
+        return self.frames / (self.last_time - self.first_time)
+
+    @property
+    def missing(self):
+        """Sequence numbers between the lowest and highest seen that never arrived"""
+        return 0 if self.lowest is None else self.highest - self.lowest + 1 - self.frames
+
+    def poll(self, timeout=0.1):
+        """Receive and account one batch; returns the datagrams read"""
+        count = self.batch.receive(self.sock, timeout)
+        if count:
+            self.last_time = time.perf_counter()
+            if self.first_time is None:
+                self.first_time = self.last_time
+            self._account(count)
+        return count
+
+    def _account(self, count):
+        size = self.record.itemsize
+        lengths = self.batch.lengths[:count]
+        slots = self.batch.slots
+        whole = lengths - lengths % size
+        self.malformed += int(np.count_nonzero(whole != lengths))
+        if (whole == whole[0]).all():
+            data = slots[:count, :whole[0]]  # The usual case: every datagram the same size
+        else:
+            data = np.concatenate([slots[i, :whole[i]] for i in range(count)])
+        raw = np.ascontiguousarray(data).reshape(-1, size)
+        self.datagrams += count
+        self.bytes += int(lengths.sum())
+        if not len(raw):
+            return
+        sequence = raw[:, 4:12].copy().view('<u8')[:, 0].astype(np.int64)
+        highest = np.maximum.accumulate(np.concatenate(([self.highest], sequence)))
+        self.reordered += int(np.count_nonzero(sequence < highest[:-1]))
+        self.highest = int(highest[-1])
+        lowest = int(sequence.min())
+        self.lowest = lowest if self.lowest is None else min(self.lowest, lowest)
+        self.frames += len(raw)
+        if self.on_frames is not None:
+            records = raw.view(self.record)[:, 0]
+            self.on_frames(records['id'], records['payload'])
+
+    def drain(self, running, quiet=QUIET_SECONDS):
+        """Poll while running() is true and then until the link has been quiet for a while"""
+        last = time.perf_counter()
+        while True:
+            if self.poll(0.05):
+                last = time.perf_counter()
+            elif not running() and time.perf_counter() - last >= quiet:
+                return
+
+    def close(self):
+        self.sock.close()
+
+class ChainRelay:
+    """Loopback stand-in for the broker's UDP chain: datagrams arriving on server_port go to target_port"""
+
+    def __init__(self, server_port, target_host, target_port, host="127.0.0.1", batch=BATCH):
+        self.sock = _socket(socket.SO_RCVBUF)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER)
+        self.sock.bind((host, server_port))
+        self.sock.setblocking(False)
+        self.target = (target_host, target_port)
+        self.batch = DatagramBatch(batch)
+        self.datagrams = 0
+        self.errors = 0
+
+    def poll(self, timeout=0.1):
+        count = self.batch.receive(self.sock, timeout)
+        sendto = self.sock.sendto
+        for view, length in zip(self.batch.views[:count], self.batch.lengths[:count].tolist()):
+            try:
+                sendto(view[:length], self.target)
+            except (BlockingIOError, ConnectionRefusedError):
+                self.errors += 1
+        self.datagrams += count
+        return count
+
+    def close(self):
+        self.sock.close()
+
+def parse_rates(text):
+    """"50000,max" -> [50000.0, None]"""
+    return [None if rate == "max" else float(rate) for rate in text.split(",")]
+
+def _spawn(chain, command, *arguments):
+    """This script's command in a subprocess, for the same chain"""
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--interfaces", chain["interfaces"],
+                             "--device", chain["device_name"], command, *arguments],
+                            stdout=subprocess.PIPE, text=True)
+
+def bench(chain, rates, seconds, pack=1, standin=True):
+    """Offer each rate for seconds from a pump process; returns one result dict per rate
+
+    The pump (and the stand-in relay) run in their own processes so the sink
+    does not share an interpreter lock with them.
+    """
+    relay = None
+    if standin:
+        relay = _spawn(chain, "relay")
+        relay.stdout.readline()  # Listening
+    sink = FrameSink(chain["target_port"], payload_size=chain["fixed_payload_size"])
+    results = []
+    try:
+        for rate in rates:
+            sink.reset()
+            pump = _spawn(chain, "pump", "--duration", str(seconds), "--rate", str(rate or "max"),
+                          "--pack", str(pack), "--json")
+            sink.drain(lambda: pump.poll() is None)
+            sent = json.loads(pump.stdout.read().splitlines()[-1])
+            lost = sent["frames"] - sink.frames
+            results.append({
+                'offered': rate,
+                'sent_per_s': sent["frames"] / sent["seconds"],
+                'received_per_s': sink.rate,
+                'sent': sent["frames"],
+                'received': sink.frames,
+                'drop_rate': lost / sent["frames"] if sent["frames"] else 0.0,
+                'reordered': sink.reordered,
+                'malformed': sink.malformed,
+            })
+    finally:
+        sink.close()
+        if relay is not None:
+            relay.terminate()
+            relay.wait()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="UDP CAN frame pump and sink for the broker's UDP chains")
+    parser.add_argument("--interfaces", default=DISTRIBUTED_INTERFACES,
+                        help="interfaces.json holding the chain (default: configuration_distributed)")
+    parser.add_argument("--device", default=DEFAULT_DEVICE, help="device_name of the udp chain")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pump = commands.add_parser("pump", help="send sequenced frames to the chain's server_port")
+    pump.add_argument("--host", help="where the chain listens (default: its target_host)")
+    pump.add_argument("--duration", type=float, default=10.0)
+    pump.add_argument("--rate", default="max", help="frames per second, or max")
+    pump.add_argument("--pack", type=int, default=1, help="frames per datagram")
+    pump.add_argument("--json", action="store_true", help="print the result as one JSON line")
+
+    sink = commands.add_parser("sink", help="count frames arriving on the chain's target_port")
+    sink.add_argument("--duration", type=float, help="stop after this many seconds")
+    sink.add_argument("--decode", action="store_true", help="decode every frame with the chain's database")
+
+    commands.add_parser("relay", help="loopback stand-in for the broker: forward server_port to target_port")
+
+    run = commands.add_parser("bench", help="sustained frames/s and drop rate at several offered rates")
+    run.add_argument("--rates", default=BENCH_RATES, help="comma-separated frames/s; max = unpaced")
+    run.add_argument("--seconds", type=float, default=BENCH_SECONDS, help="per rate")
+    run.add_argument("--pack", type=int, default=1, help="frames per datagram")
+    run.add_argument("--broker", action="store_true",
+                     help="go through a running broker's chain instead of the loopback stand-in")
+    args = parser.parse_args()
+
+    try:
+        chain = load_chain(args.interfaces, args.device)
+        chain["interfaces"] = args.interfaces
+        payload_size = chain["fixed_payload_size"]
+
+        if args.command == "pump":
+            rate = None if args.rate == "max" else float(args.rate)
+            pump = FramePump(args.host or chain["target_host"], chain["server_port"], chain["frame_ids"],
+                             payload_size, args.pack)
+            if not args.json:
+                print(f"📤 Pumping {args.device} frames to :{chain['server_port']} "
+                      f"at {args.rate} frames/s for {args.duration:g}s")
+            elapsed = pump.run(args.duration, rate)
+            pump.close()
+            if args.json:
+                print(json.dumps({"frames": pump.sent, "errors": pump.errors, "seconds": elapsed}))
+            else:
+                print(f"✓ {pump.sent:,} frames in {elapsed:.2f}s ({pump.sent / elapsed:,.0f} frames/s), "
+                      f"{pump.errors} datagrams refused")
+
+        elif args.command == "sink":
+            on_frames = None
+            decoded = [0]
+            if args.decode:
+                from dbc_codec import load_database
+
+                database = load_database(chain["database"])
+
+                def on_frames(ids, payloads):
+                    for frame_id in np.unique(ids).tolist():
+                        if frame_id in database:
+                            values = database[frame_id].decode(payloads[ids == frame_id])
+                            decoded[0] += sum(len(column) for column in values.values())
+            sink = FrameSink(chain["target_port"], payload_size=payload_size, on_frames=on_frames)
+            print(f"📥 Sink on :{chain['target_port']} for {args.device} ({chain['namespace']})")
+            start = time.perf_counter()
+            report = start + 1.0
+            frames = 0
+            try:
+                while args.duration is None or time.perf_counter() - start < args.duration:
+                    sink.poll()
+                    now = time.perf_counter()
+                    if now >= report:
+                        print(f"   {sink.frames - frames:10,} frames/s | {sink.missing:,} missing | "
+                              f"{sink.reordered:,} reordered" +
+                              (f" | {decoded[0]:,} signal values decoded" if args.decode else ""))
+                        frames = sink.frames
+                        report = now + 1.0
+            finally:
+                sink.close()
+            print(f"✓ {sink.frames:,} frames in {sink.datagrams:,} datagrams, {sink.missing:,} missing")
+
+        elif args.command == "relay":
+            relay = ChainRelay(chain["server_port"], chain["target_host"], chain["target_port"])
+            print(f"🔁 Stand-in for {args.device}: :{chain['server_port']} → "
+                  f"{chain['target_host']}:{chain['target_port']}", flush=True)
+            try:
+                while True:
+                    relay.poll()
+            finally:
+                relay.close()
+
+        else:
+            via = "the broker" if args.broker else "the loopback stand-in"
+            print(f"📡 {args.device} ({chain['namespace']}): pump → :{chain['server_port']} → {via} → "
+                  f":{chain['target_port']} → sink | {payload_size}-byte payloads, {args.pack} frame(s)/datagram")
+            print(f"   {'offered/s':>10} {'sent/s':>11} {'received/s':>11} {'dropped':>8} {'reordered':>9}")
+            for result in bench(chain, parse_rates(args.rates), args.seconds, args.pack, not args.broker):
+                offered = "max" if result['offered'] is None else f"{result['offered']:,.0f}"
+                print(f"   {offered:>10} {result['sent_per_s']:11,.0f} {result['received_per_s']:11,.0f} "
+                      f"{result['drop_rate']:8.2%} {result['reordered']:9,}")
+    except KeyboardInterrupt:
+        print("\n\n⏹️  UDP bridge stopped")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    main()